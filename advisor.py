@@ -0,0 +1,247 @@
+"""
+Conselheiro de jogadas: estima, em euros, o valor esperado de rodar a
+roleta, comprar uma vogal ou resolver o puzzle, a partir da distribuição das
+casas da roleta, das letras ainda disponíveis e do número de soluções
+candidatas de cada palavra (ver `solver.py`).
+
+A parte do cálculo que não depende do dinheiro do jogador é guardada numa
+cache LRU limitada, indexada pelo estado canónico da ronda (padrões das
+palavras por ordem, letras excluídas e letras disponíveis).
+
+Uso: python advisor.py (joga no terminal com o comando de ajuda "?")
+"""
+
+from __future__ import annotations
+from functools import lru_cache
+from typing import NamedTuple
+
+import wheel
+from solver import Analysis, WordIndex, make_solver_bot
+
+HINT_COMMAND = '?'
+
+
+class Advice(NamedTuple):
+    """
+    Representa o conselho para o jogador atual.
+
+    best: melhor comando ('r', 'v' ou 'f')
+    values: valor esperado de cada comando
+    letters: melhor consoante e melhor vogal (ou None)
+    """
+    best: str
+    values: dict[str, float]
+    letters: tuple[str | None, str | None]
+
+
+class _Stats(NamedTuple):
+    """
+    Parte do conselho que não depende do dinheiro do jogador.
+    """
+    p_solve: float  # Probabilidade de acertar na solução
+    cons: str | None  # Melhor consoante
+    p_cons: float  # Probabilidade de a consoante existir
+    n_cons: float  # Ocorrências esperadas da consoante, se existir
+    s_cons: float  # Probabilidade de acertar depois de pedir a consoante
+    vowel: str | None  # Melhor vogal
+    p_vowel: float  # Probabilidade de a vogal existir
+    n_vowel: float  # Ocorrências esperadas da vogal, se existir
+    s_vowel: float  # Probabilidade de acertar depois de comprar a vogal
+
+
+class Advisor:
+    """
+    Representa o conselheiro de jogadas para uma roleta e um dicionário.
+    """
+    def __init__(self: Advisor, index: WordIndex,
+                 wheel_: wheel.Wheel | None = None, turn_value: float = 3000,
+                 round_value: float = 3000, cache_size: int = 8192,
+                 max_split: int = 5000):
+        """
+        Inicializa o conselheiro.
+
+        index: índice do dicionário
+        wheel_: roleta do jogo (por omissão a roleta normal)
+        turn_value: valor atribuído a manter a vez
+        round_value: valor atribuído a ganhar a ronda, além do dinheiro
+        cache_size: número máximo de estados guardados na cache
+        max_split: número máximo de candidatos de uma palavra para estimar
+            o efeito de uma letra na probabilidade de acertar
+        """
+        self.index = index
+        self.turn_value = turn_value
+        self.round_value = round_value
+        self.max_split = max_split
+        houses = (wheel_ or wheel.Wheel()).houses
+        weights = (wheel_.weights if wheel_ else None) or [1] * len(houses)
+        total = sum(weights)
+        # Probabilidade de cada casa da roleta
+        self.houses = [(h, w / total) for h, w in zip(houses, weights)]
+        self.stats = lru_cache(maxsize=cache_size)(self._stats)
+
+    def _stats(self: Advisor, patterns: tuple[str, ...], excluded: int,
+               tried: int, free_vowels: int, free_consonants: int) -> _Stats:
+        """
+        Calcula as probabilidades do estado canónico dado.
+        """
+        analysis = Analysis.from_patterns(self.index, patterns, excluded,
+                                          tried)
+        p_solve = 1.0
+        for _, _, _, count in analysis.words:
+            p_solve *= 1 / count if count else 0.0
+        cons = analysis.best_letter(free_consonants)
+        vowel = analysis.best_letter(free_vowels)
+        return _Stats(p_solve, cons, *self.letter_stats(analysis, cons),
+                      vowel, *self.letter_stats(analysis, vowel))
+
+    def letter_stats(self: Advisor, analysis: Analysis,
+                     letter: str | None) -> tuple[float, float, float]:
+        """
+        Devolve a probabilidade de `letter` existir no puzzle, o número
+        esperado de ocorrências caso exista, e a probabilidade de acertar na
+        solução depois de a letra ser pedida.
+        """
+        if letter is None:
+            return 0.0, 0.0, 0.0
+
+        p = analysis.letter_chance(letter)
+        expected = 0.0
+        for _, pattern, bits, count in analysis.words:
+            n = len(pattern)
+            if count:
+                for k in range(1, n + 1):
+                    with_k = self.index.times.get((n, letter, k), 0)
+                    expected += k * (bits & with_k).bit_count() / count
+            else:
+                expected += self.index.prior[letter]
+
+        return p, (expected / p if p else 0.0), \
+            self.solve_after(analysis, letter)
+
+    def solve_after(self: Advisor, analysis: Analysis, letter: str) -> float:
+        """
+        Devolve a probabilidade esperada de acertar na solução depois de se
+        saber onde está `letter`. Os candidatos de cada palavra dividem-se
+        em classes pelas posições da letra; escolhendo ao acaso dentro da
+        classe certa, a probabilidade de acertar é nº de classes / nº de
+        candidatos.
+        """
+        p = 1.0
+        for _, pattern, bits, count in analysis.words:
+            if not count or count > self.max_split:
+                return 0.0
+            words = self.index.decode(len(pattern), bits)
+            classes = {tuple(i for i, c in enumerate(w) if c == letter)
+                       for w in words}
+            p *= len(classes) / count
+
+        return p
+
+    def advise(self: Advisor, game: wheel.Game,
+               rejected: set[str] | None = None) -> Advice:
+        """
+        Devolve o conselho para o jogador atual do jogo `game`.
+
+        game: jogo a analisar
+        rejected: soluções já tentadas sem sucesso
+        """
+        cpz = game.current_puzzle
+        analysis = Analysis(self.index, cpz)
+        patterns = tuple(sorted(p for _, p, _, _ in analysis.words))
+        stats = self.stats(patterns, analysis.excluded, analysis.tried,
+                           game.free_vowels, game.free_consonants)
+        money = game.current_player.money_round
+        p_solve = stats.p_solve
+        if rejected and analysis.answer() in rejected:
+            p_solve = 0.0
+        prize = money + self.round_value
+        # Perder a vez custa a vez e, se a solução já for provável, a ronda
+        lose = self.turn_value + p_solve * prize
+        solve = p_solve * prize - (1 - p_solve) * lose
+
+        spin = 0.0
+        for house, p in self.houses:
+            if house > 0:
+                gain = stats.p_cons * house * stats.n_cons
+                gain += (stats.s_cons - p_solve) * prize
+                spin += p * (gain - (1 - stats.p_cons) * lose)
+            elif house == -1:
+                spin -= p * (money + lose)
+            elif house == -2:
+                spin += p * lose
+            elif house == -3:
+                spin -= p * lose
+
+        values = {'r': spin}
+        if p_solve > 0:
+            values['f'] = solve
+        if money >= wheel.VOWEL_PRICE and stats.vowel is not None:
+            left = prize - wheel.VOWEL_PRICE
+            values['v'] = -wheel.VOWEL_PRICE + \
+                (stats.s_vowel - p_solve) * left - (1 - stats.p_vowel) * lose
+
+        best = max(values, key=values.get)
+        return Advice(best, values, (stats.cons, stats.vowel))
+
+
+def render_hint(advice: Advice) -> str:
+    """
+    Devolve o texto do conselho, no formato do comando "#".
+    """
+    lines = ["  Conselho:"]
+    for command, value in sorted(advice.values.items(),
+                                 key=lambda item: -item[1]):
+        mark = "*" if command == advice.best else "-"
+        lines.append(f"? {mark} {command} {value:.0f}")
+    cons, vowel = advice.letters
+    lines.append(f"? {cons or '-'} {vowel or '-'}")
+    return "\n".join(lines)
+
+
+def make_advisor_bot(advisor: Advisor):
+    """
+    Devolve a função de decisão de um jogador que escolhe o comando com
+    maior valor esperado e as letras com o jogador de `solver.py`.
+
+    advisor: conselheiro a usar
+    """
+    letters = make_solver_bot(advisor.index)
+    rejected = set()  # Soluções já tentadas
+
+    def bot(game: wheel.Game) -> str:
+        if game.pending == wheel.PROMPT_COMMAND:
+            return advisor.advise(game, rejected).best
+        answer = letters(game)
+        if game.pending == wheel.PROMPT_SOLVE:
+            rejected.add(answer)
+        return answer
+
+    return bot
+
+
+class HintUI(wheel.UI):
+    """
+    Representa a interface do terminal com o comando de ajuda "?".
+    """
+    def __init__(self: HintUI, advisor: Advisor):
+        super().__init__()
+        self.advisor = advisor
+
+    def hint(self: HintUI, answer: str) -> str | None:
+        """
+        Responde ao comando "?" com o conselho para a jogada atual.
+
+        answer: resposta do utilizador
+        """
+        if self.game.pending == wheel.PROMPT_COMMAND and \
+                wheel.clean_text(answer) == HINT_COMMAND:
+            return render_hint(self.advisor.advise(self.game))
+        return None
+
+
+def main():
+    HintUI(Advisor(WordIndex.from_file())).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark de `clean_text`: compara a normalização por tabela de
+tradução com a implementação original (cadeia de `re.sub`).
+
+Uso: python benchmarks/bench_clean_text.py [--lines N] [--repeat R]
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from wheel import clean_text, clean_texts  # noqa: E402
+
+
+def clean_text_regex(s: str) -> str:
+    """
+    Implementação original de `clean_text`, usada como referência.
+    """
+    s = s.lower().strip()
+    s = re.sub(r'[áàãâä]', 'a', s)
+    s = re.sub(r'[éèêë]', 'e', s)
+    s = re.sub(r'[íìîï]', 'i', s)
+    s = re.sub(r'[óòõôö]', 'o', s)
+    s = re.sub(r'[úùûü]', 'u', s)
+    s = re.sub(r'[ç]', 'c', s)
+    s = re.sub(r'[ñ]', 'n', s)
+    s = re.sub(r'[ýÿ]', 'y', s)
+    return s
+
+
+def make_corpus(n: int, seed: int = 0) -> list[str]:
+    """
+    Gera `n` linhas de puzzles sintéticos com acentos.
+
+    n: número de linhas
+    seed: semente do gerador
+    """
+    rng = random.Random(seed)
+    words = ["Lago", "Cisnes", "Pão", "Coração", "Ação", "Jardins", "Palácio",
+             "Glória", "Anões", "Índia", "Pêssego", "Ninõ", "Über", "Ýr"]
+    lines = []
+    for _ in range(n):
+        k = rng.randint(2, 8)
+        lines.append(" ".join(rng.choice(words) for _ in range(k)) + "\n")
+
+    return lines
+
+
+def report(label: str, seconds: float, n: int):
+    """
+    Apresenta o tempo total e o tempo por chamada.
+    """
+    print(f"{label:<32}{seconds:9.3f} s  {seconds / n * 1e9:9.1f} ns/item")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Entradas de um carácter (comandos e letras)
+    chars = list("rRiIfFpPvVqQcC#áÁçÇ") * 5000
+    for s in set(chars):
+        assert clean_text(s) == clean_text_regex(s), s
+
+    print(f"-- {len(chars)} entradas de um carácter")
+    t = min(timeit.repeat(lambda: [clean_text_regex(c) for c in chars],
+                          number=1, repeat=args.repeat))
+    report("regex", t, len(chars))
+    t = min(timeit.repeat(lambda: [clean_text(c) for c in chars],
+                          number=1, repeat=args.repeat))
+    report("tabela + cache", t, len(chars))
+
+    # Corpus de puzzles
+    corpus = make_corpus(args.lines)
+    assert list(clean_texts(corpus[:1000])) == \
+        [clean_text_regex(s) for s in corpus[:1000]]
+
+    print(f"-- corpus de {len(corpus)} linhas")
+    t = min(timeit.repeat(lambda: [clean_text_regex(s) for s in corpus],
+                          number=1, repeat=args.repeat))
+    report("regex", t, len(corpus))
+    t = min(timeit.repeat(lambda: [clean_text(s) for s in corpus],
+                          number=1, repeat=args.repeat))
+    report("tabela", t, len(corpus))
+    t = min(timeit.repeat(lambda: list(clean_texts(corpus)),
+                          number=1, repeat=args.repeat))
+    report("tabela (em bloco)", t, len(corpus))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Mede a memória ocupada por cada jogo em curso: cria N jogos sobre a mesma
+lista de puzzles, joga alguns passos em cada um e apresenta os bytes por
+jogo (medidos com `tracemalloc`).
+
+Uso: python benchmarks/bench_memory.py [--games N] [--steps K]
+"""
+
+from __future__ import annotations
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--players", type=int, default=3)
+    parser.add_argument("--puzzles", default=os.path.join(
+        os.path.dirname(__file__), os.pardir, "puzzles.txt"))
+    args = parser.parse_args()
+
+    random.seed(0)
+    base = wheel.Puzzles(args.puzzles)
+    names = [f"p{i}" for i in range(args.players)]
+    answers = "rbrcrdrlrmrnrsrt"
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = []
+    for _ in range(args.games):
+        game = wheel.Game('', names, 4, puzzles=base.session())
+        for answer in answers[:args.steps]:
+            game.step(answer)
+        games.append(game)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    total = after - before
+    print(f"{len(games)} jogos: {total / 2**20:.1f} MiB, "
+          f"{total / len(games):.0f} bytes por jogo")
+
+
+if __name__ == "__main__":
+    main()
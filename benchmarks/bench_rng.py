@@ -0,0 +1,87 @@
+"""
+Compara o gerador do módulo `random` (partilhado) com os geradores próprios
+de cada jogo (`wheel.game_rng`): voltas da roleta por segundo, com roleta
+normal e com pesos, puzzles tirados por segundo, o custo de criar o gerador
+de um jogo e jogos completos por segundo com cada um.
+
+Uso: python benchmarks/bench_rng.py [--spins N] [--games G]
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+from simulator import make_bot  # noqa: E402
+
+
+def rate(fn, n: int) -> float:
+    """
+    Devolve o número de chamadas de `fn` por segundo (melhor de 3).
+    """
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+def games_rate(bank: wheel.Puzzles, games: int, own: bool) -> float:
+    """
+    Devolve o número de jogos completos por segundo, com um gerador próprio
+    por jogo (`own`) ou com o do módulo `random`.
+    """
+    random.seed(0)
+    names = ['a', 'b', 'c']
+    start = time.perf_counter()
+    for game_no in range(games):
+        rng = wheel.game_rng(0, game_no) if own else random
+        game = wheel.Game(None, names, 4, puzzles=bank.session(False),
+                          rng=rng)
+        wheel.play(game, [make_bot(rng=rng) for _ in names])
+    return games / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--spins", type=int, default=200_000)
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--puzzles", default="puzzles.txt")
+    args = parser.parse_args()
+
+    plain = wheel.Wheel()
+    weighted = wheel.Wheel(weights=[1 + i % 3 for i in range(20)])
+    rng = wheel.game_rng(0, 1)
+    bank = wheel.Puzzles(args.puzzles)
+    deck = wheel.PuzzleDeck(len(bank.puzzles), ordered=False)
+
+    rows = [
+        ("volta (roleta normal)", lambda: plain.spin(),
+         lambda: plain.spin(rng)),
+        ("volta (roleta com pesos)", lambda: weighted.spin(),
+         lambda: weighted.spin(rng)),
+        ("puzzle tirado", lambda: deck.draw(), lambda: deck.draw(rng)),
+    ]
+    print(f"{'':<28}{'global/s':>12}{'próprio/s':>12}{'razão':>8}")
+    for label, shared, own in rows:
+        a, b = rate(shared, args.spins), rate(own, args.spins)
+        print(f"{label:<28}{a:>12,.0f}{b:>12,.0f}{b / a:>8.2f}")
+
+    n = args.spins // 10
+    per = 1e6 / rate(lambda: wheel.game_rng(12345, 678), n)
+    print(f"criar o gerador de um jogo: {per:.1f} µs")
+
+    a = games_rate(bank, args.games, False)
+    b = games_rate(bank, args.games, True)
+    print(f"{'jogo completo':<28}{a:>12,.0f}{b:>12,.0f}{b / a:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
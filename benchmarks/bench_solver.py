@@ -0,0 +1,78 @@
+"""
+Mede o tempo de construção do índice de padrões do jogador automático e o
+tempo de cada pesquisa de candidatos, para um dicionário sintético do
+tamanho pedido (palavras formadas por sílabas ao acaso).
+
+Uso: python benchmarks/bench_solver.py [--words N] [--queries Q]
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+from solver import WordIndex  # noqa: E402
+
+SYLLABLES = [c + v for c in "bcdfglmnprstvxz" for v in "aeiou"] + \
+    ["ao", "ca", "lha", "nho", "que", "gui", "ra", "es", "os", "as"]
+
+
+def make_words(n: int, seed: int = 0) -> list[str]:
+    """
+    Gera `n` palavras sintéticas diferentes.
+    """
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choice(SYLLABLES)
+                          for _ in range(rng.randint(1, 6))))
+
+    return list(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--words", type=int, default=300_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    words = make_words(args.words)
+    t = time.perf_counter()
+    index = WordIndex(words)
+    print(f"índice de {len(words)} palavras: "
+          f"{time.perf_counter() - t:.2f} s")
+
+    rng = random.Random(1)
+    queries = []
+    for _ in range(args.queries):
+        word = rng.choice(words)
+        shown = set(rng.sample(sorted(set(word)),
+                               rng.randint(0, len(set(word)))))
+        pattern = "".join(c if c in shown else '-' for c in word)
+        absent = [c for c in "bcdfglmnprstvz" if c not in word]
+        excluded = wheel.letter_mask(rng.sample(absent,
+                                                min(len(absent), 3)))
+        queries.append((pattern, excluded))
+
+    times = []
+    found = 0
+    for pattern, excluded in queries:
+        t = time.perf_counter()
+        bits = index._candidates(pattern, excluded)
+        times.append(time.perf_counter() - t)
+        found += bits.bit_count()
+    times.sort()
+    print(f"{len(queries)} pesquisas: média "
+          f"{sum(times) / len(times) * 1e6:.0f} us, p50 "
+          f"{times[len(times) // 2] * 1e6:.0f} us, p99 "
+          f"{times[int(len(times) * 0.99)] * 1e6:.0f} us, "
+          f"{found / len(queries):.1f} candidatos em média")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Mede o arranque a frio do motor do jogo: o tempo de um processo novo que só
+importa `wheel`, menos o de um processo que não faz nada, e verifica que
+fica dentro do orçamento. A importação corre com o stdin fechado e num
+diretório sem ficheiro de puzzles, pelo que falha se tentar usar algum dos
+dois.
+
+Uso: python benchmarks/bench_startup.py [--runs N] [--budget MS]
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def cold_start(code: str, runs: int, cwd: str) -> float:
+    """
+    Devolve a mediana, em milissegundos, do tempo de `runs` processos que
+    executam `code`.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=cwd,
+                       env=env, stdin=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--budget", type=float, default=25.0,
+                        help="tempo máximo da importação, em ms")
+    args = parser.parse_args()
+
+    # Gera os .pyc antes de medir
+    subprocess.run([sys.executable, "-m", "compileall", "-q",
+                    os.path.join(ROOT, "wheel.py")], check=True)
+    with tempfile.TemporaryDirectory() as cwd:
+        base = cold_start("pass", args.runs, cwd)
+        engine = cold_start("import wheel", args.runs, cwd)
+
+    cost = engine - base
+    print(f"interpretador: {base:.1f} ms, com o motor: {engine:.1f} ms, "
+          f"importação: {cost:.1f} ms (orçamento {args.budget:.0f} ms)")
+    if cost > args.budget:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
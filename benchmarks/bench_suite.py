@@ -0,0 +1,378 @@
+"""
+Conjunto de benchmarks dos caminhos críticos do jogo, reprodutível: os
+corpora de puzzles são sintéticos, gerados com sementes fixas (frases curtas,
+longas e cheias de acentos, de 10 a 10 milhões de puzzles), e cada medida
+tem aquecimento, várias amostras e estatísticas (mediana, quartis, desvio).
+
+Mede `clean_text`, `Puzzle.find_letter`, o carregamento dos puzzles (lista
+completa, índice preguiçoso e banco compilado), `Wheel.spin`, o comando de
+inventário e jogos completos (com jogadores automáticos e os testes do
+Mooshak pela interface).
+
+Com `--save`, grava os resultados em JSON; com `--baseline`, compara-os com
+os de uma corrida anterior e assinala as medidas mais lentas (mediana pior
+do que o limiar e quartis sem sobreposição); `--compare A B` compara dois
+ficheiros já gravados. Em ambos os casos termina com código 1 se houver
+medidas mais lentas.
+
+Uso: python benchmarks/bench_suite.py [--sizes 10,10000,1000000]
+         [--only PADRÃO] [--save F] [--baseline F]
+     python benchmarks/bench_suite.py --compare ANTES.json DEPOIS.json
+"""
+
+from __future__ import annotations
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+
+import mooshak_batch  # noqa: E402
+import wheel  # noqa: E402
+from simulator import make_bot  # noqa: E402
+
+SEED = 20240601
+KINDS = ('short', 'long', 'accents')
+TOPICS = ("Filme", "Lugar", "Pessoa", "Livro", "Bailado", "Música", "Prato",
+          "Provérbio", "Desporto", "Animal", "Profissão", "Ciência")
+SYLLABLES = [c + v for c in "bcdfglmnprstvz" for v in "aeiou"] + \
+    ["ao", "lha", "nho", "que", "gui", "ra", "es", "os", "as"]
+ACCENTED = [c + v for c in "bcçdfglmnprstvz" for v in "áàãâéêíóõôú"] + \
+    ["ção", "ões", "ães", "çã", "ü"]
+# Palavras por frase, por tipo de corpus
+WORDS = {'short': (1, 3), 'long': (8, 20), 'accents': (2, 8)}
+
+
+def make_vocabulary(kind: str, rng: random.Random,
+                    size: int = 5000) -> list[str]:
+    """
+    Devolve `size` palavras sintéticas para o corpus do tipo `kind`.
+    """
+    syllables = SYLLABLES + ACCENTED * 3 if kind == 'accents' else SYLLABLES
+    words = []
+    for _ in range(size):
+        word = "".join(rng.choices(syllables, k=rng.randint(1, 4)))
+        words.append(word.capitalize() if rng.random() < 0.3 else word)
+    return words
+
+
+def make_corpus(path: str, n: int, kind: str, seed: int = SEED):
+    """
+    Escreve em `path` um ficheiro de `n` puzzles sintéticos do tipo `kind`.
+    O mesmo tamanho, tipo e semente dão sempre o mesmo ficheiro.
+    """
+    rng = random.Random(f'{seed}:{kind}')
+    vocabulary = make_vocabulary(kind, rng)
+    low, high = WORDS[kind]
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        block = []
+        for _ in range(n):
+            words = rng.choices(vocabulary, k=rng.randint(low, high))
+            block.append(f'{rng.choice(TOPICS)}: {" ".join(words)}\n')
+            if len(block) >= 10000:
+                f.writelines(block)
+                block.clear()
+        f.writelines(block)
+    os.replace(tmp, path)
+
+
+def corpus(cache: str, n: int, kind: str) -> str:
+    """
+    Devolve o caminho do corpus de `n` puzzles do tipo `kind`, gerando-o
+    na primeira vez.
+    """
+    path = os.path.join(cache, f'corpus-{kind}-{n}-{SEED}.txt')
+    if not os.path.exists(path):
+        make_corpus(path, n, kind)
+    return path
+
+
+def sample_lines(cache: str, kind: str, n: int = 1000) -> list[str]:
+    """
+    Devolve as primeiras `n` frases do corpus do tipo `kind`.
+    """
+    with open(corpus(cache, n, kind), 'r', encoding='utf-8') as f:
+        return [line.split(': ', 1)[1] for line in f]
+
+
+def measure(fn, ops: int, repeat: int, min_time: float,
+            warmup: float) -> dict:
+    """
+    Mede `fn`: aquece durante `warmup` segundos, calibra o número de
+    chamadas por amostra para que cada amostra dure pelo menos `min_time`
+    e tira `repeat` amostras. Devolve as estatísticas do tempo por
+    operação, em segundos (cada chamada de `fn` conta `ops` operações).
+    """
+    end = time.perf_counter() + warmup
+    start = time.perf_counter()
+    fn()
+    once = time.perf_counter() - start
+    while time.perf_counter() < end:
+        fn()
+    number = max(1, int(min_time / max(once, 1e-9)))
+
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            times.append((time.perf_counter() - start) / (number * ops))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    q1, median, q3 = statistics.quantiles(times, n=4, method='inclusive') \
+        if len(times) > 1 else times * 3
+    return {
+        'ops': ops, 'number': number, 'times': times,
+        'median': median, 'q1': q1, 'q3': q3,
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'min': min(times),
+    }
+
+
+def cases(cache: str, sizes: list[int], eager_max: int):
+    """
+    Devolve os benchmarks como pares (nome, preparação). Cada preparação
+    devolve a função a medir e o número de operações de cada chamada; só
+    é chamada se o benchmark for escolhido.
+    """
+    for kind in KINDS:
+        def clean(kind=kind):
+            lines = sample_lines(cache, kind)
+            return lambda: [wheel.clean_text(s) for s in lines], len(lines)
+        yield f'clean_text/{kind}', clean
+
+        def find_letter(kind=kind):
+            protos = [wheel.Puzzle('T', s, ': ')
+                      for s in sample_lines(cache, kind, 100)]
+            letters = "aeiouáéçbcdfghjklmnpqrstvwxyz"
+
+            def run():
+                for proto in protos:
+                    p = proto.fresh()
+                    for c in letters:
+                        p.find_letter(c)
+            return run, len(protos) * len(letters)
+        yield f'find_letter/{kind}', find_letter
+
+    for n in sizes:
+        for kind in ('short', 'long'):
+            if n <= eager_max:
+                def eager(n=n, kind=kind):
+                    path = corpus(cache, n, kind)
+                    return lambda: wheel.Puzzles(path), 1
+                yield f'load/eager/{kind}/{n}', eager
+
+            def lazy(n=n, kind=kind):
+                path = corpus(cache, n, kind)
+                return lambda: wheel.Puzzles(path, lazy=True), 1
+            yield f'load/lazy/{kind}/{n}', lazy
+
+            def bank(n=n, kind=kind):
+                path = corpus(cache, n, kind)
+                # Fora do caminho de `Puzzles.open_bank`, para não mudar
+                # as outras medidas
+                name = path + '.bench-bank'
+                if not os.path.exists(name):
+                    wheel.compile_puzzles(path, name)
+                return lambda: wheel.BankPuzzleList(name, ': '), 1
+            yield f'load/bank/{kind}/{n}', bank
+
+    def spin(weights=None):
+        w = wheel.Wheel(weights=weights)
+        rng = random.Random(SEED)
+        spin = w.spin
+        return lambda: [spin(rng) for _ in range(1000)], 1000
+    yield 'wheel.spin/plain', spin
+    yield 'wheel.spin/weighted', lambda: spin([1 + i % 3 for i in range(20)])
+
+    def inventory():
+        game = wheel.Game(None, ['Ana', 'Bruno', 'Carla', 'Duarte'], 4,
+                          puzzles=bank_puzzles(), rng=random.Random(SEED))
+        game.start()
+        return lambda: [wheel.render_event(e) for e in game.step('i')], 1
+    yield 'command/inventario', inventory
+
+    def bot_games():
+        puzzles = bank_puzzles()
+
+        def run():
+            for i in range(20):
+                rng = wheel.game_rng(SEED, i)
+                game = wheel.Game(None, ['a', 'b', 'c'], 4,
+                                  puzzles=puzzles.session(False), rng=rng)
+                wheel.play(game, [make_bot(rng=rng) for _ in range(3)])
+        return run, 20
+    yield 'game/bots', bot_games
+
+    def mooshak_games():
+        tests = mooshak_batch.load_cases(mooshak_batch.TESTS_FILE)
+        puzzles = os.path.join(ROOT, 'puzzles.txt')
+
+        def run():
+            for case in tests:
+                mooshak_batch.run_game(case.input, 'random.seed(2)',
+                                       puzzles)
+        return run, len(tests)
+    yield 'game/mooshak', mooshak_games
+
+
+def bank_puzzles() -> wheel.Puzzles:
+    """
+    Devolve os puzzles do jogo (`puzzles.txt`).
+    """
+    return wheel.Puzzles(os.path.join(ROOT, 'puzzles.txt'))
+
+
+def metadata() -> dict:
+    """
+    Devolve a descrição da máquina e da versão do código medidas.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.platform(),
+        'cpus': os.cpu_count(),
+        'commit': commit,
+        'seed': SEED,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def fmt_time(seconds: float) -> str:
+    """
+    Devolve o tempo `seconds` com a unidade adequada.
+    """
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3g} {unit}'
+    return f'{seconds / 1e-9:.3g} ns'
+
+
+def report(name: str, r: dict):
+    """
+    Escreve a linha do benchmark `name`.
+    """
+    spread = r['stdev'] / r['mean'] * 100 if r['mean'] else 0.0
+    rate = 1 / r['median']
+    rate = f'{rate:,.0f}' if rate >= 100 else f'{rate:.3g}'
+    print(f"{name:<30}{fmt_time(r['median']):>12}"
+          f"{fmt_time(r['q1']):>12}{fmt_time(r['q3']):>12}"
+          f"{spread:>8.1f}%{rate:>14}", flush=True)
+
+
+def compare(old: dict, new: dict, threshold: float) -> int:
+    """
+    Compara os resultados `new` com `old` e escreve uma linha por medida
+    comum. Uma medida é mais lenta (ou mais rápida) se a mediana mudar mais
+    do que `threshold` e os intervalos entre quartis não se sobrepuserem.
+    Devolve o número de medidas mais lentas.
+    """
+    slower = 0
+    print(f"{'':<30}{'antes':>12}{'depois':>12}{'razão':>8}")
+    for name, b in new['results'].items():
+        a = old['results'].get(name)
+        if a is None:
+            continue
+        ratio = b['median'] / a['median']
+        verdict = ''
+        if ratio > 1 + threshold and b['q1'] > a['q3']:
+            verdict = 'MAIS LENTO'
+            slower += 1
+        elif ratio < 1 - threshold and b['q3'] < a['q1']:
+            verdict = 'mais rápido'
+        elif abs(ratio - 1) > threshold:
+            verdict = '(ruído)'
+        print(f"{name:<30}{fmt_time(a['median']):>12}"
+              f"{fmt_time(b['median']):>12}{ratio:>8.2f}  {verdict}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.
+                                     RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,10000,1000000",
+                        help="tamanhos dos corpora, separados por vírgulas")
+    parser.add_argument("--eager-max", type=int, default=100_000,
+                        help="maior corpus carregado com todos os puzzles")
+    parser.add_argument("--only", default="*",
+                        help="só os benchmarks com este padrão (fnmatch)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05,
+                        help="duração mínima de cada amostra, em segundos")
+    parser.add_argument("--warmup", type=float, default=0.1,
+                        help="aquecimento de cada benchmark, em segundos")
+    parser.add_argument("--cache", default=os.path.join(
+        tempfile.gettempdir(), "wheel-bench"),
+                        help="diretório dos corpora gerados")
+    parser.add_argument("--save", default=None, help="grava os resultados")
+    parser.add_argument("--baseline", default=None,
+                        help="compara com os resultados deste ficheiro")
+    parser.add_argument("--compare", nargs=2, default=None,
+                        metavar=("ANTES", "DEPOIS"))
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="variação da mediana a assinalar (0.05 = 5%%)")
+    args = parser.parse_args()
+
+    if args.compare:
+        runs = []
+        for name in args.compare:
+            with open(name, 'r', encoding='utf-8') as f:
+                runs.append(json.load(f))
+        if compare(*runs, args.threshold):
+            raise SystemExit(1)
+        return
+
+    os.makedirs(args.cache, exist_ok=True)
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = {}
+    print(f"{'':<30}{'mediana':>12}{'q1':>12}{'q3':>12}{'desvio':>9}"
+          f"{'ops/s':>14}")
+    for name, setup in cases(args.cache, sizes, args.eager_max):
+        if not fnmatch.fnmatch(name, args.only):
+            continue
+        fn, ops = setup()
+        results[name] = measure(fn, ops, args.repeat, args.min_time,
+                                args.warmup)
+        report(name, results[name])
+        del fn
+
+    run = {'meta': metadata(), 'results': results}
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        print()
+        if compare(old, run, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Compila um ficheiro de puzzles num banco binário (`<ficheiro>.bank`), que o
+jogo passa a usar automaticamente enquanto o ficheiro de origem não mudar.
+
+Uso: python compile_puzzles.py [ficheiro] [--bank BANCO] [--sep SEP]
+"""
+
+from __future__ import annotations
+import argparse
+
+from wheel import compile_puzzles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("file_name", nargs="?", default="puzzles.txt")
+    parser.add_argument("--bank", default=None)
+    parser.add_argument("--sep", default=": ")
+    args = parser.parse_args()
+
+    bank_name = compile_puzzles(args.file_name, args.bank, args.sep)
+    print(f'Banco "{bank_name}" criado.')
+
+
+if __name__ == "__main__":
+    main()
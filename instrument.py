@@ -0,0 +1,393 @@
+"""
+Instrumentação do ciclo de jogo: conta as jogadas por comando e guarda, para
+cada comando, histogramas da latência de cada fase da jogada:
+
+    input     escrita da saída e espera pela resposta do jogador
+    dispatch  limpeza da resposta e escolha do tratador
+    rules     regras do jogo (o tratador do comando ou da resposta)
+    render    texto dos acontecimentos e do pedido seguinte
+
+As jogadas são identificadas pelo comando (`r`, `v`, `f`...) ou, nas
+respostas a outros pedidos, pelo nome do pedido (`consonant`, `vowel`...).
+
+Com as métricas ligadas (`Game.metrics`), o comando `%` mostra o resumo em
+qualquer jogo; `%json` devolve-o em JSON; `%prof CMD...` liga ou desliga o
+perfilador por amostragem à volta dos comandos indicados e `%prof` mostra o
+que este recolheu; `%reset` apaga tudo. Sem métricas, o jogo só paga uma
+comparação por jogada.
+
+Uso: python instrument.py MÉTRICAS.json   (mostra o resumo de um ficheiro
+gravado com `wheel.py --metrics` ou `server.py --metrics`)
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import signal
+import time
+
+import wheel
+
+PHASES = ('input', 'dispatch', 'rules', 'render')
+INPUT, DISPATCH, RULES, RENDER = range(len(PHASES))
+UNKNOWN = '?'  # Comandos desconhecidos (para limitar o número de chaves)
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    """
+    Representa um histograma de latências, em nanossegundos, com baldes de
+    potências de 2: o balde k guarda os valores entre 2**(k-1) e 2**k - 1,
+    pelo que juntar um valor custa uma soma e um `bit_length`.
+    """
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self: Histogram):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0] * 64
+
+    def add(self: Histogram, ns: int):
+        """
+        Acrescenta a latência `ns` (em nanossegundos).
+        """
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+        self.buckets[ns.bit_length()] += 1
+
+    def merge(self: Histogram, other: Histogram):
+        """
+        Junta ao histograma as contagens de `other`.
+        """
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        for k, c in enumerate(other.buckets):
+            self.buckets[k] += c
+
+    def quantile(self: Histogram, q: float) -> int:
+        """
+        Devolve um majorante do quantil `q` (entre 0 e 1): o limite do
+        balde onde cai, que é no máximo o dobro do valor verdadeiro.
+        """
+        rank = q * (self.count - 1)
+        seen = 0
+        for k, c in enumerate(self.buckets):
+            seen += c
+            if rank < seen:
+                return min(self.max, (1 << k) - 1)
+        return self.max
+
+    def summary(self: Histogram) -> dict:
+        """
+        Devolve um resumo do histograma, com os baldes não vazios.
+        """
+        return {
+            'n': self.count,
+            'total_ns': self.total,
+            'mean_ns': self.total // self.count if self.count else 0,
+            **{f'p{round(q * 100)}_ns': self.quantile(q) for q in QUANTILES},
+            'max_ns': self.max,
+            'buckets': {k: c for k, c in enumerate(self.buckets) if c},
+        }
+
+
+class SamplingProfiler:
+    """
+    Representa um perfilador por amostragem: enquanto está armado, um
+    temporizador (SIGALRM) interrompe o programa a cada `interval` segundos
+    e conta a pilha de chamadas em curso. A primeira amostra de cada período
+    armado cai num instante ao acaso dentro do intervalo, para que os
+    comandos mais curtos do que o intervalo também sejam amostrados na
+    proporção do seu tempo. Só funciona na thread principal de sistemas com
+    `signal.setitimer`.
+
+    As pilhas são guardadas como tuplos de objetos de código, que custam
+    pouco a juntar dentro do tratador do sinal; os nomes só são calculados
+    nos relatórios.
+    """
+    __slots__ = ('interval', 'samples', 'previous', 'rng', 'armed')
+
+    def __init__(self: SamplingProfiler, interval: float = 1e-3):
+        """
+        Inicializa o perfilador, ainda sem o temporizador instalado.
+
+        interval: intervalo entre amostras, em segundos
+        """
+        if not hasattr(signal, 'setitimer'):
+            raise OSError('O perfilador precisa de signal.setitimer.')
+        self.interval = interval
+        self.samples = {}  # pilha (objetos de código, da base) -> amostras
+        self.previous = None  # Tratador do SIGALRM antes de instalar
+        # Gerador próprio: o do módulo `random` pertence aos jogos
+        self.rng = random.Random()
+        self.armed = False
+
+    def sample(self: SamplingProfiler, signum: int, frame):
+        """
+        Conta a pilha de chamadas interrompida (tratador do sinal). Os
+        sinais que chegam depois de desarmar, durante outra amostra ou
+        dentro do próprio perfilador (a armar ou a desarmar) são ignorados.
+        """
+        if not self.armed or frame.f_code in _OWN_CODE:
+            return
+        self.armed = False
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        key = tuple(reversed(stack))
+        self.samples[key] = self.samples.get(key, 0) + 1
+        self.armed = True
+
+    def install(self: SamplingProfiler):
+        """
+        Instala o tratador do SIGALRM.
+        """
+        if self.previous is None:
+            self.previous = signal.signal(signal.SIGALRM, self.sample)
+
+    def uninstall(self: SamplingProfiler):
+        """
+        Desarma o temporizador e repõe o tratador anterior do SIGALRM.
+        """
+        if self.previous is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous)
+            self.previous = None
+
+    def arm(self: SamplingProfiler):
+        """
+        Começa a amostrar.
+        """
+        first = self.interval * (1.0 - self.rng.random())
+        self.armed = True
+        signal.setitimer(signal.ITIMER_REAL, first, self.interval)
+
+    def disarm(self: SamplingProfiler):
+        """
+        Para de amostrar.
+        """
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        self.armed = False
+
+    def stacks(self: SamplingProfiler) -> dict[str, int]:
+        """
+        Devolve as amostras por pilha, no formato "dobrado" dos gráficos de
+        chamas: "ficheiro:função;ficheiro:função;..." -> amostras.
+        """
+        folded = {}
+        for stack, count in self.samples.items():
+            key = ';'.join(f'{os.path.basename(code.co_filename)}:'
+                           f'{code.co_qualname}' for code in stack)
+            folded[key] = folded.get(key, 0) + count
+        return folded
+
+    def top(self: SamplingProfiler, n: int = 10) -> list[tuple[str, int]]:
+        """
+        Devolve as `n` funções com mais amostras próprias (no topo da
+        pilha).
+        """
+        leaves = {}
+        for stack, count in self.stacks().items():
+            leaf = stack.rpartition(';')[2]
+            leaves[leaf] = leaves.get(leaf, 0) + count
+        return sorted(leaves.items(), key=lambda kv: -kv[1])[:n]
+
+
+_OWN_CODE = frozenset((SamplingProfiler.arm.__code__,
+                       SamplingProfiler.disarm.__code__))
+
+
+class Metrics:
+    """
+    Representa as métricas de um ou mais jogos: uma linha de histogramas
+    (um por fase) por comando, e o perfilador, que só corre à volta dos
+    comandos escolhidos. Pode ser partilhada por vários jogos (por exemplo,
+    por todas as sessões de um servidor).
+    """
+    __slots__ = ('table', 'last', 'profiled', 'profiler', 'interval')
+
+    def __init__(self: Metrics, interval: float = 1e-3):
+        """
+        Inicializa as métricas, vazias.
+
+        interval: intervalo entre amostras do perfilador, em segundos
+        """
+        self.table = {}  # comando -> histogramas, um por fase
+        self.last = None  # Comando da última jogada
+        self.profiled = set()  # Comandos à volta dos quais se amostra
+        self.profiler = None
+        self.interval = interval
+
+    def add(self: Metrics, key: str, phase: int, ns: int):
+        """
+        Acrescenta a latência `ns` da fase `phase` do comando `key`.
+        """
+        row = self.table.get(key)
+        if row is None:
+            row = self.table[key] = tuple(Histogram() for _ in PHASES)
+        row[phase].add(ns)
+
+    def step(self: Metrics, game: wheel.Game,
+             answer: str) -> list[wheel.Event]:
+        """
+        Faz o mesmo que `Game.step`, medindo a escolha do tratador e as
+        regras do jogo. Os comandos `%...` são tratados aqui e não mudam o
+        estado do jogo.
+        """
+        clock = time.perf_counter_ns
+        start = clock()
+        game.events = []
+        pending = game.pending
+        if pending == wheel.PROMPT_COMMAND and answer[:1] == '%':
+            game.events.append(self.command(answer[1:].split()))
+            self.last = '%'
+            return game.events
+        handler = game.ANSWERS[pending]
+        game.pending = wheel.PROMPT_COMMAND
+        answer = wheel.clean_text(answer)
+        if pending != wheel.PROMPT_COMMAND:
+            key = pending
+        else:
+            key = answer if answer in game.COMMANDS else UNKNOWN
+        rules = clock()
+        if key in self.profiled:
+            self.profiler.arm()
+            try:
+                handler(game, answer)
+            finally:
+                self.profiler.disarm()
+        else:
+            handler(game, answer)
+        end = clock()
+        row = self.table.get(key)
+        if row is None:
+            row = self.table[key] = tuple(Histogram() for _ in PHASES)
+        row[DISPATCH].add(rules - start)
+        row[RULES].add(end - rules)
+        self.last = key
+        return game.events
+
+    def command(self: Metrics, args: list[str]) -> wheel.Event:
+        """
+        Executa o comando `%` com os argumentos `args` e devolve o
+        acontecimento com a resposta.
+        """
+        if not args:
+            return wheel.Event('metrics', (self.report(),))
+        if args[0] == 'json':
+            return wheel.Event('metrics', (json.dumps(self.dump()),))
+        if args[0] == 'reset':
+            self.table.clear()
+            if self.profiler is not None:
+                self.profiler.samples.clear()
+            return wheel.Event('metrics', ('Métricas apagadas.',))
+        if args[0] == 'prof':
+            if len(args) == 1:
+                return wheel.Event('metrics', (self.profile_report(),))
+            try:
+                self.toggle(args[1:])
+            except (OSError, ValueError) as e:
+                return wheel.Event('metrics', (str(e),))
+            shown = ' '.join(sorted(self.profiled)) or '(nenhum)'
+            return wheel.Event('metrics', (f'A perfilar: {shown}',))
+        return wheel.Event('metrics', ('Uso: % | %json | %reset | '
+                                       '%prof [COMANDO...]',))
+
+    def toggle(self: Metrics, keys: list[str]):
+        """
+        Liga o perfilador à volta dos comandos `keys` que não o tinham e
+        desliga-o nos que o tinham. O tratador do sinal só fica instalado
+        enquanto houver algum comando a perfilar.
+        """
+        if self.profiler is None:
+            self.profiler = SamplingProfiler(self.interval)
+        self.profiled.symmetric_difference_update(keys)
+        if self.profiled:
+            self.profiler.install()
+        else:
+            self.profiler.uninstall()
+
+    def close(self: Metrics):
+        """
+        Desliga o perfilador.
+        """
+        self.profiled.clear()
+        if self.profiler is not None:
+            self.profiler.uninstall()
+
+    def dump(self: Metrics) -> dict:
+        """
+        Devolve todas as métricas num dicionário pronto para JSON: por
+        comando e por fase, o resumo do histograma, e as pilhas amostradas
+        pelo perfilador.
+        """
+        profiler = self.profiler
+        return {
+            'phases': PHASES,
+            'commands': {key: {phase: h.summary()
+                               for phase, h in zip(PHASES, row)}
+                         for key, row in self.table.items()},
+            'profile': {
+                'commands': sorted(self.profiled),
+                'interval': self.interval,
+                'stacks': {} if profiler is None else profiler.stacks(),
+            },
+        }
+
+    def report(self: Metrics) -> str:
+        """
+        Devolve a tabela do número de jogadas e da latência média e p99 de
+        cada fase, em microssegundos, por comando.
+        """
+        return render_report(self.dump())
+
+    def profile_report(self: Metrics) -> str:
+        """
+        Devolve as funções com mais amostras do perfilador.
+        """
+        if self.profiler is None or not self.profiler.samples:
+            return 'Sem amostras. Use %prof COMANDO para perfilar.'
+        total = sum(self.profiler.samples.values())
+        lines = [f'  Perfil ({total} amostras):']
+        for name, count in self.profiler.top():
+            lines.append(f'\t{count * 100 / total:5.1f}%  {name}')
+        return '\n'.join(lines)
+
+
+def render_report(dump: dict) -> str:
+    """
+    Devolve a tabela das métricas `dump` (ver `Metrics.dump`). As fases
+    sem medidas aparecem com um traço.
+    """
+    lines = ['  Métricas (µs, média/p99):',
+             f"\t{'Comando':<12}{'N':>8}" +
+             ''.join(f'{phase:>18}' for phase in PHASES)]
+    for key, phases in sorted(dump['commands'].items(),
+                              key=lambda kv: -kv[1]['rules']['n']):
+        n = max(s['n'] for s in phases.values())
+        cells = ''.join(f"{s['mean_ns'] / 1e3:>9.1f}/{s['p99_ns'] / 1e3:<8.1f}"
+                        if s['n'] else f"{'-':>9} {'':<8}"
+                        for s in phases.values())
+        lines.append(f'\t{key:<12}{n:>8}{cells}')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.
+                                     RawDescriptionHelpFormatter)
+    parser.add_argument("file")
+    args = parser.parse_args()
+    with open(args.file, 'r', encoding='utf-8') as f:
+        print(render_report(json.load(f)))
+
+
+if __name__ == "__main__":
+    main()
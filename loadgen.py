@@ -0,0 +1,191 @@
+"""
+Gerador de carga para o servidor do jogo (`server.py`): abre muitas sessões
+em simultâneo, cada uma jogada por um jogador automático, e mede o número de
+jogadas por segundo e a latência de cada jogada (do envio da resposta até à
+chegada do pedido seguinte).
+
+Opcionalmente abre também ligações paradas, que nunca respondem, para
+verificar que não atrasam as outras sessões.
+
+Uso: python loadgen.py [--host H] [--port P | --unix CAMINHO] [--sessions N]
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import random
+import time
+
+import wheel
+
+PROMPT_ENDINGS = (": ", "? ")
+
+
+class Bot:
+    """
+    Representa um jogador automático que responde aos pedidos do servidor
+    pelo texto do pedido. Usa o comando de espionagem para saber a solução
+    de cada puzzle e tenta resolvê-lo ao fim de algumas jogadas.
+    """
+    def __init__(self: Bot, rng: random.Random, rounds: int, players: int):
+        """
+        Inicializa o jogador.
+
+        rng: gerador de números aleatórios do jogador
+        rounds: número de rondas a pedir
+        players: número de concorrentes a pedir
+        """
+        self.rng = rng
+        self.rounds = rounds
+        self.players = players
+        self.secret = None  # Solução do puzzle atual, se conhecida
+
+    def read(self: Bot, text: str):
+        """
+        Lê as mensagens recebidas e guarda a solução mostrada pelo comando
+        de espionagem.
+        """
+        lines = text.split("\n")
+        for i, line in enumerate(lines):
+            if line == "  Spy:" and i + 2 < len(lines):
+                self.secret = lines[i+2].partition(": ")[2]
+
+    def answer(self: Bot, prompt: str) -> str:
+        """
+        Devolve a resposta ao pedido `prompt`.
+        """
+        rng = self.rng
+        if prompt.startswith("Quantas rondas"):
+            return str(self.rounds)
+        if prompt.startswith("Quantos concorrentes"):
+            return str(self.players)
+        if prompt.startswith("Nome do concorrente número"):
+            return "Bot" + "abcd"[int(prompt.split()[-1][:-1]) - 1]
+        if prompt.startswith("Resolva o puzzle"):
+            secret, self.secret = self.secret, None
+            return secret or ""
+        if prompt.endswith("Qual a consoante? "):
+            return rng.choice(wheel.CONSONANTS)
+        if prompt.endswith("Qual a vogal? "):
+            return rng.choice(wheel.VOWELS)
+        if prompt.endswith("(s/n)? "):
+            return rng.choice("sn")
+
+        # Pedido de comando
+        if self.secret is None:
+            return "#"
+        x = rng.random()
+        if x < 0.15:
+            return "f"
+        if x < 0.25:
+            return "v"
+        return "r"
+
+
+async def play(bot: Bot, reader: asyncio.StreamReader,
+               writer: asyncio.StreamWriter, latencies: list[float]) -> int:
+    """
+    Joga um jogo completo com o servidor e devolve o número de jogadas. A
+    latência de cada jogada é acrescentada a `latencies`.
+    """
+    buf = ""
+    turns = 0
+    sent = None
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            return turns
+        buf += data.decode("utf-8")
+        prompt = buf.rpartition("\n")[2]
+        if not prompt.endswith(PROMPT_ENDINGS):
+            continue
+
+        if sent is not None:
+            latencies.append(time.perf_counter() - sent)
+            turns += 1
+        bot.read(buf)
+        buf = ""
+        answer = bot.answer(prompt)
+        sent = time.perf_counter()
+        writer.write((answer + "\n").encode("utf-8"))
+
+
+async def connect(host: str, port: int, unix: str | None):
+    """
+    Abre uma ligação ao servidor.
+    """
+    if unix:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+
+async def client(idx: int, args, latencies: list[float]) -> int:
+    """
+    Joga `args.games` jogos seguidos, um por ligação, e devolve o número
+    total de jogadas.
+    """
+    rng = random.Random(args.seed * 1000003 + idx)
+    turns = 0
+    for _ in range(args.games):
+        reader, writer = await connect(args.host, args.port, args.unix)
+        try:
+            bot = Bot(rng, args.rounds, args.players)
+            turns += await play(bot, reader, writer, latencies)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+    return turns
+
+
+def quantile(values: list[float], q: float) -> float:
+    """
+    Devolve o quantil `q` da lista ordenada `values`.
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(args):
+    idle = []
+    for _ in range(args.idle):
+        idle.append(await connect(args.host, args.port, args.unix))
+
+    latencies = []
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(client(i, args, latencies)
+                                    for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    for _, writer in idle:
+        writer.close()
+
+    turns = sum(counts)
+    latencies.sort()
+    print(f"sessões: {args.sessions} (+{args.idle} paradas), "
+          f"jogos: {args.sessions * args.games}, jogadas: {turns}")
+    print(f"jogadas/s: {turns / elapsed:.0f}")
+    print(f"latência p50: {quantile(latencies, 0.5) * 1e3:.3f} ms, "
+          f"p99: {quantile(latencies, 0.99) * 1e3:.3f} ms, "
+          f"máx: {quantile(latencies, 1.0) * 1e3:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7000)
+    parser.add_argument("--unix", default=None,
+                        help="caminho de um socket Unix")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--games", type=int, default=1,
+                        help="jogos seguidos por sessão")
+    parser.add_argument("--idle", type=int, default=0,
+                        help="ligações paradas")
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Corre os testes do Mooshak dentro do próprio processo: o módulo do jogo é
+importado uma só vez e cada teste é jogado com a entrada e a saída
+redirecionadas, em vez de lançar um processo novo por teste. Os testes
+podem ser divididos por vários processos.
+
+Cada teste é comparado, linha a linha, com a saída esperada; por omissão
+só contam as linhas do `spy` (as que começam por "# "), como no Mooshak.
+
+O ficheiro de testes tem o formato de `01.raw/tests_wheel.txt`:
+
+    %NOME
+    %INPUT
+    ...
+    %OUTPUT
+    ...
+    %end
+
+Uso: python mooshak_batch.py [TESTES] [--workers W] [--repeat N]
+"""
+
+from __future__ import annotations
+import argparse
+import difflib
+import io
+import os
+import re
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import wheel
+
+TESTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "01.raw", "tests_wheel.txt")
+_CASE_RE = re.compile(r'^%(\S+)\n%INPUT\n(.*?)'
+                      r'^%OUTPUT\n(.*?)^%end', re.M | re.S)
+
+_config = None  # Configuração de cada processo
+# Exceções com que o jogo no terminal termina: fim da entrada, `q` e as
+# respostas inválidas que o jogo não trata (por exemplo, rondas não
+# numéricas)
+GAME_ENDINGS = (EOFError, SystemExit, ValueError)
+_puzzles = {}  # nome do ficheiro -> puzzles já carregados
+
+
+class Case(NamedTuple):
+    """
+    Representa um teste: nome, entrada e saída esperada.
+    """
+    name: str
+    input: str
+    output: str
+
+
+class Result(NamedTuple):
+    """
+    Representa o resultado de um teste.
+    """
+    name: str
+    ok: bool
+    diff: str
+
+
+def load_cases(file_name: str) -> list[Case]:
+    """
+    Lê os testes do ficheiro `file_name`.
+    """
+    with open(file_name, 'r', encoding="utf-8") as f:
+        return [Case(*m) for m in _CASE_RE.findall(f.read())]
+
+
+def run_game(text: str, mooshak: str, puzzles_file: str) -> str:
+    """
+    Joga um jogo com a entrada `text` e devolve tudo o que foi escrito no
+    stdout. As exceções de `GAME_ENDINGS` terminam o jogo como terminariam
+    o processo; as outras são propagadas. O ambiente, o stdin e o stdout
+    são repostos no fim.
+
+    text: entrada do jogo
+    mooshak: expressão do Mooshak (por exemplo, "random.seed(2)")
+    puzzles_file: ficheiro de puzzles
+    """
+    puzzles = _puzzles.get(puzzles_file)
+    if puzzles is None:
+        puzzles = _puzzles[puzzles_file] = wheel.Puzzles(puzzles_file)
+
+    environ = {key: os.environ.get(key)
+               for key in ('MOOSHAK', 'MOOSHAK_PUZZLES')}
+    os.environ['MOOSHAK'] = mooshak
+    os.environ['MOOSHAK_PUZZLES'] = puzzles_file
+    out = io.StringIO()
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdin, sys.stdout = io.StringIO(text), out
+    try:
+        wheel.UI(puzzles=puzzles).run()
+    except GAME_ENDINGS:
+        pass
+    finally:
+        sys.stdin, sys.stdout = stdin, stdout
+        for key, value in environ.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    return out.getvalue()
+
+
+def run_case(case: Case) -> Result:
+    """
+    Corre o teste `case` com a configuração do processo e compara a saída.
+    Um erro inesperado do jogo faz o teste falhar, com o traceback.
+    """
+    config = _config
+    try:
+        output = run_game(case.input, config['mooshak'], config['puzzles'])
+    except Exception:
+        return Result(case.name, False, traceback.format_exc())
+    got = output.splitlines(keepends=True)
+    expected = case.output.splitlines(keepends=True)
+    prefix = config['prefix']
+    if prefix:
+        got = [line for line in got if line.startswith(prefix)]
+        # A última linha pode não terminar com uma mudança de linha
+        if got and not got[-1].endswith("\n"):
+            got[-1] += "\n"
+    if got == expected:
+        return Result(case.name, True, "")
+
+    diff = difflib.unified_diff(expected, got, "esperado", "obtido")
+    return Result(case.name, False, "".join(diff))
+
+
+def _init_worker(config: dict):
+    """
+    Guarda a configuração no processo.
+    """
+    global _config
+    _config = config
+
+
+def run_cases(cases: list[Case], workers: int = 1,
+              mooshak: str = "random.seed(2)",
+              puzzles: str = "puzzles.txt",
+              prefix: str = "# ") -> list[Result]:
+    """
+    Corre os testes `cases` e devolve os resultados pela mesma ordem.
+
+    cases: testes a correr
+    workers: número de processos
+    mooshak: expressão do Mooshak avaliada no início de cada teste
+    puzzles: ficheiro de puzzles
+    prefix: só as linhas com este prefixo são comparadas (todas, se vazio)
+    """
+    config = {'mooshak': mooshak, 'puzzles': puzzles, 'prefix': prefix}
+    if workers <= 1:
+        _init_worker(config)
+        return list(map(run_case, cases))
+
+    chunksize = max(1, len(cases) // (workers * 4))
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(config,)) as pool:
+        return list(pool.map(run_case, cases, chunksize=chunksize))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.
+                                     RawDescriptionHelpFormatter)
+    parser.add_argument("tests", nargs="?", default=TESTS_FILE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mooshak", default="random.seed(2)",
+                        help="expressão avaliada no início de cada teste")
+    parser.add_argument("--puzzles", default="puzzles.txt")
+    parser.add_argument("--all-lines", action="store_true",
+                        help="compara todas as linhas, não só as do spy")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="corre cada teste N vezes (para medir)")
+    args = parser.parse_args()
+
+    cases = load_cases(args.tests) * args.repeat
+    start = time.perf_counter()
+    results = run_cases(cases, args.workers, args.mooshak, args.puzzles,
+                        "" if args.all_lines else "# ")
+    elapsed = time.perf_counter() - start
+
+    failed = [r for r in results if not r.ok]
+    shown = set()
+    for r in failed:
+        if r.name not in shown:
+            shown.add(r.name)
+            print(f"FALHOU {r.name}")
+            print(r.diff)
+    print(f"{len(results) - len(failed)} de {len(results)} teste(s) certo(s)"
+          f" em {elapsed:.2f} s ({elapsed / max(len(results), 1) * 1e3:.2f}"
+          f" ms por teste).")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
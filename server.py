@@ -0,0 +1,386 @@
+"""
+Servidor do jogo: aloja muitos jogos independentes em simultâneo, um por
+ligação, num socket TCP ou Unix local.
+
+O protocolo é o do terminal: o servidor escreve as mensagens do jogo e o
+pedido pendente (sem mudança de linha, como o `input`) e o cliente responde
+com uma linha por pedido, com os mesmos comandos de uma letra. Todas as
+sessões partilham o mesmo banco de puzzles, só de leitura; cada uma tem o
+seu próprio baralho.
+
+Cada sessão tem o seu próprio gerador aleatório, derivado da semente do
+servidor (`--seed`, escrita no arranque) e do número da sessão, pelo que
+qualquer sessão pode ser repetida tal e qual.
+
+Com `--metrics`, o servidor mede a latência de cada fase das jogadas de
+todas as sessões (ver `instrument`), que qualquer cliente pode consultar com
+o comando `%`, e grava-as em JSON ao terminar.
+
+Com `--turn-timeout`, um jogador que não responda a tempo perde a vez (como
+na casa "Perde vez"); a espera é feita pelo ciclo de eventos, sem threads.
+
+Com `--reload`, o servidor verifica periodicamente o ficheiro de puzzles e,
+se mudou, lê só o que mudou (ver `wheel.Puzzles.reload`) numa thread, sem
+parar as jogadas. Os jogos a decorrer continuam com o seu baralho; os novos
+usam a versão recarregada.
+
+Uso: python server.py [--host H] [--port P | --unix CAMINHO] [--puzzles F]
+         [--reload SEGUNDOS]
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import time
+
+import instrument
+import transcript
+import wheel
+
+LINE_LIMIT = 4096  # Tamanho máximo de uma linha enviada pelo cliente
+
+
+class Session:
+    """
+    Representa um jogo a decorrer numa ligação.
+    """
+    __slots__ = ('reader', 'writer', 'bank', 'game', 'turns',
+                 'turn_timeout', 'max_timeouts', 'log', 'rng', 'metrics')
+
+    def __init__(self: Session, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, bank: wheel.Puzzles,
+                 turn_timeout: float | None = None, max_timeouts: int = 3,
+                 log: transcript.TranscriptWriter | None = None,
+                 rng: random.Random | None = None,
+                 metrics: instrument.Metrics | None = None):
+        """
+        Inicializa a sessão.
+
+        reader: canal de leitura da ligação
+        writer: canal de escrita da ligação
+        bank: puzzles partilhados por todas as sessões
+        turn_timeout: prazo, em segundos, para responder a cada pedido;
+            sem prazo se for None
+        max_timeouts: número de prazos seguidos esgotados ao fim do qual a
+            ligação é fechada
+        log: registo onde gravar o jogo (ver `transcript`)
+        rng: gerador aleatório do jogo (por omissão, o do módulo `random`)
+        metrics: métricas onde medir cada jogada, partilhadas pelas sessões
+        """
+        self.reader = reader
+        self.writer = writer
+        self.bank = bank
+        self.game = None
+        self.turns = 0  # Número de respostas tratadas
+        self.turn_timeout = turn_timeout
+        self.max_timeouts = max_timeouts
+        self.log = log
+        self.rng = rng
+        self.metrics = metrics
+
+    async def ask(self: Session, text: str) -> str | None:
+        """
+        Envia `text` ao cliente e devolve a linha de resposta, sem a mudança
+        de linha. Devolve None se a ligação terminou e levanta TimeoutError
+        se a resposta não chegar dentro do prazo da sessão.
+
+        text: texto a enviar (normalmente acaba com o pedido)
+        """
+        self.writer.write(text.encode("utf-8"))
+        await self.writer.drain()
+        try:
+            line = await asyncio.wait_for(self.reader.readline(),
+                                          self.turn_timeout)
+        except (asyncio.LimitOverrunError, ValueError):
+            return None
+        if not line:
+            return None
+        return line.decode("utf-8", "replace").rstrip("\r\n")
+
+    async def set_initial_info(self: Session) -> tuple[int, list[str]] | None:
+        """
+        Pede ao cliente o número de rondas, o número de concorrentes e os
+        seus nomes, como `wheel.UI.set_initial_info`. Devolve None se a
+        ligação terminou. Os prazos esgotados propagam-se (TimeoutError).
+        """
+        notice = 'Bem-vindo/a ao jogo "A Roda da Sorte"!\n'
+        while True:
+            answer = await self.ask(notice + "Quantas rondas? ")
+            if answer is None:
+                return None
+            if not (answer.isdigit() and 1 <= int(answer) <= 4):
+                notice = "O número de rondas não é válido, deverá ser entre"
+                notice += " 1 e 4.\n"
+                continue
+            round_no = int(answer)
+
+            answer = await self.ask("Quantos concorrentes? ")
+            if answer is None:
+                return None
+            if not (answer.isdigit() and 1 <= int(answer) <= 4):
+                notice = "O número de concorrentes não é válido, deverá ser"
+                notice += " entre 1 e 4.\n"
+                continue
+
+            names = []
+            for i in range(1, int(answer)+1):
+                name = await self.ask(f"Nome do concorrente número {i}? ")
+                if name is None:
+                    return None
+                if not wheel.valid_name(name, names):
+                    break
+                names.append(name)
+            else:
+                return round_no, names
+
+            notice = "Nome inválido, tente novamente.\n"
+
+    async def run(self: Session):
+        """
+        Joga um jogo completo com o cliente.
+        """
+        info = await self.set_initial_info()
+        if info is None:
+            return
+        round_no, names = info
+        puzzles = self.bank.session(False)
+        try:
+            self.game = game = wheel.Game(None, names, round_no,
+                                          puzzles=puzzles, rng=self.rng,
+                                          metrics=self.metrics)
+            if self.log is None:
+                await self.play(game)
+                return
+
+            recorder = transcript.Recorder(game, self.log)
+            try:
+                await self.play(recorder)
+            finally:
+                recorder.close()
+        finally:
+            puzzles.release()
+
+    async def play(self: Session, driver: wheel.Game | transcript.Recorder):
+        """
+        Joga o jogo da sessão através de `driver` (o próprio jogo ou a sua
+        gravação).
+        """
+        game = self.game
+        metrics = game.metrics
+        clock = time.perf_counter_ns
+        lines = ["Vamos começar. Eis o puzzle. Boa sorte!"]
+        lines.extend(map(wheel.render_event, driver.start()))
+        if game.running:
+            lines.append(wheel.render_prompt(game))
+        timeouts = 0  # Prazos seguidos esgotados
+        while game.running:
+            start = clock()
+            try:
+                answer = await self.ask("\n".join(lines))
+            except asyncio.TimeoutError:
+                timeouts += 1
+                if timeouts >= self.max_timeouts:
+                    return
+                answered = clock()
+                events = driver.timeout()
+                key = 'timeout'
+                ruled = clock()
+                if metrics is not None:
+                    metrics.add(key, instrument.RULES, ruled - answered)
+                lines = [""]
+            else:
+                if answer is None:
+                    return
+                timeouts = 0
+                self.turns += 1
+                answered = clock()
+                events = driver.step(answer)
+                key = None if metrics is None else metrics.last
+                ruled = clock()
+                lines = []
+
+            lines.extend(map(wheel.render_event, events))
+            if game.running:
+                lines.append(wheel.render_prompt(game))
+            if metrics is not None:
+                metrics.add(key, instrument.INPUT, answered - start)
+                metrics.add(key, instrument.RENDER, clock() - ruled)
+
+        lines.append(wheel.render_event(game.spy()))
+        lines.append("Adeus!\n")
+        self.writer.write("\n".join(lines).encode("utf-8"))
+        await self.writer.drain()
+
+
+class Server:
+    """
+    Representa o servidor de jogos.
+    """
+    def __init__(self: Server, file_name: str, max_sessions: int = 1000,
+                 turn_timeout: float | None = None, max_timeouts: int = 3,
+                 log_dir: str | None = None, seed: int | None = None,
+                 metrics: instrument.Metrics | None = None,
+                 reload: float | None = None):
+        """
+        Inicializa o servidor e carrega o banco de puzzles.
+
+        file_name: nome do ficheiro (ou banco) de puzzles
+        max_sessions: número máximo de sessões em simultâneo
+        turn_timeout, max_timeouts: ver `Session`
+        log_dir: diretório onde gravar cada sessão num registo próprio
+        seed: semente principal dos geradores das sessões (por omissão,
+            uma ao acaso)
+        metrics: métricas onde medir as jogadas de todas as sessões
+        reload: segundos entre verificações do ficheiro de puzzles; sem
+            recargas se for None
+        """
+        self.bank = wheel.Puzzles(file_name, lazy=True)
+        if len(self.bank.puzzles) < 1:
+            raise ValueError("Não há puzzles para jogar.")
+        self.reload = reload
+        if reload is not None:
+            self.bank = self.bank.watch()
+        self.max_sessions = max_sessions
+        self.turn_timeout = turn_timeout
+        self.max_timeouts = max_timeouts
+        self.log_dir = log_dir
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), 'little')
+        self.seed = seed
+        self.metrics = metrics
+        self.session_no = 0  # Número de sessões já abertas
+        self.sessions = set()
+
+    async def handle(self: Server, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter):
+        """
+        Trata uma ligação nova.
+        """
+        try:
+            if len(self.sessions) >= self.max_sessions:
+                writer.write("Servidor cheio.\n".encode("utf-8"))
+                await writer.drain()
+                return
+
+            log = None
+            self.session_no += 1
+            if self.log_dir:
+                log = transcript.TranscriptWriter(os.path.join(
+                    self.log_dir, f'{os.getpid()}-{self.session_no:08}'
+                    f'{transcript.LOG_SUFFIX}'))
+            session = Session(reader, writer, self.bank, self.turn_timeout,
+                              self.max_timeouts, log,
+                              wheel.game_rng(self.seed, self.session_no),
+                              self.metrics)
+            self.sessions.add(session)
+            try:
+                await session.run()
+            finally:
+                self.sessions.discard(session)
+                if log is not None:
+                    log.close()
+        except (ConnectionError, ValueError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def watch(self: Server):
+        """
+        Recarrega o ficheiro de puzzles sempre que mude, verificando-o a
+        cada `reload` segundos. A recarga corre numa thread; as sessões que
+        começarem depois usam a nova versão, e a antiga é fechada quando
+        terminarem as sessões que a usam.
+        """
+        while True:
+            await asyncio.sleep(self.reload)
+            try:
+                bank = await asyncio.to_thread(self.bank.reload)
+            except (OSError, ValueError, UnicodeDecodeError) as e:
+                print(f"Recarga dos puzzles falhou: {e}", flush=True)
+                continue
+            if bank is not None:
+                old, self.bank = self.bank, bank
+                old.close()
+                print(f"Puzzles recarregados: {len(bank.puzzles)}",
+                      flush=True)
+
+    async def serve(self: Server, host: str = "127.0.0.1", port: int = 0,
+                    unix: str | None = None):
+        """
+        Aceita ligações até o processo ser interrompido.
+
+        host, port: endereço TCP onde escutar
+        unix: caminho de um socket Unix (substitui `host` e `port`)
+        """
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, unix,
+                                                     limit=LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(self.handle, host, port,
+                                                limit=LINE_LIMIT)
+        print(f"Semente: {self.seed}", flush=True)
+        for sock in server.sockets:
+            print(f"A escutar em {sock.getsockname()}", flush=True)
+        watcher = None
+        if self.reload is not None:
+            watcher = asyncio.create_task(self.watch())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7000)
+    parser.add_argument("--unix", default=None,
+                        help="caminho de um socket Unix")
+    parser.add_argument("--puzzles", default="puzzles.txt")
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--turn-timeout", type=float, default=None,
+                        help="segundos para responder a cada pedido")
+    parser.add_argument("--max-timeouts", type=int, default=3,
+                        help="prazos seguidos esgotados até fechar a ligação")
+    parser.add_argument("--log-dir", default=None,
+                        help="grava cada sessão neste diretório")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="semente principal (por omissão, ao acaso)")
+    parser.add_argument("--metrics", default=None, metavar="FICHEIRO",
+                        help="mede cada jogada (comando %%) e grava as "
+                             "métricas em JSON ao terminar")
+    parser.add_argument("--reload", type=float, default=None,
+                        metavar="SEGUNDOS",
+                        help="recarrega o ficheiro de puzzles quando mudar, "
+                             "verificando-o a cada SEGUNDOS")
+    args = parser.parse_args()
+
+    metrics = instrument.Metrics() if args.metrics else None
+    # SIGTERM termina o servidor como o Ctrl-C, para gravar as métricas
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    server = Server(args.puzzles, args.max_sessions, args.turn_timeout,
+                    args.max_timeouts, args.log_dir, args.seed, metrics,
+                    args.reload)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if metrics is not None:
+            metrics.close()
+            with open(args.metrics, 'w', encoding='utf-8') as f:
+                json.dump(metrics.dump(), f)
+
+
+if __name__ == "__main__":
+    main()
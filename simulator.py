@@ -0,0 +1,386 @@
+"""
+Simulador de Monte Carlo do jogo: joga muitos jogos com jogadores
+automáticos, distribuídos por vários processos, e estima a distribuição dos
+prémios, a taxa de bancarrotas e a duração dos jogos para uma dada roleta,
+prémio final e ficheiro de puzzles.
+
+Os jogos são divididos em blocos de tamanho fixo e cada jogo usa o seu
+próprio gerador aleatório, derivado da semente principal e do número do
+jogo (`wheel.game_rng`). Os resultados dos blocos são juntados pela ordem
+dos blocos, pelo que o resultado é o mesmo qualquer que seja o número de
+processos, e cada jogo é o mesmo qualquer que seja o tamanho dos blocos.
+
+Uso: python simulator.py [--games N] [--workers W] [--seed S] ...
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import transcript
+import wheel
+
+
+class LogSketch:
+    """
+    Representa um histograma com baldes de largura logarítmica, que permite
+    estimar quantis com erro relativo limitado por `alpha` e juntar-se a
+    outro histograma somando as contagens.
+    """
+    def __init__(self: LogSketch, alpha: float = 0.01):
+        """
+        Inicializa um histograma vazio.
+
+        alpha: erro relativo máximo dos quantis
+        """
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.zeros = 0  # Valores menores ou iguais a zero
+        self.buckets = {}  # índice do balde -> contagem
+        self.count = 0
+
+    def add(self: LogSketch, x: float):
+        """
+        Acrescenta o valor `x` ao histograma.
+        """
+        self.count += 1
+        if x <= 0:
+            self.zeros += 1
+        else:
+            k = math.ceil(math.log(x) / self.log_gamma)
+            self.buckets[k] = self.buckets.get(k, 0) + 1
+
+    def merge(self: LogSketch, other: LogSketch):
+        """
+        Junta ao histograma as contagens de `other`.
+        """
+        self.count += other.count
+        self.zeros += other.zeros
+        for k, c in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + c
+
+    def quantile(self: LogSketch, q: float) -> float:
+        """
+        Devolve uma estimativa do quantil `q` (entre 0 e 1).
+        """
+        if self.count == 0:
+            return math.nan
+
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if rank < seen:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class RunningStats:
+    """
+    Representa estatísticas calculadas em streaming (média, variância,
+    mínimo, máximo e quantis), sem guardar os valores.
+    """
+    def __init__(self: RunningStats):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Soma dos quadrados dos desvios à média
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = LogSketch()
+
+    def add(self: RunningStats, x: float):
+        """
+        Acrescenta o valor `x` (algoritmo de Welford).
+        """
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        self.sketch.add(x)
+
+    def merge(self: RunningStats, other: RunningStats):
+        """
+        Junta as estatísticas de `other` (algoritmo de Chan et al.).
+        """
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self: RunningStats) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def summary(self: RunningStats) -> dict:
+        """
+        Devolve um resumo das estatísticas.
+        """
+        return {
+            'n': self.n,
+            'mean': self.mean,
+            'std': math.sqrt(self.variance),
+            'min': self.min,
+            'p50': self.sketch.quantile(0.5),
+            'p90': self.sketch.quantile(0.9),
+            'p99': self.sketch.quantile(0.99),
+            'max': self.max,
+        }
+
+
+# Estatísticas recolhidas por jogo
+METRICS = ('payout', 'winner', 'bancarrotas', 'spins', 'steps')
+
+
+def make_bot(solve_at: float = 0.7, buy_prob: float = 0.3, rng=random):
+    """
+    Devolve a função de decisão de um jogador automático simples: roda a
+    roleta, compra vogais com probabilidade `buy_prob` quando tem dinheiro, e
+    resolve o puzzle quando a fração de letras à vista chega a `solve_at`.
+
+    solve_at: fração de letras descobertas a partir da qual resolve
+    buy_prob: probabilidade de comprar uma vogal quando pode
+    rng: gerador aleatório (por omissão, o do módulo `random`)
+    """
+    tried = set()  # Letras já pedidas na ronda atual
+    state = {'puzzle': None}
+
+    def bot(game: wheel.Game) -> str:
+        cpz = game.current_puzzle
+        if state['puzzle'] is not cpz:
+            state['puzzle'] = cpz
+            tried.clear()
+
+        if game.pending == wheel.PROMPT_COMMAND:
+            letters = sum(len(cpz.positions[c]) for c in cpz.positions)
+            shown = sum(len(cpz.positions[c])
+                        for c in wheel.mask_letters(cpz.revealed))
+            if letters == 0 or shown / letters >= solve_at:
+                return 'f'
+            if game.current_player.money_round >= wheel.VOWEL_PRICE and \
+                    game.free_vowels and rng.random() < buy_prob:
+                return 'v'
+            if all(c in tried for c in wheel.CONSONANTS):
+                return 'f'
+            return 'r'
+        if game.pending == wheel.PROMPT_SOLVE:
+            return cpz.secret
+        if game.pending == wheel.PROMPT_TOKEN:
+            return 's'
+        if game.pending == wheel.PROMPT_CONSONANT:
+            options = [c for c in wheel.CONSONANTS if c not in tried]
+        else:
+            free = wheel.mask_letters(game.free_vowels)
+            options = [c for c in free if c not in tried] or \
+                list(free) or list(wheel.VOWELS)
+        letter = rng.choice(options)
+        tried.add(letter)
+        return letter
+
+    return bot
+
+
+def what_if(game: wheel.Game, runs: int,
+            seed: int = 0) -> list[RunningStats]:
+    """
+    Joga `runs` vezes o resto do jogo `game`, a partir do estado atual, com
+    jogadores automáticos, e devolve as estatísticas do dinheiro final de
+    cada jogador. O jogo original não é alterado: cada continuação parte de
+    uma fotografia do estado (`wheel.Game.snapshot`).
+
+    game: jogo a meio
+    runs: número de continuações
+    seed: semente principal (cada continuação usa o seu gerador)
+    """
+    snap = game.snapshot()
+    stats = [RunningStats() for _ in game.players.all]
+    for run in range(runs):
+        rng = wheel.game_rng(seed, run)
+        fork = wheel.Game.restore(snap, game.puzzles, game.wheel, rng)
+        wheel.play(fork, [make_bot(rng=rng) for _ in fork.players.all])
+        for s, player in zip(stats, fork.players.all):
+            s.add(player.money_game)
+    return stats
+
+
+_bank = None  # Puzzles partilhados pelos jogos de cada processo
+_wheel = None  # Roleta partilhada pelos jogos de cada processo
+_config = None
+
+
+def _init_worker(config: dict):
+    """
+    Carrega os puzzles uma vez por processo.
+    """
+    global _bank, _wheel, _config
+    _config = config
+    _bank = wheel.Puzzles(config['puzzles'], lazy=True)
+    _wheel = wheel.Wheel(config['houses'], config['weights'])
+
+
+def run_chunk(chunk: int) -> dict[str, RunningStats]:
+    """
+    Joga os jogos do bloco `chunk` e devolve as suas estatísticas.
+
+    chunk: número do bloco
+    """
+    config = _config
+    stats = {m: RunningStats() for m in METRICS}
+    start = chunk * config['chunk']
+    stop = min(start + config['chunk'], config['games'])
+    names = [f'p{i}' for i in range(config['players'])]
+    counts = {'bancarrota': 0, 'spins': 0, 'steps': 0}
+
+    def on_events(events: list[wheel.Event]):
+        counts['steps'] += 1
+        for e in events:
+            if e.kind == 'bancarrota':
+                counts['bancarrota'] += 1
+
+    log = None
+    if config['log_dir']:
+        log = transcript.TranscriptWriter(os.path.join(
+            config['log_dir'], f'chunk-{chunk:06}{transcript.LOG_SUFFIX}'))
+
+    for game_no in range(start, stop):
+        rng = wheel.game_rng(config['seed'], game_no)
+        game = wheel.Game('', names, config['rounds'],
+                          puzzles=_bank.session(ordered=False), rng=rng)
+        game.wheel = _wheel
+        game.bonus = config['bonus']
+        # `play` também entrega os acontecimentos do início do jogo
+        counts.update(bancarrota=0, steps=-1)
+        bots = [make_bot(rng=rng) for _ in names]
+        spins = [0]
+
+        def counted(bot):
+            def decide(g):
+                answer = bot(g)
+                if g.pending == wheel.PROMPT_COMMAND and answer == 'r':
+                    spins[0] += 1
+                return answer
+            return decide
+
+        recorder = None
+        if log is not None:
+            recorder = transcript.Recorder(game, log)
+        wheel.play(game, [counted(b) for b in bots], on_events, recorder)
+        if recorder is not None:
+            recorder.close()
+        money = [p.money_game for p in game.players.all]
+        stats['payout'].add(sum(money))
+        stats['winner'].add(max(money))
+        stats['bancarrotas'].add(counts['bancarrota'])
+        stats['spins'].add(spins[0])
+        stats['steps'].add(counts['steps'])
+
+    if log is not None:
+        log.close()
+    return stats
+
+
+def simulate(games: int, workers: int = 1, seed: int = 0, players: int = 3,
+             rounds: int = 4, bonus: int = wheel.Game.BONUS,
+             houses: list[int] | None = None,
+             weights: list[float] | None = None, puzzles: str = 'puzzles.txt',
+             chunk: int = 1000,
+             log_dir: str | None = None) -> dict[str, RunningStats]:
+    """
+    Simula `games` jogos e devolve as estatísticas agregadas por métrica.
+
+    games: número de jogos
+    workers: número de processos
+    seed: semente principal
+    players: número de jogadores por jogo
+    rounds: número de rondas por jogo
+    bonus: prémio para o(s) vencedor(es)
+    houses: casas da roleta (por omissão as de `wheel.Wheel`)
+    weights: tamanho relativo de cada casa (por omissão todas iguais)
+    puzzles: ficheiro de puzzles
+    chunk: número de jogos por bloco
+    log_dir: diretório onde gravar os jogos, um registo por bloco (ver
+        `transcript`)
+    """
+    config = {
+        'games': games, 'seed': seed, 'players': players, 'rounds': rounds,
+        'bonus': bonus, 'houses': houses, 'weights': weights,
+        'puzzles': puzzles, 'chunk': chunk, 'log_dir': log_dir,
+    }
+    chunks = range(math.ceil(games / chunk))
+    total = {m: RunningStats() for m in METRICS}
+    if workers <= 1:
+        _init_worker(config)
+        for stats in map(run_chunk, chunks):
+            for m in METRICS:
+                total[m].merge(stats[m])
+        return total
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(config,)) as pool:
+        # `map` devolve os blocos por ordem, o que torna a junção
+        # determinística
+        for stats in pool.map(run_chunk, chunks):
+            for m in METRICS:
+                total[m].merge(stats[m])
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--bonus", type=int, default=wheel.Game.BONUS)
+    parser.add_argument("--houses", default=None,
+                        help="casas da roleta separadas por vírgulas")
+    parser.add_argument("--weights", default=None,
+                        help="peso de cada casa, separados por vírgulas")
+    parser.add_argument("--puzzles", default="puzzles.txt")
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--log-dir", default=None,
+                        help="grava os jogos neste diretório")
+    args = parser.parse_args()
+
+    houses = None
+    if args.houses:
+        houses = [int(h) for h in args.houses.split(",")]
+    weights = None
+    if args.weights:
+        weights = [float(w) for w in args.weights.split(",")]
+    total = simulate(args.games, args.workers, args.seed, args.players,
+                     args.rounds, args.bonus, houses, weights, args.puzzles,
+                     args.chunk, args.log_dir)
+    summary = {m: total[m].summary() for m in METRICS}
+    if args.json:
+        print(json.dumps(summary))
+        return
+
+    print(f"{'':<12}{'média':>10}{'desvio':>10}{'mín':>8}{'p50':>10}"
+          f"{'p90':>10}{'p99':>10}{'máx':>8}")
+    for m, s in summary.items():
+        print(f"{m:<12}{s['mean']:>10.1f}{s['std']:>10.1f}{s['min']:>8.0f}"
+              f"{s['p50']:>10.0f}{s['p90']:>10.0f}{s['p99']:>10.0f}"
+              f"{s['max']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Jogador automático baseado num dicionário: para cada palavra do puzzle
+procura, num índice do dicionário, as palavras compatíveis com as letras à
+vista e com as letras que já se sabe não existirem, e usa esses candidatos
+para escolher letras e para resolver o puzzle.
+
+O índice guarda, para cada comprimento de palavra, um conjunto de bits (um
+por palavra) para cada par (posição, letra) e para cada letra contida na
+palavra. Uma pesquisa é uma sequência de ANDs entre esses conjuntos e a
+contagem de candidatos com uma dada letra é um `int.bit_count`.
+"""
+
+from __future__ import annotations
+import os
+from functools import lru_cache
+from typing import Iterable
+
+import wheel
+
+DICT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "01.raw", "dict-port.txt")
+
+
+def _bitset(ids: list[int], size: int) -> int:
+    """
+    Devolve o conjunto de bits com os bits `ids` ligados.
+
+    ids: posições dos bits
+    size: número total de bits
+    """
+    b = bytearray((size + 7) // 8)
+    for i in ids:
+        b[i >> 3] |= 1 << (i & 7)
+
+    return int.from_bytes(b, 'little')
+
+
+class WordIndex:
+    """
+    Representa o índice de padrões de um dicionário.
+    """
+    def __init__(self: WordIndex, words: Iterable[str]):
+        """
+        Constrói o índice a partir das palavras `words`, já limpas ou não.
+
+        words: palavras do dicionário
+        """
+        by_length = {}
+        for word in wheel.clean_texts(words):
+            if word.isalpha() and word.isascii():
+                by_length.setdefault(len(word), set()).add(word)
+
+        self.words = {}  # comprimento -> palavras
+        self.all = {}  # comprimento -> todas as palavras
+        self.at = {}  # (comprimento, posição, letra) -> palavras
+        self.has = {}  # (comprimento, letra) -> palavras
+        self.times = {}  # (comprimento, letra, ocorrências) -> palavras
+        for n, group in by_length.items():
+            words_n = sorted(group)
+            self.words[n] = words_n
+            at = {}
+            has = {}
+            times = {}
+            for i, word in enumerate(words_n):
+                for pos, letter in enumerate(word):
+                    at.setdefault((n, pos, letter), []).append(i)
+                for letter in set(word):
+                    has.setdefault((n, letter), []).append(i)
+                    times.setdefault((n, letter, word.count(letter)),
+                                     []).append(i)
+            self.all[n] = (1 << len(words_n)) - 1
+            for key, ids in at.items():
+                self.at[key] = _bitset(ids, len(words_n))
+            for key, ids in has.items():
+                self.has[key] = _bitset(ids, len(words_n))
+            for key, ids in times.items():
+                self.times[key] = _bitset(ids, len(words_n))
+
+        # Fração das palavras do dicionário que contêm cada letra, usada
+        # para as palavras do puzzle que não estão no dicionário
+        total = sum(len(w) for w in self.words.values()) or 1
+        self.prior = {
+            letter: sum(self.count_with(n, self.all[n], letter)
+                        for n in self.words) / total
+            for letter in wheel.LETTER_BIT
+            }
+        self.candidates = lru_cache(maxsize=4096)(self._candidates)
+
+    @classmethod
+    def from_file(cls: type, file_name: str = DICT_FILE) -> WordIndex:
+        """
+        Constrói o índice a partir de um ficheiro com uma palavra por linha.
+
+        file_name: nome do ficheiro do dicionário
+        """
+        with open(file_name, 'r', encoding="utf-8") as f:
+            return cls(f)
+
+    def _candidates(self: WordIndex, pattern: str, excluded: int) -> int:
+        """
+        Devolve o conjunto de bits das palavras compatíveis com `pattern`
+        (letras já limpas nas posições descobertas e '-' nas outras) que não
+        contêm nenhuma das letras de `excluded`. As posições escondidas não
+        podem ter letras já descobertas, que estariam à vista, ou seja, cada
+        letra descoberta ocorre na palavra tantas vezes como no padrão.
+
+        pattern: padrão da palavra
+        excluded: máscara das letras que não existem no puzzle
+        """
+        n = len(pattern)
+        bits = self.all.get(n, 0)
+        for pos, letter in enumerate(pattern):
+            if letter != '-':
+                bits &= self.at.get((n, pos, letter), 0)
+
+        for letter in set(pattern) - {'-'}:
+            bits &= self.times.get((n, letter, pattern.count(letter)), 0)
+        for letter in wheel.mask_letters(excluded):
+            bits &= ~self.has.get((n, letter), 0)
+
+        return bits
+
+    def count_with(self: WordIndex, n: int, bits: int, letter: str) -> int:
+        """
+        Devolve quantos dos candidatos `bits` de comprimento `n` contêm a
+        letra `letter`.
+        """
+        return (bits & self.has.get((n, letter), 0)).bit_count()
+
+    def decode(self: WordIndex, n: int, bits: int,
+               limit: int | None = None) -> list[str]:
+        """
+        Devolve as palavras de comprimento `n` do conjunto `bits`.
+
+        n: comprimento das palavras
+        bits: conjunto de candidatos
+        limit: número máximo de palavras a devolver
+        """
+        words = self.words.get(n, [])
+        found = []
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        for byte_no, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                found.append(words[(byte_no << 3) + low.bit_length() - 1])
+                if limit is not None and len(found) >= limit:
+                    return found
+                byte ^= low
+
+        return found
+
+
+def tokens(visible: str) -> list[tuple[int, str]]:
+    """
+    Divide o puzzle visível (já limpo) nas suas palavras e devolve, para
+    cada uma, a posição inicial e o padrão.
+
+    visible: caracteres visíveis do puzzle
+    """
+    found = []
+    start = None
+    for i, c in enumerate(visible + ' '):
+        if c == '-' or c.isalpha():
+            if start is None:
+                start = i
+        elif start is not None:
+            found.append((start, visible[start:i]))
+            start = None
+
+    return found
+
+
+class Analysis:
+    """
+    Representa os candidatos de cada palavra do puzzle atual.
+    """
+    def __init__(self: Analysis, index: WordIndex, puzzle: wheel.Puzzle):
+        """
+        Procura os candidatos de cada palavra ainda por descobrir.
+
+        index: índice do dicionário
+        puzzle: puzzle a analisar
+        """
+        self.index = index
+        self.visible = wheel.clean_text(puzzle.visible.tounicode())
+        self.excluded = puzzle.guessed & ~puzzle.revealed
+        self.tried = puzzle.guessed
+        self.words = []  # (posição, padrão, candidatos, nº de candidatos)
+        for start, pattern in tokens(self.visible):
+            self.add_word(start, pattern)
+
+    @classmethod
+    def from_patterns(cls: type, index: WordIndex, patterns: Iterable[str],
+                      excluded: int, tried: int) -> Analysis:
+        """
+        Analisa as palavras com os padrões `patterns`, sem puzzle.
+
+        index: índice do dicionário
+        patterns: padrões das palavras
+        excluded: máscara das letras que não existem no puzzle
+        tried: máscara das letras já pedidas
+        """
+        analysis = cls.__new__(cls)
+        analysis.index = index
+        analysis.visible = " ".join(patterns)
+        analysis.excluded = excluded
+        analysis.tried = tried
+        analysis.words = []
+        for start, pattern in tokens(analysis.visible):
+            analysis.add_word(start, pattern)
+        return analysis
+
+    def add_word(self: Analysis, start: int, pattern: str):
+        """
+        Procura os candidatos da palavra `pattern`, se ainda tiver letras
+        escondidas.
+
+        start: posição da palavra no puzzle
+        pattern: padrão da palavra
+        """
+        if '-' in pattern:
+            bits = self.index.candidates(pattern, self.excluded)
+            self.words.append((start, pattern, bits, bits.bit_count()))
+
+    def solved(self: Analysis) -> bool:
+        """
+        Indica se todas as palavras têm um único candidato.
+        """
+        return all(count == 1 for _, _, _, count in self.words)
+
+    def letter_chance(self: Analysis, letter: str) -> float:
+        """
+        Devolve a probabilidade estimada de `letter` estar no puzzle, a
+        partir da fração de candidatos de cada palavra que a contêm.
+        """
+        missing = 1.0
+        for _, pattern, bits, count in self.words:
+            if count:
+                with_letter = self.index.count_with(len(pattern), bits, letter)
+                missing *= 1 - with_letter / count
+            else:
+                missing *= 1 - self.index.prior[letter]
+        return 1 - missing
+
+    def best_letter(self: Analysis, allowed: int) -> str | None:
+        """
+        Devolve a letra mais provável de entre as letras `allowed` que ainda
+        não foram pedidas.
+
+        allowed: máscara das letras permitidas
+        """
+        options = wheel.mask_letters(allowed & ~self.tried)
+        if not options:
+            return None
+        return max(options, key=self.letter_chance)
+
+    def answer(self: Analysis) -> str:
+        """
+        Devolve a melhor solução conhecida, usando o primeiro candidato de
+        cada palavra.
+        """
+        chars = list(self.visible)
+        for start, pattern, bits, count in self.words:
+            if count:
+                word = self.index.decode(len(pattern), bits, 1)[0]
+                chars[start:start + len(word)] = word
+        return "".join(chars)
+
+
+def make_solver_bot(index: WordIndex):
+    """
+    Devolve a função de decisão de um jogador que usa o índice `index`:
+    resolve quando cada palavra tem um só candidato (ou quando já não há
+    letras para pedir), compra a vogal mais provável quando é mais provável
+    do que a melhor consoante, e roda a roleta nos outros casos.
+
+    index: índice do dicionário
+    """
+    tried = set()  # Soluções já tentadas (e erradas, se o jogo continua)
+
+    def bot(game: wheel.Game) -> str:
+        cpz = game.current_puzzle
+        analysis = Analysis(index, cpz)
+        if game.pending == wheel.PROMPT_COMMAND:
+            if analysis.solved() and analysis.answer() not in tried:
+                return 'f'
+            cons = analysis.best_letter(game.free_consonants)
+            vowel = analysis.best_letter(game.free_vowels)
+            cons_p = analysis.letter_chance(cons) if cons else 0.0
+            vowel_p = analysis.letter_chance(vowel) if vowel else 0.0
+            can_buy = game.current_player.money_round >= wheel.VOWEL_PRICE
+            if can_buy and vowel and vowel_p > cons_p:
+                return 'v'
+            if cons or vowel:
+                return 'r'
+            return 'f'
+        if game.pending == wheel.PROMPT_SOLVE:
+            answer = analysis.answer()
+            tried.add(answer)
+            return answer
+        if game.pending == wheel.PROMPT_TOKEN:
+            return 's'
+        if game.pending == wheel.PROMPT_CONSONANT:
+            allowed = game.free_consonants
+        else:
+            allowed = game.free_vowels
+        return analysis.best_letter(allowed) or \
+            wheel.mask_letters(allowed)[:1] or 'a'
+
+    return bot
@@ -0,0 +1,113 @@
+"""
+Testes do banco de puzzles compilado (`wheel.compile_puzzles` e
+`wheel.Puzzles.open_bank`): o banco dá os mesmos puzzles e níveis que o
+ficheiro de texto, só é usado enquanto estiver atualizado, e um banco
+desatualizado ou estragado faz voltar ao ficheiro de texto.
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+LINES = ['Filme: O Pátio das Cantigas\n', 'Lugar: Ponte 25 de Abril\n',
+         'Frase: Quem não arrisca não petisca\n', 'Animal: Lagarto\n',
+         'Pessoa: Amália Rodrigues\n', 'Lugar: Serra da Estrela\n']
+
+
+def fields(puzzle: wheel.Puzzle) -> tuple:
+    return puzzle.topic, puzzle.raw_secret, puzzle.secret, puzzle.mask
+
+
+class TestBank(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'puzzles.txt')
+        self.bank = self.path + wheel.BANK_SUFFIX
+        self.write(LINES)
+        self.assertEqual(wheel.compile_puzzles(self.path), self.bank)
+
+    def write(self, lines: list[str], mtime: int = 10 ** 9):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def open(self) -> wheel.Puzzles:
+        return wheel.Puzzles(self.path, lazy=True)
+
+    def test_bank_matches_text(self):
+        puzzles = self.open()
+        self.assertIsInstance(puzzles.puzzles, wheel.BankPuzzleList)
+        expected = puzzles.load_puzzles(self.path)
+        self.assertEqual([fields(p) for p in puzzles.puzzles],
+                         [fields(p) for p in expected])
+        self.assertEqual([puzzles.puzzles.mask(i) for i in range(len(LINES))],
+                         [p.mask for p in expected])
+
+        # Os níveis já vêm pontuados no banco
+        index = wheel.DifficultyIndex()
+        index.update(expected)
+        self.assertEqual([list(b) for b in puzzles.index_difficulty().buckets],
+                         [list(b) for b in index.buckets])
+
+    def test_touched_file_with_same_content_is_fresh(self):
+        self.write(LINES, mtime=5 * 10 ** 9)
+        self.assertIsInstance(self.open().puzzles, wheel.BankPuzzleList)
+
+    def test_changed_file_falls_back_to_text(self):
+        # O mesmo tamanho, com outro conteúdo
+        lines = LINES[:]
+        lines[3] = 'Animal: Lagarta\n'
+        self.assertEqual(len(''.join(lines).encode('utf-8')),
+                         len(''.join(LINES).encode('utf-8')))
+        for changed in (lines, LINES + ['Animal: Gato\n']):
+            self.write(changed, mtime=7 * 10 ** 9)
+            puzzles = self.open()
+            self.addCleanup(puzzles.close)
+            self.assertIsInstance(puzzles.puzzles, wheel.LazyPuzzleList)
+            self.assertEqual([p.raw_secret for p in puzzles.puzzles],
+                             [line.split(': ', 1)[1].strip()
+                              for line in changed])
+
+    def test_bad_bank_falls_back_to_text(self):
+        with open(self.bank, 'rb') as f:
+            data = f.read()
+        size = len(wheel.BANK_MAGIC)
+        other = (wheel.BANK_VERSION + 1).to_bytes(2, 'little')
+        for bad in (b'', b'WOFB', b'XXXX' + data[size:],
+                    data[:size] + other + data[size + 2:],
+                    data[:wheel._BANK_HEADER.size + 1]):
+            with open(self.bank, 'wb') as f:
+                f.write(bad)
+            puzzles = self.open()
+            self.addCleanup(puzzles.close)
+            self.assertIsInstance(puzzles.puzzles, wheel.LazyPuzzleList)
+            self.assertEqual(len(puzzles.puzzles), len(LINES))
+
+    def test_other_separator_falls_back_to_text(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.writelines(line.replace(': ', ' | ', 1) for line in LINES)
+        wheel.compile_puzzles(self.path, sep=' | ')
+        self.assertIsInstance(wheel.Puzzles(self.path, ' | ').puzzles,
+                              wheel.BankPuzzleList)
+        puzzles = wheel.Puzzles(self.path, ': ', lazy=True)
+        self.addCleanup(puzzles.close)
+        self.assertIsInstance(puzzles.puzzles, wheel.LazyPuzzleList)
+
+    def test_missing_bank(self):
+        os.remove(self.bank)
+        puzzles = self.open()
+        self.addCleanup(puzzles.close)
+        self.assertIsInstance(puzzles.puzzles, wheel.LazyPuzzleList)
+
+
+if __name__ == "__main__":
+    unittest.main()
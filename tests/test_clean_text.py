@@ -0,0 +1,84 @@
+"""
+Testes da normalização do texto (`wheel.clean_text` e `wheel.clean_texts`):
+o mesmo resultado que a versão original, com a cadeia de expressões
+regulares, para os acentos que ela tratava.
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import os
+import random
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+PUZZLES = os.path.join(os.path.dirname(__file__), os.pardir, "puzzles.txt")
+
+# Acentos tratados pela versão original
+ACCENTS = 'áàãâäéèêëíìîïóòõôöúùûüçñýÿ'
+ALPHABET = ('abcxyzABCXYZ019 -.,:!?\'"\t\n\0' + ACCENTS + ACCENTS.upper()
+            + 'ßøæœłđ日ω')
+
+
+def baseline_clean_text(s: str) -> str:
+    """
+    Versão original de `clean_text`.
+    """
+    s = s.lower().strip()
+    s = re.sub(r'[áàãâä]', 'a', s)
+    s = re.sub(r'[éèêë]', 'e', s)
+    s = re.sub(r'[íìîï]', 'i', s)
+    s = re.sub(r'[óòõôö]', 'o', s)
+    s = re.sub(r'[úùûü]', 'u', s)
+    s = re.sub(r'[ç]', 'c', s)
+    s = re.sub(r'[ñ]', 'n', s)
+    s = re.sub(r'[ýÿ]', 'y', s)
+    return s
+
+
+def random_texts(rng: random.Random, n: int) -> list[str]:
+    """
+    Devolve `n` strings ao acaso, curtas (as que vão para a cache) e longas.
+    """
+    return [''.join(rng.choices(ALPHABET, k=rng.choice((0, 1, 3, 8, 9, 40))))
+            for _ in range(n)]
+
+
+class TestCleanText(unittest.TestCase):
+    def test_matches_baseline(self):
+        texts = random_texts(random.Random(1), 5000)
+        with open(PUZZLES, encoding='utf-8') as f:
+            texts += f.read().splitlines()
+        for text in texts:
+            self.assertEqual(wheel.clean_text(text),
+                             baseline_clean_text(text), repr(text))
+
+    def test_cached_results_do_not_change(self):
+        for text in ('A', ' É ', 'ç', 'Ão', 'abcdefgh', 'abcdefghi'):
+            first = wheel.clean_text(text)
+            self.assertEqual(wheel.clean_text(text), first)
+            self.assertEqual(first, baseline_clean_text(text))
+
+    def test_other_latin_letters_lose_their_accents(self):
+        self.assertEqual(wheel.clean_text(' Dvořák Ångström '),
+                         'dvorak angstrom')
+        self.assertEqual(wheel.clean_text('Łódź'), 'łodz')
+
+    def test_clean_texts_matches_clean_text(self):
+        rng = random.Random(2)
+        # Mais de um bloco, e strings com o separador dos blocos
+        for n in (0, 1, 10, wheel._BULK_CHUNK + 7):
+            texts = random_texts(rng, n)
+            self.assertEqual(list(wheel.clean_texts(texts)),
+                             [wheel.clean_text(t) for t in texts])
+            self.assertEqual(list(wheel.clean_texts(iter(texts))),
+                             [baseline_clean_text(t) for t in texts])
+
+
+if __name__ == "__main__":
+    unittest.main()
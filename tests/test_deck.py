@@ -0,0 +1,115 @@
+"""
+Testes do baralho de puzzles (`wheel.PuzzleDeck`): tirar sem reposição nos
+dois modos e acrescentar puzzles com `grow`.
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+
+def drain(deck: wheel.PuzzleDeck, rng: random.Random) -> list[int]:
+    """
+    Tira e retira todos os puzzles restantes do baralho, por ordem.
+    """
+    drawn = []
+    while len(deck):
+        drawn.append(deck.draw(rng))
+        deck.discard()
+    return drawn
+
+
+class TestPuzzleDeck(unittest.TestCase):
+    def test_ordered_draws_each_puzzle_once_like_list_pop(self):
+        for size in (1, 2, 7, 64, 100, 1000):
+            deck = wheel.PuzzleDeck(size)
+            rng, ref_rng = random.Random(size), random.Random(size)
+            pending = list(range(size))
+            expected = [pending.pop(ref_rng.randint(0, len(pending) - 1))
+                        for _ in range(size)]
+            self.assertEqual(drain(deck, rng), expected)
+            self.assertEqual(len(deck), 0)
+
+    def test_unordered_draws_each_puzzle_once(self):
+        for size in (1, 2, 7, 64, 1000):
+            deck = wheel.PuzzleDeck(size, ordered=False)
+            drawn = drain(deck, random.Random(size))
+            self.assertEqual(sorted(drawn), list(range(size)))
+
+    def test_draw_without_discard_keeps_the_puzzle(self):
+        for ordered in (True, False):
+            deck = wheel.PuzzleDeck(5, ordered)
+            rng = random.Random(1)
+            for _ in range(10):
+                deck.draw(rng)
+            self.assertEqual(len(deck), 5)
+            self.assertEqual(sorted(drain(deck, rng)), list(range(5)))
+
+    def test_empty_deck_raises(self):
+        deck = wheel.PuzzleDeck(1)
+        drain(deck, random.Random(0))
+        with self.assertRaises(ValueError):
+            deck.draw(random.Random(0))
+
+    def test_reset(self):
+        for ordered in (True, False):
+            deck = wheel.PuzzleDeck(10, ordered)
+            rng = random.Random(2)
+            for _ in range(4):
+                deck.draw(rng)
+                deck.discard()
+            deck.reset()
+            self.assertEqual(sorted(drain(deck, rng)), list(range(10)))
+
+    def test_grow_keeps_draws_already_made(self):
+        for ordered in (True, False):
+            for seed in range(300):
+                rng = random.Random(seed)
+                deck = wheel.PuzzleDeck(rng.randint(1, 40), ordered)
+                pending = list(range(deck.size))
+                for _ in range(rng.randint(0, 60)):
+                    if rng.random() < 0.3:
+                        n = rng.randint(0, 10)
+                        deck.grow(n)
+                        pending.extend(range(deck.size - n, deck.size))
+                    elif len(deck):
+                        pos = deck.draw(rng)
+                        if ordered:
+                            # O k-ésimo restante pela ordem da lista
+                            self.assertEqual(pos, pending[deck._slot])
+                        self.assertIn(pos, pending)
+                        if rng.random() < 0.8:
+                            deck.discard()
+                            pending.remove(pos)
+                    self.assertEqual(len(deck), len(pending))
+                if deck.current is not None:
+                    pending.remove(deck.current)
+                    deck.discard()
+                self.assertEqual(sorted(drain(deck, rng)), sorted(pending))
+
+    def test_grow_keeps_the_drawn_puzzle(self):
+        for ordered in (True, False):
+            deck = wheel.PuzzleDeck(6, ordered)
+            rng = random.Random(3)
+            deck.draw(rng)
+            deck.discard()
+            current = deck.draw(rng)
+            deck.grow(4)
+            self.assertEqual(deck.current, current)
+            deck.discard()
+            drawn = drain(deck, rng)
+            self.assertEqual(len(drawn), 8)
+            self.assertNotIn(current, drawn)
+            self.assertEqual(len(set(drawn)), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
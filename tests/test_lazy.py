@@ -0,0 +1,105 @@
+"""
+Testes da lista de puzzles preguiçosa (`wheel.LazyPuzzleList`): os offsets
+das linhas e os puzzles lidos são os da leitura completa, com mudanças de
+linha LF ou CRLF, com ou sem mudança de linha no fim.
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+LINES = ['Filme: O Pátio das Cantigas', 'Lugar: Ponte 25 de Abril',
+         'Frase: Quem não arrisca não petisca', 'Animal: Lagarto',
+         'Pessoa: Amália Rodrigues']
+
+
+def fields(puzzle: wheel.Puzzle) -> tuple[str, str, str]:
+    return puzzle.topic, puzzle.raw_secret, puzzle.secret
+
+
+class TestLazyPuzzleList(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'puzzles.txt')
+
+    def write(self, data: bytes) -> wheel.LazyPuzzleList:
+        """
+        Escreve o ficheiro e devolve a sua lista preguiçosa.
+        """
+        with open(self.path, 'wb') as f:
+            f.write(data)
+        puzzles = wheel.LazyPuzzleList(self.path, ': ')
+        self.addCleanup(puzzles.close)
+        return puzzles
+
+    def check(self, newline: str, final: bool):
+        text = newline.join(LINES) + (newline if final else '')
+        data = text.encode('utf-8')
+        puzzles = self.write(data)
+
+        # Um offset (em bytes) por linha
+        starts = [0] + [i + 1 for i, byte in enumerate(data)
+                        if byte == 0x0A and i + 1 < len(data)]
+        self.assertEqual(list(puzzles.offsets), starts)
+        self.assertEqual(len(puzzles), len(LINES))
+        self.assertEqual(puzzles.size, len(data))
+
+        eager = wheel.Puzzles(self.path).puzzles
+        self.assertEqual([fields(p) for p in puzzles],
+                         [fields(p) for p in eager])
+        self.assertEqual(fields(puzzles[-1]), fields(eager[-1]))
+        self.assertEqual(puzzles[0].topic, 'Filme')
+        self.assertEqual(puzzles[len(LINES) - 1].raw_secret,
+                         'Amália Rodrigues')
+
+    def test_lf(self):
+        self.check('\n', True)
+
+    def test_lf_without_final_newline(self):
+        self.check('\n', False)
+
+    def test_crlf(self):
+        self.check('\r\n', True)
+
+    def test_crlf_without_final_newline(self):
+        self.check('\r\n', False)
+
+    def test_empty_file(self):
+        puzzles = self.write(b'')
+        self.assertEqual(len(puzzles), 0)
+        with self.assertRaises(IndexError):
+            puzzles[0]
+
+    def test_index_out_of_range(self):
+        puzzles = self.write('\n'.join(LINES).encode('utf-8'))
+        with self.assertRaises(IndexError):
+            puzzles[len(LINES)]
+        with self.assertRaises(IndexError):
+            puzzles[-len(LINES) - 1]
+
+    def test_bad_line_is_only_detected_when_read(self):
+        puzzles = self.write(b'Filme: Aniki Bobo\nsem separador\n')
+        self.assertEqual(len(puzzles), 2)
+        self.assertEqual(puzzles[0].raw_secret, 'Aniki Bobo')
+        with self.assertRaises(ValueError):
+            puzzles[1]
+
+    def test_puzzles_are_lazy_without_bank(self):
+        self.write('\n'.join(LINES).encode('utf-8'))
+        puzzles = wheel.Puzzles(self.path, lazy=True)
+        self.addCleanup(puzzles.close)
+        self.assertIsInstance(puzzles.puzzles, wheel.LazyPuzzleList)
+        self.assertEqual(len(puzzles.deck), len(LINES))
+
+
+if __name__ == "__main__":
+    unittest.main()
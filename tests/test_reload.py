@@ -0,0 +1,244 @@
+"""
+Testes da recarga do ficheiro de puzzles (`wheel.Puzzles.reload`): linhas
+acrescentadas, alteradas e apagadas, substituindo o ficheiro ou reescrevendo-o
+no mesmo i-node, dão a mesma lista e o mesmo índice por dificuldade que uma
+leitura nova, sem mexer nos baralhos das sessões a decorrer.
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+TOPICS = ('Animal', 'Filme', 'Frase', 'Lugar', 'Pessoa', 'Outro')
+WORDS = ('gato', 'rio', 'casa', 'jazz', 'kiwi', 'sol', 'ponte', 'xadrez',
+         'amarelo', 'quinta', 'wok', 'lua', 'mar', 'ilha', 'bolo')
+
+
+def puzzle_lines(rng: random.Random, n: int) -> list[str]:
+    """
+    Devolve `n` linhas de puzzles ao acaso.
+    """
+    return [f'{rng.choice(TOPICS)}: '
+            f'{" ".join(rng.choices(WORDS, k=rng.randint(1, 6)))}\n'
+            for _ in range(n)]
+
+
+class TestReload(unittest.TestCase):
+    def setUp(self):
+        # Blocos pequenos, para que as mudanças atravessem vários
+        self.block = wheel.RELOAD_BLOCK
+        wheel.RELOAD_BLOCK = 64
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'puzzles.txt')
+        self.mtime = 0
+
+    def tearDown(self):
+        wheel.RELOAD_BLOCK = self.block
+
+    def write(self, lines: list[str], append: list[str] | None = None):
+        """
+        Substitui o ficheiro (ou acrescenta-lhe `append`), com um mtime
+        sempre diferente.
+        """
+        if append is not None:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(append)
+        else:
+            with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            os.replace(self.path + '.tmp', self.path)
+        self.mtime += 10 ** 9
+        os.utime(self.path, ns=(self.mtime, self.mtime))
+
+    def write_in_place(self, lines: list[str]):
+        """
+        Reescreve o ficheiro no mesmo i-node, com um mtime sempre diferente.
+        """
+        with open(self.path, 'r+', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.truncate()
+        self.mtime += 10 ** 9
+        os.utime(self.path, ns=(self.mtime, self.mtime))
+
+    def assertSameAsFresh(self, puzzles: wheel.Puzzles, lines: list[str]):
+        fresh = wheel.Puzzles(self.path, lazy=True)
+        fresh.index_difficulty()
+        self.assertEqual(list(puzzles.puzzles.offsets),
+                         list(fresh.puzzles.offsets))
+        self.assertEqual([str(p) for p in puzzles.puzzles],
+                         [line.strip() for line in lines])
+        self.assertEqual([list(b) for b in puzzles.difficulty.buckets],
+                         [list(b) for b in fresh.difficulty.buckets])
+        self.assertEqual(puzzles.difficulty.scored, len(lines))
+        self.assertEqual(puzzles.puzzles.blocks, wheel._block_hashes(
+            puzzles.puzzles._file.fileno(), 0, puzzles.puzzles.size))
+        fresh.close()
+
+    def test_edits_appends_and_deletes(self):
+        rng = random.Random(1)
+        lines = puzzle_lines(rng, 60)
+        self.write(lines)
+        puzzles = wheel.Puzzles(self.path, lazy=True).watch()
+        puzzles.index_difficulty()
+        self.assertIsNone(puzzles.reload())
+
+        for step in range(60):
+            change = step % 4
+            if change == 0:
+                added = puzzle_lines(rng, rng.randint(1, 5))
+                lines += added
+                self.write(lines, append=added)
+            elif change == 1:
+                i = rng.randrange(len(lines))
+                lines[i:i + rng.randint(1, 3)] = \
+                    puzzle_lines(rng, rng.randint(1, 4))
+                self.write(lines)
+            elif change == 2:
+                i = rng.randrange(len(lines))
+                del lines[i:i + rng.randint(1, 4)]
+                self.write(lines)
+            else:
+                i = rng.randint(0, len(lines))
+                lines[i:i] = puzzle_lines(rng, rng.randint(1, 4))
+                self.write(lines)
+
+            # Uma sessão a decorrer na versão anterior
+            session = puzzles.session(False)
+            game = wheel.Game(None, ['Ana'], 1, puzzles=session,
+                              rng=wheel.game_rng(step))
+            current = str(game.current_puzzle)
+
+            reloaded = puzzles.reload()
+            self.assertIsNotNone(reloaded)
+            self.assertIsNone(reloaded.reload())
+            self.assertSameAsFresh(reloaded, lines)
+
+            # A sessão continua com o seu puzzle, a sua lista e o seu baralho
+            self.assertEqual(str(game.current_puzzle), current)
+            self.assertIs(session.puzzles, puzzles.puzzles)
+            self.assertEqual(session.deck.size, len(puzzles.puzzles))
+            self.assertEqual(str(session.puzzles[session.deck.current]),
+                             current)
+            puzzles.close()
+            session.release()
+            puzzles = reloaded
+        puzzles.close()
+
+    def test_edits_in_place(self):
+        rng = random.Random(4)
+        lines = puzzle_lines(rng, 60)
+        self.write(lines)
+        puzzles = wheel.Puzzles(self.path, lazy=True).watch()
+        puzzles.index_difficulty()
+
+        for step in range(60):
+            old = lines[:]
+            change = step % 4
+            i = rng.randrange(len(lines))
+            if change == 0:
+                # Mesmo tamanho: só o conteúdo de uma linha muda
+                topic, secret = lines[i].rstrip('\n').split(': ', 1)
+                lines[i] = f'{topic}: {secret[::-1]}\n'
+                if lines[i] == old[i]:
+                    lines[i] = f'{topic}: {secret[:-1]}'\
+                               f'{"a" if secret[-1] != "a" else "e"}\n'
+            elif change == 1:
+                lines[i:i + 1] = puzzle_lines(rng, rng.randint(2, 4))
+            elif change == 2:
+                del lines[i:i + rng.randint(1, 4)]
+            else:
+                lines[i:i + rng.randint(1, 2)] = \
+                    puzzle_lines(rng, rng.randint(1, 3))
+            self.write_in_place(lines)
+
+            session = puzzles.session(False)
+            reloaded = puzzles.reload()
+            self.assertIsNotNone(reloaded)
+            self.assertIsNone(reloaded.reload())
+            self.assertSameAsFresh(reloaded, lines)
+
+            # A versão anterior lê as linhas da nova: as que não mudaram
+            # continuam iguais e as outras vêm da versão nova
+            first = next((k for k, (a, b) in enumerate(zip(old, lines))
+                          if a != b), min(len(old), len(lines)))
+            current = {line.strip() for line in lines}
+            for idx in range(len(old)):
+                text = str(session.puzzles[idx])
+                self.assertIn(text, current)
+                if idx < first:
+                    self.assertEqual(text, old[idx].strip())
+
+            # A versão anterior só é fechada quando a sessão termina
+            puzzles.close()
+            self.assertFalse(puzzles.puzzles._file.closed)
+            session.release()
+            self.assertTrue(puzzles.puzzles._file.closed)
+            self.assertFalse(reloaded.puzzles._file.closed)
+            puzzles = reloaded
+        puzzles.close()
+
+    def test_new_sessions_draw_every_puzzle(self):
+        rng = random.Random(2)
+        lines = puzzle_lines(rng, 30)
+        self.write(lines)
+        puzzles = wheel.Puzzles(self.path, lazy=True).watch()
+        puzzles.index_difficulty()
+        del lines[3:7]
+        lines += puzzle_lines(rng, 10)
+        self.write(lines)
+        old, puzzles = puzzles, puzzles.reload()
+        old.close()
+        self.addCleanup(puzzles.close)
+
+        session = puzzles.session(False)
+        drawn = []
+        while len(session.deck):
+            drawn.append(str(session.set_puzzle(rng)))
+            session.drop_puzzle()
+        self.assertEqual(sorted(drawn), sorted(line.strip()
+                                               for line in lines))
+        session.release()
+
+        # Cada nível tira os seus puzzles, todos e só uma vez
+        session = puzzles.session(False)
+        for level, positions in enumerate(puzzles.difficulty.buckets):
+            drawn = []
+            for _ in positions:
+                drawn.append(session.set_puzzle(rng, level).difficulty())
+                session.drop_puzzle()
+            self.assertEqual(drawn, [level] * len(positions))
+            self.assertEqual(len(session.strata.deck(level)), 0)
+        session.release()
+
+    def test_bank_is_indexed_on_watch(self):
+        rng = random.Random(3)
+        lines = puzzle_lines(rng, 20)
+        self.write(lines)
+        wheel.compile_puzzles(self.path)
+        bank = wheel.Puzzles(self.path)
+        self.assertIsInstance(bank.puzzles, wheel.BankPuzzleList)
+        bank.index_difficulty()
+        with self.assertRaises(ValueError):
+            bank.reload()
+
+        puzzles = bank.watch()
+        lines += puzzle_lines(rng, 3)
+        self.write(lines)
+        reloaded = puzzles.reload()
+        self.assertSameAsFresh(reloaded, lines)
+        puzzles.close()
+        reloaded.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Testes dos geradores aleatórios de cada jogo (`wheel.stream_seed` e
+`wheel.game_rng`): as sementes derivadas são estáveis e distintas, e cada
+jogo com o seu gerador repete-se tal e qual, seja qual for a ordem em que
+os jogos correm, sem mexer no gerador do módulo `random`.
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+PUZZLES = os.path.join(os.path.dirname(__file__), os.pardir, "puzzles.txt")
+
+
+def answer(game: wheel.Game, rng: random.Random) -> str:
+    """
+    Devolve uma resposta ao acaso ao pedido pendente de `game`.
+    """
+    if game.pending == wheel.PROMPT_COMMAND:
+        return rng.choice('rrrrrvvfpi')
+    if game.pending == wheel.PROMPT_SOLVE:
+        return rng.choice([game.current_puzzle.raw_secret, 'nada'])
+    if game.pending == wheel.PROMPT_TOKEN:
+        return rng.choice('sn')
+    return rng.choice(wheel.VOWELS + wheel.CONSONANTS)
+
+
+class TestRng(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bank = wheel.Puzzles(PUZZLES)
+
+    def test_stream_seed_is_stable(self):
+        # Os registos e as sessões do servidor dependem destes valores
+        self.assertEqual(wheel.stream_seed(0), 8493733112532773764)
+        self.assertEqual(wheel.stream_seed(2024, 7), 8404773389601561825)
+        self.assertEqual(wheel.stream_seed(1, 'a', 3), 8145351135566461188)
+
+    def test_stream_seeds_are_distinct(self):
+        seeds = {wheel.stream_seed(seed, game)
+                 for seed in range(10) for game in range(2000)}
+        seeds |= {wheel.stream_seed(seed, block, game)
+                  for seed in range(10) for block in range(10)
+                  for game in range(20)}
+        self.assertEqual(len(seeds), 10 * 2000 + 10 * 10 * 20)
+        self.assertTrue(all(0 <= s < 1 << 64 for s in seeds))
+
+    def test_game_rng_sequences(self):
+        a, b = wheel.game_rng(5, 1), wheel.game_rng(5, 1)
+        self.assertEqual([a.random() for _ in range(100)],
+                         [b.random() for _ in range(100)])
+        c = wheel.game_rng(5, 2)
+        self.assertNotEqual(wheel.game_rng(5, 1).random(), c.random())
+
+    def play(self, game: wheel.Game, rng: random.Random, steps: int):
+        while game.running and steps:
+            game.step(answer(game, rng))
+            steps -= 1
+
+    def new_game(self, game_no: int) -> wheel.Game:
+        game = wheel.Game(None, ['Ana', 'Rui'], 2,
+                          puzzles=self.bank.session(),
+                          rng=wheel.game_rng(9, game_no))
+        game.start()
+        return game
+
+    def test_games_do_not_depend_on_order(self):
+        state = random.getstate()
+
+        # Um jogo de cada vez
+        alone = []
+        for game_no in range(8):
+            game = self.new_game(game_no)
+            self.play(game, random.Random(game_no), -1)
+            alone.append(game.spy())
+
+        # Todos ao mesmo tempo, um passo de cada um, pela ordem inversa
+        games = [self.new_game(game_no) for game_no in reversed(range(8))]
+        players = [random.Random(game_no) for game_no in reversed(range(8))]
+        while any(game.running for game in games):
+            for game, player in zip(games, players):
+                self.play(game, player, 1)
+        self.assertEqual([game.spy() for game in reversed(games)], alone)
+
+        # O gerador do módulo `random` não foi usado
+        self.assertEqual(random.getstate(), state)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Testes das fotografias do estado de um jogo (`wheel.Game.snapshot` e
+`wheel.Game.restore`): ida e volta, nomes longos e rejeição de outras
+versões.
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+PUZZLES = os.path.join(os.path.dirname(__file__), os.pardir, "puzzles.txt")
+
+
+def make_player(rng: random.Random):
+    """
+    Devolve um jogador ao acaso, com um gerador separado do do jogo.
+    """
+    def player(game: wheel.Game) -> str:
+        if game.pending == wheel.PROMPT_COMMAND:
+            return rng.choice('rrrrrvvfpi')
+        if game.pending == wheel.PROMPT_SOLVE:
+            return rng.choice([game.current_puzzle.raw_secret, 'nada'])
+        if game.pending == wheel.PROMPT_TOKEN:
+            return rng.choice('sn')
+        return rng.choice(wheel.VOWELS + wheel.CONSONANTS)
+    return player
+
+
+class TestSnapshot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bank = wheel.Puzzles(PUZZLES)
+        cls.bank.index_difficulty()
+
+    def play(self, game: wheel.Game, player, steps: int) -> list:
+        events = []
+        while game.running and steps:
+            events.append(game.step(player(game)))
+            steps -= 1
+        return events
+
+    def check_round_trip(self, curve=None, ordered=True):
+        for seed in range(40):
+            game = wheel.Game(None, ['Ana', 'Rui'], 3,
+                              puzzles=self.bank.session(ordered),
+                              rng=wheel.game_rng(seed), curve=curve)
+            game.start()
+            self.play(game, make_player(random.Random(seed)), seed * 3)
+            data = game.snapshot(rng=True)
+            copy = wheel.Game.restore(data, self.bank)
+            self.assertEqual(copy.snapshot(rng=True), data)
+            self.assertEqual(copy.spy(), game.spy())
+
+            # Os dois jogos continuam igual com as mesmas respostas
+            original = self.play(game, make_player(random.Random(-seed)),
+                                 -1)
+            replayed = self.play(copy, make_player(random.Random(-seed)),
+                                 -1)
+            self.assertEqual(replayed, original)
+            self.assertEqual(copy.spy(), game.spy())
+
+    def test_round_trip(self):
+        self.check_round_trip()
+
+    def test_round_trip_unordered(self):
+        self.check_round_trip(ordered=False)
+
+    def test_round_trip_with_difficulty_curve(self):
+        self.check_round_trip(curve=(0, 1))
+
+    def test_without_rng_state(self):
+        game = wheel.Game(None, ['Ana'], 1, puzzles=self.bank.session(),
+                          rng=wheel.game_rng(1))
+        game.start()
+        data = game.snapshot()
+        rng = random.Random(5)
+        copy = wheel.Game.restore(data, self.bank, rng=rng)
+        self.assertIs(copy.rng, rng)
+        self.assertEqual(copy.snapshot(), data)
+
+    def test_long_non_ascii_names(self):
+        # Nomes no limite, em UTF-8, com caracteres de 2 bytes
+        names = ['ç' * (wheel.MAX_NAME_BYTES // 2), 'Zé',
+                 'a' * wheel.MAX_NAME_BYTES]
+        game = wheel.Game(None, names, 2, puzzles=self.bank.session(),
+                          rng=wheel.game_rng(3))
+        game.start()
+        self.play(game, make_player(random.Random(3)), 20)
+        data = game.snapshot(rng=True)
+        copy = wheel.Game.restore(data, self.bank)
+        self.assertEqual([p.name for p in copy.players.all], names)
+        self.assertEqual(copy.snapshot(rng=True), data)
+
+        # Acima do limite, o jogo nem chega a ser criado
+        for name in ('ç' * 130, 'a' * (wheel.MAX_NAME_BYTES + 1)):
+            with self.assertRaises(ValueError):
+                wheel.Game(None, ['Ana', name], 1,
+                           puzzles=self.bank.session(),
+                           rng=wheel.game_rng(3))
+
+    def snapshot(self) -> bytes:
+        game = wheel.Game(None, ['Ana'], 1, puzzles=self.bank.session(),
+                          rng=wheel.game_rng(2))
+        game.start()
+        return game.snapshot(rng=True)
+
+    def test_rejects_other_versions(self):
+        data = self.snapshot()
+        size = len(wheel.SNAPSHOT_MAGIC)
+        for version in (0, wheel.SNAPSHOT_VERSION - 1,
+                        wheel.SNAPSHOT_VERSION + 1, 255):
+            old = data[:size] + bytes((version,)) + data[size + 1:]
+            with self.assertRaises(ValueError):
+                wheel.Game.restore(old, self.bank)
+
+    def test_rejects_bad_magic(self):
+        data = self.snapshot()
+        with self.assertRaises(ValueError):
+            wheel.Game.restore(b'XXXX' + data[4:], self.bank)
+
+    def test_rejects_other_puzzle_list(self):
+        data = self.snapshot()
+        other = self.bank.session()
+        other.puzzles = self.bank.puzzles[:-1]
+        with self.assertRaises(ValueError):
+            wheel.Game.restore(data, other)
+
+
+if __name__ == "__main__":
+    unittest.main()
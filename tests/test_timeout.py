@@ -0,0 +1,140 @@
+"""
+Testes dos prazos de resposta: a leitura com prazo (`wheel.TimedInput`) e
+a perda da vez de quem não responde a tempo (`wheel.Game.timeout`).
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import io
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+PUZZLES = os.path.join(os.path.dirname(__file__), os.pardir, "puzzles.txt")
+
+
+class FixedWheel:
+    """
+    Representa uma roleta que para sempre na mesma casa.
+    """
+    def __init__(self, value: int):
+        self.value = value
+
+    def spin(self, rng=None) -> int:
+        return self.value
+
+
+@unittest.skipUnless(os.name == 'posix', 'o TimedInput só funciona em POSIX')
+class TestTimedInput(unittest.TestCase):
+    def setUp(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.addCleanup(os.close, self.read_fd)
+        self.out = io.StringIO()
+        self.reader = wheel.TimedInput(self.read_fd, self.out)
+
+    def send(self, data: bytes):
+        os.write(self.write_fd, data)
+
+    def close(self):
+        os.close(self.write_fd)
+        self.write_fd = None
+
+    def tearDown(self):
+        if self.write_fd is not None:
+            os.close(self.write_fd)
+
+    def test_lines_and_prompt(self):
+        self.send(b'r\nAna\r\nv')
+        self.assertEqual(self.reader.readline('> ', 1), 'r')
+        self.assertEqual(self.reader.readline('? ', 1), 'Ana')
+        self.assertEqual(self.out.getvalue(), '> ? ')
+        self.send(b'ogal\n')
+        self.assertEqual(self.reader.readline('', 1), 'vogal')
+
+    def test_deadline(self):
+        start = time.monotonic()
+        self.assertIsNone(self.reader.readline('> ', 0.05))
+        elapsed = time.monotonic() - start
+        self.assertGreaterEqual(elapsed, 0.04)
+        self.assertLess(elapsed, 1)
+
+        # Uma linha a meio não conta, mas não se perde
+        self.send(b'meia')
+        self.assertIsNone(self.reader.readline('> ', 0.05))
+        self.send(b' linha\n')
+        self.assertEqual(self.reader.readline('> ', 0.05), 'meia linha')
+
+    def test_no_deadline(self):
+        self.send(b'sem prazo\n')
+        self.assertEqual(self.reader.readline('> '), 'sem prazo')
+
+    def test_end_of_input(self):
+        self.send(b'ultima')
+        self.close()
+        self.assertEqual(self.reader.readline('> ', 1), 'ultima')
+        with self.assertRaises(EOFError):
+            self.reader.readline('> ', 1)
+
+
+class TestGameTimeout(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bank = wheel.Puzzles(PUZZLES)
+
+    def new_game(self) -> wheel.Game:
+        game = wheel.Game(None, ['Ana', 'Rui'], 1,
+                          puzzles=self.bank.session(),
+                          rng=wheel.game_rng(1))
+        game.start()
+        return game
+
+    def kinds(self, events: list[wheel.Event]) -> list[str]:
+        return [event.kind for event in events]
+
+    def test_command_timeout_loses_the_turn(self):
+        game = self.new_game()
+        ana, rui = game.players.all
+        ana.money_round = 300
+        self.assertEqual(self.kinds(game.timeout()),
+                         ['timeout', 'perde_vez'])
+        self.assertIs(game.current_player, rui)
+        self.assertEqual(game.pending, wheel.PROMPT_COMMAND)
+        self.assertEqual(ana.money_round, 300)
+
+    def test_consonant_timeout_loses_the_turn(self):
+        game = self.new_game()
+        game.wheel = FixedWheel(500)
+        game.step('r')
+        self.assertEqual(game.pending, wheel.PROMPT_CONSONANT)
+        free = game.free_consonants
+        self.assertEqual(self.kinds(game.timeout()),
+                         ['timeout', 'perde_vez'])
+        self.assertIs(game.current_player, game.players.all[1])
+        self.assertEqual(game.pending, wheel.PROMPT_COMMAND)
+        self.assertEqual(game.free_consonants, free)
+
+    def test_timeout_with_token(self):
+        game = self.new_game()
+        ana, rui = game.players.all
+        ana.recuperacao = 1
+
+        # Quem tem uma ficha pode usá-la para não perder a vez...
+        game.timeout()
+        self.assertEqual(game.pending, wheel.PROMPT_TOKEN)
+        self.assertIs(game.current_player, ana)
+
+        # ... mas deixar esgotar também esse prazo é não a usar
+        self.assertEqual(self.kinds(game.timeout()), ['timeout'])
+        self.assertEqual(game.pending, wheel.PROMPT_COMMAND)
+        self.assertIs(game.current_player, rui)
+        self.assertEqual(ana.recuperacao, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
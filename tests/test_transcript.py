@@ -0,0 +1,130 @@
+"""
+Testes dos registos dos jogos (`transcript.Recorder` e `transcript.replay`):
+os jogos gravados repetem-se até ao mesmo estado final, e os registos
+alterados, cortados ou fora de um jogo são detetados.
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import transcript  # noqa: E402
+import wheel  # noqa: E402
+
+PUZZLES = os.path.join(os.path.dirname(__file__), os.pardir, "puzzles.txt")
+NAMES = (['Ana'], ['Zé', 'Inês'], ['ç' * 127, 'Rui', 'Eva'])
+
+
+def answer(game: wheel.Game, rng: random.Random) -> str:
+    """
+    Devolve uma resposta ao acaso ao pedido pendente de `game`.
+    """
+    if game.pending == wheel.PROMPT_COMMAND:
+        return rng.choice('rrrrrvvfpic')
+    if game.pending == wheel.PROMPT_SOLVE:
+        return rng.choice([game.current_puzzle.raw_secret, 'nada'])
+    if game.pending == wheel.PROMPT_TOKEN:
+        return rng.choice('sn')
+    return rng.choice(wheel.VOWELS + wheel.CONSONANTS + 'Ç1')
+
+
+class TestTranscript(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bank = wheel.Puzzles(PUZZLES)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'jogos' + transcript.LOG_SUFFIX)
+
+    def record(self, seeds: range) -> list[str]:
+        """
+        Grava um jogo por semente, com prazos esgotados pelo meio, e
+        devolve o `spy` final de cada um.
+        """
+        spies = []
+        writer = transcript.TranscriptWriter(self.path)
+        for seed in seeds:
+            rng = random.Random(seed)
+            game = wheel.Game(None, NAMES[seed % len(NAMES)], 1 + seed % 3,
+                              puzzles=self.bank.session(False),
+                              rng=wheel.game_rng(seed))
+            recorder = transcript.Recorder(game, writer)
+            recorder.start()
+            while game.running:
+                if rng.random() < 0.05:
+                    recorder.timeout()
+                else:
+                    recorder.step(answer(game, rng))
+            recorder.close()
+            spies.append(wheel.render_event(game.spy()))
+        writer.close()
+        return spies
+
+    def replay(self) -> list[tuple[str, bool]]:
+        with open(self.path, 'rb') as f:
+            return [(wheel.render_event(game.spy()), ok)
+                    for game, ok in transcript.replay(f)]
+
+    def test_round_trip(self):
+        # Duas sessões no mesmo ficheiro, lido aos bocadinhos
+        spies = self.record(range(0, 20)) + self.record(range(20, 30))
+        self.assertEqual(self.replay(), [(spy, True) for spy in spies])
+        read_size = transcript._READ_SIZE
+        transcript._READ_SIZE = 7
+        try:
+            self.assertEqual(self.replay(), [(spy, True) for spy in spies])
+        finally:
+            transcript._READ_SIZE = read_size
+        self.assertEqual(transcript.replay_file(self.path), (30, 0))
+
+    def test_changed_final_state(self):
+        self.record(range(2))
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes((last[0] ^ 1,)))
+        self.assertEqual([ok for _, ok in self.replay()], [True, False])
+        self.assertEqual(transcript.replay_file(self.path), (2, 1))
+
+    def test_truncated_file(self):
+        self.record(range(1))
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        with self.assertRaises(ValueError):
+            self.replay()
+
+    def test_bad_header(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'XXXX\x01\x00')
+        with self.assertRaises(ValueError):
+            self.replay()
+
+    def test_game_that_never_started(self):
+        writer = transcript.TranscriptWriter(self.path)
+        game = wheel.Game(None, ['Ana'], 1, puzzles=self.bank.session(),
+                          rng=wheel.game_rng(1))
+        transcript.Recorder(game, writer).close()
+        writer.close()
+        self.assertEqual(self.replay(), [])
+
+    def test_end_outside_a_game(self):
+        writer = transcript.TranscriptWriter(self.path)
+        writer.write(bytes((transcript.REC_END,))
+                     + bytes(transcript._DIGEST_SIZE))
+        writer.close()
+        with self.assertRaises(ValueError):
+            self.replay()
+
+
+if __name__ == "__main__":
+    unittest.main()
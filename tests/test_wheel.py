@@ -0,0 +1,108 @@
+"""
+Testes da roleta (`wheel.Wheel`): a tabela de alias dá a distribuição dos
+pesos, as voltas sem pesos seguem a ordem original do gerador e as voltas
+em bloco (`spin_many`), com listas ou com o NumPy, são reprodutíveis e têm
+a mesma distribuição.
+
+Uso: python -m pytest tests
+"""
+
+from __future__ import annotations
+import os
+import random
+import sys
+import unittest
+from collections import Counter
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import wheel  # noqa: E402
+
+# Casa 1 (Bancarrota) com peso nulo e casa 0 com o dobro das outras
+WEIGHTS = [2.0, 0.0] + [1.0] * (len(wheel.Wheel.HOUSES) - 2)
+
+
+def alias_distribution(prob: list[float], alias: list[int]) -> list[float]:
+    """
+    Devolve a probabilidade de cada casa dada pela tabela de alias.
+    """
+    n = len(prob)
+    dist = [p / n for p in prob]
+    for i, p in enumerate(prob):
+        dist[alias[i]] += (1 - p) / n
+    return dist
+
+
+class TestWheel(unittest.TestCase):
+    def test_alias_table_matches_weights(self):
+        rng = random.Random(1)
+        cases = [[1.0], [1.0, 1.0], [1.0, 3.0], [0.0, 5.0, 1.0], WEIGHTS]
+        for _ in range(50):
+            size = rng.randint(1, 30)
+            cases.append([rng.choice((0, 1, 2.5, 10)) for _ in range(size)])
+        for weights in cases:
+            if not sum(weights):
+                continue
+            prob, alias = wheel.alias_table(weights)
+            total = sum(weights)
+            for got, w in zip(alias_distribution(prob, alias), weights):
+                self.assertAlmostEqual(got, w / total)
+
+    def test_bad_weights(self):
+        for weights in ([], [0.0, 0.0], [1.0, -1.0]):
+            with self.assertRaises(ValueError):
+                wheel.alias_table(weights)
+        with self.assertRaises(ValueError):
+            wheel.Wheel(weights=[1.0, 2.0])
+
+    def test_unweighted_spin_keeps_the_original_draws(self):
+        # O Mooshak depende desta ordem (`random.seed(2)`)
+        rng, ref = random.Random(2), random.Random(2)
+        houses = wheel.Wheel.HOUSES
+        for _ in range(1000):
+            self.assertEqual(wheel.Wheel().spin(rng),
+                             houses[ref.randint(0, len(houses) - 1)])
+
+    def check_distribution(self, values: list[int]):
+        """
+        Verifica que as voltas `values` seguem `WEIGHTS`.
+        """
+        counts = Counter(values)
+        total = sum(WEIGHTS)
+        houses = wheel.Wheel.HOUSES
+        self.assertNotIn(houses[1], counts)
+        for house, w in zip(houses, WEIGHTS):
+            expected = len(values) * w / total
+            self.assertLess(abs(counts[house] - expected),
+                            5 * expected ** 0.5 + 1, house)
+
+    def test_weighted_spin(self):
+        rng = random.Random(3)
+        spinner = wheel.Wheel(weights=WEIGHTS)
+        self.check_distribution([spinner.spin(rng) for _ in range(40000)])
+
+    def check_spin_many(self):
+        plain = wheel.Wheel()
+        values, kinds = plain.spin_many(1000, seed=4)
+        again, _ = plain.spin_many(1000, seed=4)
+        self.assertEqual(list(values), list(again))
+        self.assertEqual(len(values), 1000)
+        self.assertTrue(set(map(int, values)) <= set(plain.HOUSES))
+        self.assertEqual(list(map(int, kinds)),
+                         [max(-int(v), 0) for v in values])
+
+        values, _ = wheel.Wheel(weights=WEIGHTS).spin_many(40000, seed=5)
+        self.check_distribution(list(map(int, values)))
+
+    def test_spin_many_with_lists(self):
+        with mock.patch.object(wheel, '_numpy', return_value=None):
+            self.check_spin_many()
+
+    @unittest.skipUnless(wheel._numpy(), 'o NumPy não está instalado')
+    def test_spin_many_with_numpy(self):
+        self.check_spin_many()
+
+
+if __name__ == "__main__":
+    unittest.main()
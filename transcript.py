@@ -0,0 +1,373 @@
+"""
+Registo binário dos jogos e repetição rápida dos registos.
+
+Cada sessão acrescenta ao seu ficheiro de registo, sem nunca o reescrever,
+um registo por acontecimento: o início de cada jogo (rondas, prémio final e
+nomes), cada puzzle escolhido, cada volta da roleta, cada resposta dos
+jogadores, cada prazo esgotado e, no fim, um resumo do estado final (o
+`spy`). Os resultados aleatórios (puzzles e voltas) são gravados antes da
+resposta que os consumiu, pelo que a repetição não precisa do ficheiro de
+puzzles nem do gerador aleatório: volta a executar cada jogo no motor e
+verifica que o estado final é o mesmo.
+
+Os registos são lidos por blocos, sem carregar o ficheiro inteiro.
+
+Uso: python transcript.py FICHEIRO... [--workers W]
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import random
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator
+
+import wheel
+
+LOG_MAGIC = b'WOFT'
+LOG_VERSION = 1
+LOG_SUFFIX = '.wlog'
+_LOG_HEADER = struct.Struct('<4sH')
+_READ_SIZE = 1 << 20  # Tamanho dos blocos lidos do ficheiro
+
+# Tipos de registo
+REC_GAME = 1  # Início de um jogo
+REC_PUZZLE = 2  # Puzzle escolhido
+REC_SPIN = 3  # Volta da roleta
+REC_ANSWER = 4  # Resposta ao pedido pendente
+REC_TIMEOUT = 5  # Prazo esgotado
+REC_END = 6  # Fim do jogo, com o resumo do estado final
+
+_GAME = struct.Struct('<BBIB')  # tipo, rondas, prémio final, jogadores
+_PUZZLE = struct.Struct('<BBBH')  # tipo, tamanhos do tema, separador, puzzle
+_SPIN = struct.Struct('<Bi')  # tipo, valor da casa
+_ANSWER = struct.Struct('<BH')  # tipo, tamanho da resposta
+_DIGEST_SIZE = 16
+
+
+def spy_digest(game: wheel.Game) -> bytes:
+    """
+    Devolve o resumo do estado técnico (`spy`) do jogo `game`.
+    """
+    text = wheel.render_event(game.spy())
+    return hashlib.blake2b(text.encode('utf-8'),
+                           digest_size=_DIGEST_SIZE).digest()
+
+
+class TranscriptWriter:
+    """
+    Representa um ficheiro de registo aberto para acrescentar jogos.
+    """
+    __slots__ = ('f',)
+
+    def __init__(self: TranscriptWriter, file_name: str):
+        """
+        Abre (ou cria) o ficheiro de registo `file_name`.
+        """
+        self.f = open(file_name, 'ab')
+        if self.f.tell() == 0:
+            self.f.write(_LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+
+    def write(self: TranscriptWriter, data: bytes):
+        """
+        Acrescenta os registos já codificados em `data`.
+        """
+        self.f.write(data)
+
+    def close(self: TranscriptWriter):
+        self.f.close()
+
+
+class RecordingWheel:
+    """
+    Representa uma roleta que guarda o resultado de cada volta de outra.
+    """
+    __slots__ = ('wheel', 'spins')
+
+    def __init__(self: RecordingWheel, wheel_: wheel.Wheel):
+        self.wheel = wheel_
+        self.spins = []
+
+    def spin(self: RecordingWheel, rng=random) -> int:
+        result = self.wheel.spin(rng)
+        self.spins.append(result)
+        return result
+
+
+class Recorder:
+    """
+    Representa a gravação de um jogo: substitui `Game.start`, `Game.step`
+    e `Game.timeout` e grava, em cada passo, os resultados aleatórios
+    seguidos da resposta.
+    """
+    __slots__ = ('game', 'writer', 'wheel', 'puzzle', 'started')
+
+    def __init__(self: Recorder, game: wheel.Game, writer: TranscriptWriter):
+        """
+        Inicializa a gravação do jogo `game`, que ainda não começou.
+
+        game: jogo a gravar
+        writer: ficheiro de registo
+        """
+        self.game = game
+        self.writer = writer
+        self.wheel = game.wheel = RecordingWheel(game.wheel)
+        self.puzzle = None
+        self.started = False  # Indica se o início do jogo foi gravado
+
+    def outcomes(self: Recorder) -> list[bytes]:
+        """
+        Devolve os registos das voltas e do puzzle novo desde o último
+        passo.
+        """
+        parts = [_SPIN.pack(REC_SPIN, s) for s in self.wheel.spins]
+        self.wheel.spins.clear()
+        cpz = self.game.current_puzzle
+        if cpz is not self.puzzle:
+            self.puzzle = cpz
+            topic = cpz.topic.encode('utf-8')
+            sep = cpz.sep.encode('utf-8')
+            secret = cpz.raw_secret.encode('utf-8')
+            parts.append(_PUZZLE.pack(REC_PUZZLE, len(topic), len(sep),
+                                      len(secret)))
+            parts += (topic, sep, secret)
+        return parts
+
+    def start(self: Recorder) -> list[wheel.Event]:
+        game = self.game
+        parts = [_GAME.pack(REC_GAME, game.round_no, game.bonus,
+                            len(game.players.all))]
+        for player in game.players.all:
+            # O tamanho cabe num byte (ver `wheel.MAX_NAME_BYTES`)
+            name = player.name.encode('utf-8')
+            parts += (bytes((len(name),)), name)
+        parts += self.outcomes()
+        self.writer.write(b''.join(parts))
+        self.started = True
+        return game.start()
+
+    def step(self: Recorder, answer: str) -> list[wheel.Event]:
+        events = self.game.step(answer)
+        parts = self.outcomes()
+        data = answer.encode('utf-8')[:0xFFFF]
+        parts += (_ANSWER.pack(REC_ANSWER, len(data)), data)
+        self.writer.write(b''.join(parts))
+        return events
+
+    def timeout(self: Recorder) -> list[wheel.Event]:
+        events = self.game.timeout()
+        parts = self.outcomes()
+        parts.append(bytes((REC_TIMEOUT,)))
+        self.writer.write(b''.join(parts))
+        return events
+
+    def close(self: Recorder):
+        """
+        Grava o fim do jogo com o resumo do estado final, se o seu início
+        tiver sido gravado.
+        """
+        if self.started:
+            self.writer.write(bytes((REC_END,)) + spy_digest(self.game))
+
+
+def records(f: BinaryIO) -> Iterator[tuple]:
+    """
+    Devolve, um a um, os registos do ficheiro aberto `f`, como tuplos
+    (tipo, dados...). Lê o ficheiro por blocos.
+    """
+    head = f.read(_LOG_HEADER.size)
+    if len(head) < _LOG_HEADER.size or \
+            _LOG_HEADER.unpack(head) != (LOG_MAGIC, LOG_VERSION):
+        raise ValueError(f'"{f.name}" não é um registo de jogos válido.')
+
+    buf = b''
+    while True:
+        chunk = f.read(_READ_SIZE)
+        if not chunk:
+            break
+        buf += chunk
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            # As respostas e as voltas são quase todos os registos
+            tag = buf[pos]
+            if tag == REC_ANSWER and pos + 3 <= end:
+                stop = pos + 3 + (buf[pos+1] | buf[pos+2] << 8)
+                if stop <= end:
+                    yield tag, buf[pos+3:stop].decode('utf-8', 'replace')
+                    pos = stop
+                    continue
+            rec, size = _parse(buf, pos)
+            if rec is None:
+                break
+            pos += size
+            yield rec
+        buf = buf[pos:]
+
+    if buf:
+        raise ValueError(f'"{f.name}" termina a meio de um registo.')
+
+
+def _parse(buf: bytes, pos: int) -> tuple[tuple | None, int]:
+    """
+    Devolve o registo que começa na posição `pos` de `buf` e o seu tamanho,
+    ou (None, 0) se o registo não estiver completo.
+    """
+    end = len(buf)
+    if pos >= end:
+        return None, 0
+    tag = buf[pos]
+    if tag == REC_SPIN:
+        if pos + _SPIN.size > end:
+            return None, 0
+        return _SPIN.unpack_from(buf, pos), _SPIN.size
+    if tag == REC_ANSWER:
+        if pos + _ANSWER.size > end:
+            return None, 0
+        _, n = _ANSWER.unpack_from(buf, pos)
+        start = pos + _ANSWER.size
+        if start + n > end:
+            return None, 0
+        answer = buf[start:start+n].decode('utf-8', 'replace')
+        return (tag, answer), _ANSWER.size + n
+    if tag == REC_TIMEOUT:
+        return (tag,), 1
+    if tag == REC_END:
+        if pos + 1 + _DIGEST_SIZE > end:
+            return None, 0
+        return (tag, buf[pos+1:pos+1+_DIGEST_SIZE]), 1 + _DIGEST_SIZE
+    if tag == REC_PUZZLE:
+        if pos + _PUZZLE.size > end:
+            return None, 0
+        _, nt, ns, nz = _PUZZLE.unpack_from(buf, pos)
+        start = pos + _PUZZLE.size
+        if start + nt + ns + nz > end:
+            return None, 0
+        topic = buf[start:start+nt].decode('utf-8')
+        sep = buf[start+nt:start+nt+ns].decode('utf-8')
+        secret = buf[start+nt+ns:start+nt+ns+nz].decode('utf-8')
+        return (tag, topic, sep, secret), _PUZZLE.size + nt + ns + nz
+    if tag == REC_GAME:
+        if pos + _GAME.size > end:
+            return None, 0
+        _, round_no, bonus, n = _GAME.unpack_from(buf, pos)
+        cur = pos + _GAME.size
+        names = []
+        for _ in range(n):
+            if cur >= end or cur + 1 + buf[cur] > end:
+                return None, 0
+            names.append(buf[cur+1:cur+1+buf[cur]].decode('utf-8'))
+            cur += 1 + buf[cur]
+        return (tag, round_no, bonus, names), cur - pos
+    raise ValueError(f'Registo desconhecido ({tag}).')
+
+
+class ReplayWheel:
+    """
+    Representa uma roleta que devolve as voltas gravadas.
+    """
+    __slots__ = ('spins',)
+
+    def __init__(self: ReplayWheel):
+        self.spins = deque()
+
+    def spin(self: ReplayWheel, rng=None) -> int:
+        return self.spins.popleft()
+
+
+class ReplayPuzzles:
+    """
+    Representa os puzzles gravados de um jogo, pela ordem em que saíram.
+    """
+    __slots__ = ('queue', 'deck')
+
+    def __init__(self: ReplayPuzzles, round_no: int):
+        self.queue = deque()
+        self.deck = range(round_no)
+
+    def set_puzzle(self: ReplayPuzzles, rng=None,
+                   level=None) -> wheel.Puzzle:
+        return self.queue.popleft()
+
+    def drop_puzzle(self: ReplayPuzzles):
+        pass
+
+
+def replay(f: BinaryIO) -> Iterator[tuple[wheel.Game, bool]]:
+    """
+    Repete os jogos gravados no ficheiro aberto `f` e devolve, para cada um,
+    o jogo no estado final e se esse estado é igual ao gravado. Lança
+    ValueError se um registo aparecer fora de um jogo.
+    """
+    game = None
+    source = None
+    start = None  # Início de um jogo, à espera do primeiro puzzle
+    for rec in records(f):
+        tag = rec[0]
+        if game is None and tag != REC_GAME and \
+                (tag != REC_PUZZLE or source is None):
+            raise ValueError(f'"{f.name}" tem um registo corrompido: '
+                             f'tipo {tag} fora de um jogo.')
+        if tag == REC_SPIN:
+            game.wheel.spins.append(rec[1])
+        elif tag == REC_ANSWER:
+            game.step(rec[1])
+        elif tag == REC_PUZZLE:
+            source.queue.append(wheel.Puzzle(rec[1], rec[3], rec[2]))
+            if start is not None:
+                _, round_no, bonus, names = start
+                start = None
+                game = wheel.Game(None, names, round_no, puzzles=source)
+                game.bonus = bonus
+                game.wheel = ReplayWheel()
+        elif tag == REC_TIMEOUT:
+            game.timeout()
+        elif tag == REC_GAME:
+            start = rec
+            source = ReplayPuzzles(rec[1])
+        elif tag == REC_END:
+            yield game, spy_digest(game) == rec[1]
+            game = source = None
+
+
+def replay_file(file_name: str) -> tuple[int, int]:
+    """
+    Repete os jogos do ficheiro `file_name` e devolve o número de jogos e o
+    número de jogos cujo estado final não coincide.
+    """
+    games = bad = 0
+    with open(file_name, 'rb') as f:
+        for _, ok in replay(f):
+            games += 1
+            bad += not ok
+    return games, bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    games = bad = 0
+    with ProcessPoolExecutor(args.workers) as pool:
+        for name, (g, b) in zip(args.files, pool.map(replay_file,
+                                                     args.files)):
+            games += g
+            bad += b
+            if b:
+                print(f'"{name}": {b} de {g} jogo(s) com estado diferente.')
+    elapsed = time.perf_counter() - start
+    print(f"{games} jogo(s) repetido(s) em {elapsed:.2f} s "
+          f"({games / max(elapsed, 1e-9):.0f} jogos/s), {bad} diferente(s).")
+    if bad:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
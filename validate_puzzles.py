@@ -0,0 +1,342 @@
+"""
+Valida e limpa um ficheiro de puzzles, mesmo com milhões de linhas: o
+ficheiro é lido por blocos, divididos por vários processos, e cada linha é
+verificada (separador, tema, puzzle, letras e carateres suportados). Todas
+as linhas mal formadas são indicadas com o número da linha e o motivo, e os
+puzzles repetidos (comparados depois de normalizados como em `clean_text`,
+sem espaços a mais) são retirados, ficando a primeira ocorrência.
+
+Os repetidos são detetados com uma tabela de impressões digitais de 64 bits
+(12 bytes por puzzle, com o número da linha da primeira ocorrência) que
+cresce até ao limite de memória indicado.
+
+Uso: python validate_puzzles.py ENTRADA [-o SAÍDA] [--workers W]
+         [--report RELATÓRIO] [--max-memory MIB] [--bank]
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import wheel
+
+CHUNK_SIZE = 4 << 20  # Bytes por bloco
+# Carateres aceites num puzzle, depois de normalizado (as letras a-z são as
+# que se podem pedir; os restantes ficam sempre à vista)
+ALLOWED = frozenset("abcdefghijklmnopqrstuvwxyz0123456789 .,;:!?'\"-()&/")
+_EMPTY = 0  # Posição livre da tabela de impressões digitais
+
+
+class FingerprintSet:
+    """
+    Representa um conjunto de impressões digitais de 64 bits, com
+    endereçamento aberto sobre um `array`, que guarda também o número da
+    linha de cada uma. Ocupa 12 bytes por posição (contra cerca de 70 de um
+    `set` de inteiros) e duplica a capacidade quando fica 70% cheio, sem
+    passar de `max_bytes`.
+
+    Duas frases diferentes só colidem com probabilidade de cerca de
+    n²/2**65 (3e-6 para 10 milhões de puzzles).
+    """
+    __slots__ = ('keys', 'lines', 'mask', 'count', 'max_bytes')
+
+    def __init__(self: FingerprintSet, expected: int = 1024,
+                 max_bytes: int = 1 << 30):
+        """
+        Inicializa o conjunto vazio.
+
+        expected: número de elementos esperado (evita crescer, se couber
+            em `max_bytes`)
+        max_bytes: memória máxima da tabela
+        """
+        capacity = 1024
+        while capacity * 0.7 < expected and capacity * 24 <= max_bytes:
+            capacity *= 2
+        self.max_bytes = max_bytes
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self: FingerprintSet, capacity: int):
+        if capacity * 12 > self.max_bytes:
+            raise MemoryError(f'A tabela de repetidos precisa de mais de '
+                              f'{self.max_bytes >> 20} MiB '
+                              f'(ver --max-memory).')
+        self.keys = array('Q', bytes(8 * capacity))
+        self.lines = array('I', bytes(4 * capacity))
+        self.mask = capacity - 1
+
+    def add(self: FingerprintSet, key: int, line: int) -> int:
+        """
+        Acrescenta a impressão digital `key`, da linha `line`. Devolve 0 se
+        for nova, ou a linha da primeira ocorrência se já existir.
+        """
+        key = key or 1
+        keys, mask = self.keys, self.mask
+        i = key & mask
+        while True:
+            k = keys[i]
+            if k == key:
+                return self.lines[i]
+            if k == _EMPTY:
+                break
+            i = (i + 1) & mask
+        keys[i] = key
+        self.lines[i] = line
+        self.count += 1
+        if self.count > 0.7 * (mask + 1):
+            self._grow()
+        return 0
+
+    def _grow(self: FingerprintSet):
+        keys, lines = self.keys, self.lines
+        self._allocate(2 * (self.mask + 1))
+        new_keys, new_lines, mask = self.keys, self.lines, self.mask
+        for k, line in zip(keys, lines):
+            if k != _EMPTY:
+                i = k & mask
+                while new_keys[i] != _EMPTY:
+                    i = (i + 1) & mask
+                new_keys[i] = k
+                new_lines[i] = line
+
+
+LETTERS = frozenset(wheel.LETTER_BIT)
+
+
+def check_lines(lines: list[str], sep: str) -> tuple[list, list]:
+    """
+    Verifica as linhas `lines` (sem a mudança de linha). Devolve os erros,
+    como (índice da linha, motivo, texto), e as linhas válidas, como
+    (índice da linha, tema, puzzle, puzzle normalizado). Os puzzles são
+    normalizados em bloco (`wheel.clean_texts`), sem espaços a mais.
+    """
+    errors = []
+    parsed = []
+    for i, line in enumerate(lines):
+        topic, found, secret = line.partition(sep)
+        topic = topic.strip()
+        secret = secret.strip()
+        if not found:
+            errors.append((i, 'falta o separador', line[:80]))
+        elif not topic:
+            errors.append((i, 'tema vazio', line[:80]))
+        elif not secret:
+            errors.append((i, 'puzzle vazio', line[:80]))
+        else:
+            parsed.append((i, topic, secret))
+
+    valid = []
+    keys = wheel.clean_texts(secret for _, _, secret in parsed)
+    for (i, topic, secret), key in zip(parsed, keys):
+        key = " ".join(key.split())
+        chars = set(key)
+        if not chars <= ALLOWED:
+            bad = "".join(sorted(chars - ALLOWED))
+            errors.append((i, f'carateres não suportados: {bad!r}',
+                           lines[i][:80]))
+        elif chars.isdisjoint(LETTERS):
+            errors.append((i, 'o puzzle não tem letras', lines[i][:80]))
+        else:
+            valid.append((i, topic, secret, key))
+
+    errors.sort()
+    return errors, valid
+
+
+def check_chunk(task: tuple[str, int, int, str]) -> tuple:
+    """
+    Verifica as linhas do bloco de bytes [start, end) do ficheiro e devolve
+    (número de linhas, erros, linhas válidas, impressões digitais, linhas
+    limpas). Os erros são (linha no bloco, motivo, texto); as linhas
+    válidas são os números das linhas no bloco, pela mesma ordem das
+    impressões digitais (64 bits do puzzle normalizado) e das linhas limpas.
+
+    task: (nome do ficheiro, início, fim, separador)
+    """
+    file_name, start, end, sep = task
+    with open(file_name, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    if data.endswith(b'\n'):
+        data = data[:-1]
+    raw_lines = data.split(b'\n') if data else []
+    errors = []
+    try:
+        lines = data.decode('utf-8').split('\n') if data else []
+    except UnicodeDecodeError:
+        # Só neste caso se descodifica linha a linha
+        lines = []
+        for i, raw in enumerate(raw_lines):
+            try:
+                lines.append(raw.decode('utf-8'))
+            except UnicodeDecodeError as e:
+                errors.append((i, f'UTF-8 inválido na posição {e.start}',
+                               raw[:80].decode('utf-8', 'replace')))
+                lines.append(sep)  # Marcada como inválida acima
+    lines = [line.rstrip('\r') for line in lines]
+
+    bad, good = check_lines(lines, sep)
+    if errors:
+        failed = {i for i, _, _ in errors}
+        bad = sorted(errors + [e for e in bad if e[0] not in failed])
+    valid = array('I')
+    keys = array('Q')
+    clean = []
+    blake2b = hashlib.blake2b
+    for i, topic, secret, key in good:
+        valid.append(i + 1)
+        keys.append(int.from_bytes(blake2b(key.encode('utf-8'),
+                                           digest_size=8).digest(), 'little'))
+        clean.append(f'{topic}{sep}{secret}\n')
+
+    return (len(lines), [(i + 1, reason, text) for i, reason, text in bad],
+            valid, keys, clean)
+
+
+def chunks(file_name: str, sep: str,
+           chunk_size: int = CHUNK_SIZE) -> list[tuple[str, int, int, str]]:
+    """
+    Divide o ficheiro em blocos de cerca de `chunk_size` bytes que acabam
+    em mudanças de linha.
+    """
+    size = os.path.getsize(file_name)
+    tasks = []
+    start = 0
+    with open(file_name, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            tasks.append((file_name, start, end, sep))
+            start = end
+    return tasks
+
+
+def results(tasks: list, workers: int):
+    """
+    Devolve os resultados de `check_chunk` pela ordem dos blocos, com no
+    máximo dois blocos por processo à espera, para limitar a memória.
+    """
+    if workers <= 1:
+        yield from map(check_chunk, tasks)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(check_chunk, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def validate(file_name: str, out_name: str | None = None, sep: str = ": ",
+             workers: int = 1, report=None,
+             max_memory: int = 1 << 30) -> dict[str, int]:
+    """
+    Valida o ficheiro `file_name`, escreve os puzzles válidos e sem
+    repetidos em `out_name` (se indicado) e devolve as contagens.
+
+    file_name: ficheiro de puzzles
+    out_name: ficheiro limpo a escrever
+    sep: separador entre o tema e o puzzle
+    workers: número de processos
+    report: ficheiro aberto onde escrever uma linha por problema
+        ("linha<TAB>motivo<TAB>texto")
+    max_memory: memória máxima da tabela de repetidos, em bytes
+    """
+    tasks = chunks(file_name, sep)
+    # Estimativa do número de linhas, pelos primeiros 64 KiB
+    with open(file_name, 'rb') as f:
+        head = f.read(1 << 16)
+    per_line = max(1, len(head)) / max(1, head.count(b'\n'))
+    seen = FingerprintSet(int(os.path.getsize(file_name) / per_line),
+                          max_memory)
+    counts = {'lines': 0, 'malformed': 0, 'duplicates': 0, 'written': 0}
+
+    out = None
+    if out_name is not None:
+        out = open(out_name + '.tmp', 'w', encoding='utf-8')
+    try:
+        base = 0  # Número de linhas dos blocos anteriores
+        for n_lines, errors, valid, keys, clean in results(tasks, workers):
+            counts['malformed'] += len(errors)
+            if report is not None:
+                for n, reason, text in errors:
+                    report.write(f'{base + n}\t{reason}\t{text}\n')
+
+            kept = []
+            for n, key, line in zip(valid, keys, clean):
+                first = seen.add(key, base + n)
+                if first:
+                    counts['duplicates'] += 1
+                    if report is not None:
+                        report.write(f'{base + n}\trepetido da linha '
+                                     f'{first}\t{line[:80].rstrip()}\n')
+                else:
+                    kept.append(line)
+            counts['written'] += len(kept)
+            if out is not None:
+                out.writelines(kept)
+            base += n_lines
+        counts['lines'] = base
+    finally:
+        if out is not None:
+            out.close()
+    if out is not None:
+        os.replace(out_name + '.tmp', out_name)
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.
+                                     RawDescriptionHelpFormatter)
+    parser.add_argument("file_name")
+    parser.add_argument("-o", "--output", default=None,
+                        help="ficheiro limpo (por omissão, só valida)")
+    parser.add_argument("--sep", default=": ")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--report", default=None,
+                        help="ficheiro com os problemas (por omissão, stderr)")
+    parser.add_argument("--max-memory", type=int, default=1024,
+                        help="memória máxima da tabela de repetidos, em MiB")
+    parser.add_argument("--bank", action="store_true",
+                        help="compila também o ficheiro limpo num banco")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = sys.stderr
+    if args.report:
+        report = open(args.report, 'w', encoding='utf-8')
+    try:
+        counts = validate(args.file_name, args.output, args.sep,
+                          args.workers, report, args.max_memory << 20)
+    except MemoryError as e:
+        raise SystemExit(str(e))
+    finally:
+        if report is not sys.stderr:
+            report.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"{counts['lines']} linha(s): {counts['malformed']} mal "
+          f"formada(s), {counts['duplicates']} repetida(s), "
+          f"{counts['written']} puzzle(s) válido(s) em {elapsed:.2f} s.")
+    if args.output and args.bank:
+        print(f'Banco "{wheel.compile_puzzles(args.output, sep=args.sep)}" '
+              f'criado.')
+    if counts['malformed'] or counts['duplicates']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,78 @@ Pedro Miguel Reis
 """
 
 from __future__ import annotations
+import mmap
 import os
 import random
-import re
+import select
+import struct
+import sys
+import time
+import unicodedata
+from array import array
+from functools import lru_cache
+from itertools import accumulate
+from collections import namedtuple
+from collections.abc import Callable, Iterable, Iterator
+
+# Os módulos só usados por algumas funções (argparse, hashlib, json, NumPy)
+# são importados por essas funções, e o `typing` não é usado, para que
+# importar o jogo seja rápido e não tenha efeitos.
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """
+    Devolve o módulo NumPy, importado no primeiro uso, ou None se não
+    estiver instalado.
+    """
+    try:
+        import numpy
+    except ImportError:  # O NumPy só é usado nas voltas em bloco
+        return None
+    return numpy
+
+
+@lru_cache(maxsize=None)
+def _accent_table() -> dict[int, str]:
+    """
+    Devolve a tabela de tradução que substitui cada letra latina acentuada
+    (blocos Latin-1, Latin Extended-A/B e Latin Extended Additional) pela
+    respetiva letra base minúscula. A tabela é construída no primeiro uso.
+    """
+    table = {}
+    ranges = (range(0x00C0, 0x0250), range(0x1E00, 0x1F00))
+    for r in ranges:
+        for cp in r:
+            base = unicodedata.normalize('NFD', chr(cp))[0]
+            if base != chr(cp) and base.isascii() and base.isalpha():
+                table[cp] = base.lower()
+
+    return table
+
+
+_CACHE_MAX_LEN = 8  # Só as strings curtas (comandos, letras) vão para a cache
+_BULK_CHUNK = 4096  # Número de strings normalizadas de uma só vez
+
+
+@lru_cache(maxsize=1024)
+def _clean_short(s: str) -> str:
+    """
+    Versão com cache de `clean_text` para strings curtas.
+    """
+    return _clean(s)
+
+
+def _clean(s: str) -> str:
+    """
+    Normaliza `s` numa só passagem pela tabela de acentos (dispensada quando
+    `s` é ASCII).
+    """
+    s = s.lower().strip()
+    if s.isascii():
+        return s
+
+    return s.translate(_accent_table())
 
 
 def clean_text(s: str) -> str:
@@ -20,53 +89,286 @@ def clean_text(s: str) -> str:
 
     s: string a limpar
     """
-    # lidar com letras maiúsculas e espaços
-    s = s.lower().strip()
+    if len(s) <= _CACHE_MAX_LEN:
+        return _clean_short(s)
+
+    return _clean(s)
+
+
+def clean_texts(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Limpa em bloco uma lista (ou stream) de strings, com a mesma semântica de
+    `clean_text`. As strings são agrupadas e normalizadas numa só passagem
+    por bloco.
+
+    lines: strings a limpar
+    """
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == _BULK_CHUNK:
+            yield from _clean_chunk(chunk)
+            chunk = []
+
+    if chunk:
+        yield from _clean_chunk(chunk)
+
+
+def _clean_chunk(chunk: list[str]) -> list[str]:
+    """
+    Normaliza um bloco de strings de uma só vez.
+
+    chunk: strings a limpar
+    """
+    block = '\0'.join(chunk).lower()
+    if not block.isascii():
+        block = block.translate(_accent_table())
+
+    parts = block.split('\0')
+    # Alguma string continha o separador, normaliza uma a uma
+    if len(parts) != len(chunk):
+        return [clean_text(s) for s in chunk]
+
+    return [p.strip() for p in parts]
+
+
+VOWELS = "aeiou"
+CONSONANTS = "bcdfghjklmnpqrstvwxyz"
+LETTER_BIT = {chr(97 + i): 1 << i for i in range(26)}  # letra -> bit
+
+
+def letter_mask(s: str) -> int:
+    """
+    Devolve a máscara de 26 bits das letras a-z presentes em `s` (já limpa).
+
+    s: string a analisar
+    """
+    mask = 0
+    for letter in set(s):
+        mask |= LETTER_BIT.get(letter, 0)
+
+    return mask
+
+
+def mask_letters(mask: int) -> str:
+    """
+    Devolve, por ordem alfabética, as letras presentes na máscara `mask`.
+
+    mask: máscara de letras
+    """
+    return "".join(c for c, bit in LETTER_BIT.items() if mask & bit)
 
-    # lidar com acentos e cedilha
-    s = re.sub(r'[áàãâä]', 'a', s)
-    s = re.sub(r'[éèêë]', 'e', s)
-    s = re.sub(r'[íìîï]', 'i', s)
-    s = re.sub(r'[óòõôö]', 'o', s)
-    s = re.sub(r'[úùûü]', 'u', s)
-    s = re.sub(r'[ç]', 'c', s)
-    s = re.sub(r'[ñ]', 'n', s)
-    s = re.sub(r'[ýÿ]', 'y', s)
 
-    return s
+VOWEL_MASK = letter_mask(VOWELS)
+CONSONANT_MASK = letter_mask(CONSONANTS)
+# Tipo do array de caracteres visíveis de um puzzle ('u' está obsoleto)
+_VISIBLE_TYPECODE = 'w' if sys.version_info >= (3, 13) else 'u'
 
 
 class Wheel:
     """
     Representa a roda da sorte.
     """
-    def __init__(self: Wheel):
+    __slots__ = ('houses', 'weights', 'prob', 'alias')
+
+    HOUSES = (
+        5000, -1, 750, 1000, 600, 250, -4, 1500,
+        450, 200, -2, 150, 800, 900, 50, 850, 1200,
+        2000, -3, 100
+        )
+
+    def __init__(self: Wheel, houses: list[int] | None = None,
+                 weights: list[float] | None = None):
         """
         Inicializa a roda da sorte com as casas e respetivos valores.
         -1: Bancarrota
         -2: Ficha de recuperação
         -3: Perde Vez
         -4: Vogal Grátis
+
+        houses: valores das casas (por omissão `Wheel.HOUSES`)
+        weights: tamanho relativo de cada casa (por omissão todas iguais)
         """
-        self.houses = [
-            5000, -1, 750, 1000, 600, 250, -4, 1500,
-            450, 200, -2, 150, 800, 900, 50, 850, 1200,
-            2000, -3, 100
-            ]
+        self.houses = self.HOUSES if houses is None else tuple(houses)
+        self.weights = weights
+        self.prob = None  # Tabela de alias (probabilidades)
+        self.alias = None  # Tabela de alias (casas alternativas)
+        if weights is not None:
+            if len(weights) != len(self.houses):
+                raise ValueError('É preciso um peso por casa.')
+            self.prob, self.alias = alias_table(weights)
 
-    def spin(self: Wheel) -> int:
+    def spin(self: Wheel, rng=random) -> int:
         """
         Roda a roda da sorte e devolve o valor da casa onde parou.
+
+        rng: gerador aleatório (por omissão, o do módulo `random`)
         """
-        idx = random.randint(0, len(self.houses)-1)
+        idx = rng.randint(0, len(self.houses)-1)
+        if self.prob is not None and rng.random() >= self.prob[idx]:
+            idx = self.alias[idx]
         return self.houses[idx]
 
+    def spin_many(self: Wheel, n: int, seed: int | None = None) -> tuple:
+        """
+        Roda a roda da sorte `n` vezes de uma só vez e devolve dois vetores:
+        os valores das casas e o tipo de cada resultado (0 para um valor em
+        dinheiro, 1 a 4 para as casas especiais -1 a -4), que permite
+        classificar os resultados sem testar um a um. Usa o NumPy se estiver
+        instalado e listas caso contrário.
+
+        n: número de voltas
+        seed: semente do gerador (por omissão usa um gerador novo)
+        """
+        houses = self.houses
+        size = len(houses)
+        np = _numpy()
+        if np is not None:
+            gen = np.random.default_rng(seed)
+            idx = gen.integers(0, size, n)
+            if self.prob is not None:
+                reject = gen.random(n) >= np.asarray(self.prob)[idx]
+                idx = np.where(reject, np.asarray(self.alias)[idx], idx)
+            values = np.asarray(houses)[idx]
+            kinds = np.maximum(-values, 0)
+            return values, kinds
+
+        rng = random.Random(seed)
+        idx = [int(rng.random() * size) for _ in range(n)]
+        if self.prob is not None:
+            prob, alias = self.prob, self.alias
+            idx = [i if rng.random() < prob[i] else alias[i] for i in idx]
+        values = [houses[i] for i in idx]
+        kinds = [max(-v, 0) for v in values]
+        return values, kinds
+
+
+def alias_table(weights: list[float]) -> tuple[list[float], list[int]]:
+    """
+    Constrói a tabela de alias de Vose para os pesos `weights`: cada casa i é
+    escolhida com probabilidade prob[i] e, caso contrário, é substituída por
+    alias[i], o que permite sortear com pesos em O(1).
+
+    weights: pesos das casas
+    """
+    n = len(weights)
+    total = sum(weights)
+    if total <= 0 or min(weights) < 0:
+        raise ValueError('Os pesos têm de ser positivos.')
+
+    scaled = [w * n / total for w in weights]
+    prob = [1.0] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1]
+    large = [i for i, p in enumerate(scaled) if p >= 1]
+    while small and large:
+        s = small.pop()
+        g = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] -= 1 - scaled[s]
+        if scaled[g] < 1:
+            small.append(g)
+        else:
+            large.append(g)
+
+    return prob, alias
+
+
+def stream_seed(seed: int, *keys) -> int:
+    """
+    Deriva, da semente principal `seed` e das chaves `keys` (número do jogo,
+    do bloco, da sessão...), uma semente de 64 bits. Sementes derivadas de
+    chaves diferentes dão sequências independentes, pelo que cada jogo pode
+    ter o seu próprio gerador sem depender da ordem em que os jogos correm.
+
+    seed: semente principal
+    keys: chaves que identificam a sequência
+    """
+    import hashlib
+    text = ':'.join(map(str, (seed,) + keys))
+    h = hashlib.blake2b(text.encode(), digest_size=8)
+    return int.from_bytes(h.digest(), 'little')
+
+
+def game_rng(seed: int, *keys) -> random.Random:
+    """
+    Devolve um gerador aleatório próprio, iniciado com
+    `stream_seed(seed, *keys)`, para passar a `Game`.
+
+    seed: semente principal
+    keys: chaves que identificam a sequência
+    """
+    return random.Random(stream_seed(seed, *keys))
+
+
+# Níveis de dificuldade dos puzzles (ver `difficulty_score`)
+DIFFICULTY_LEVELS = ('fácil', 'médio', 'difícil')
+# Pontuações a partir das quais começa cada nível, depois do primeiro. São
+# fixas, para que cada puzzle seja pontuado uma única vez
+DIFFICULTY_THRESHOLDS = (0.4, 0.55)
+RARE_MASK = letter_mask("fjkqvwxyz")  # Letras pouco frequentes
+# Dificuldade de cada tema, entre 0 e 1 (os restantes valem 0.5)
+TOPIC_DIFFICULTY = {'Animal': 0.3, 'Fruta': 0.3, 'Frase': 0.4, 'Lugar': 0.5,
+                    'Filme': 0.6, 'Marca': 0.6, 'Pessoa': 0.7,
+                    'Bailado': 0.8}
+
+
+def difficulty_score(topic: str, vowels: int, consonants: int,
+                     mask: int) -> float:
+    """
+    Devolve a dificuldade de um puzzle, entre 0 (fácil) e 1 (difícil):
+    pesa o número de letras diferentes a descobrir, a falta de vogais, as
+    letras raras, os puzzles curtos (com pouco contexto) e o tema.
+
+    topic: tema do puzzle
+    vowels: número de vogais do puzzle, com repetições
+    consonants: número de consoantes do puzzle, com repetições
+    mask: máscara das letras do puzzle
+    """
+    letters = max(1, vowels + consonants)
+    return (0.3 * min(mask.bit_count(), 16) / 16
+            + 0.2 * max(0.0, 1 - 2 * vowels / letters)
+            + 0.2 * min((mask & RARE_MASK).bit_count(), 2) / 2
+            + 0.15 * (1 - min(letters, 30) / 30)
+            + 0.15 * TOPIC_DIFFICULTY.get(topic, 0.5))
+
+
+def difficulty_level(score: float) -> int:
+    """
+    Devolve o nível de dificuldade (posição em `DIFFICULTY_LEVELS`) de uma
+    pontuação de `difficulty_score`.
+    """
+    level = 0
+    while level < len(DIFFICULTY_THRESHOLDS) and \
+            score >= DIFFICULTY_THRESHOLDS[level]:
+        level += 1
+    return level
+
+
+def difficulty_curve(round_no: int, first: int = 0,
+                     last: int = len(DIFFICULTY_LEVELS) - 1) -> tuple:
+    """
+    Devolve uma curva de dificuldade de `round_no` rondas, que sobe (ou
+    desce) linearmente do nível `first` ao nível `last`.
+    """
+    if round_no == 1:
+        return (first,)
+    return tuple(round(first + (last - first) * r / (round_no - 1))
+                 for r in range(round_no))
+
 
 class Puzzle:
     """
     Representa um puzzle.
     """
-    def __init__(self: Puzzle, topic: str, secret: str, sep: str):
+    __slots__ = ('topic', 'sep', 'raw_secret', 'secret', 'visible',
+                 'positions', 'mask', 'revealed', 'guessed',
+                 'existing_vowels', 'existing_consonants')
+
+    def __init__(self: Puzzle, topic: str, secret: str, sep: str,
+                 clean: str | None = None, mask: int | None = None,
+                 positions: dict[str, list[int]] | None = None):
         """
         Inicializa um puzzle com o seu tema, o puzzle original, e o separador
         entre eles.
@@ -74,13 +376,30 @@ class Puzzle:
         topic: tema do puzzle
         secret: puzzle original
         sep: separador entre o tema e o puzzle
+        clean: puzzle já limpo (evita voltar a chamar `clean_text`)
+        mask: máscara das letras do puzzle limpo, se já for conhecida
+        positions: índice de posições de outro puzzle igual (é partilhado)
         """
         self.topic = topic
         self.sep = sep
         self.raw_secret = secret.strip()
-        self.secret = clean_text(self.raw_secret)  # Puzzle limpo
-        self.visible = ['-'] * len(self.secret)
+        if clean is None:
+            clean = clean_text(self.raw_secret)
+        self.secret = clean  # Puzzle limpo
+        # Caracteres visíveis, um por posição
+        self.visible = array(_VISIBLE_TYPECODE, '-' * len(self.secret))
         self.format_visible()
+        if positions is None:
+            positions = {}
+            self.positions = positions  # letra -> posições no puzzle
+            self.index_letters()
+        else:
+            self.positions = positions
+        if mask is None:
+            mask = letter_mask(self.secret)
+        self.mask = mask  # Letras presentes no puzzle
+        self.revealed = 0  # Letras já descobertas
+        self.guessed = 0  # Letras já pedidas, existam ou não no puzzle
         self.existing_vowels = ""
         self.existing_consonants = ""
         self.get_existing_letters()
@@ -92,7 +411,30 @@ class Puzzle:
         """
         return f'{self.topic}{self.sep}{self.raw_secret}'
 
-    def format_visible(self: Puzzle) -> list[str]:
+    def fresh(self: Puzzle) -> Puzzle:
+        """
+        Devolve uma cópia do puzzle sem nenhuma letra descoberta.
+        """
+        if self.revealed or not self.mask:
+            return Puzzle(self.topic, self.raw_secret, self.sep, self.secret,
+                          self.mask, self.positions)
+
+        # Nada foi descoberto: copia os campos já calculados
+        twin = Puzzle.__new__(Puzzle)
+        twin.topic = self.topic
+        twin.sep = self.sep
+        twin.raw_secret = self.raw_secret
+        twin.secret = self.secret
+        twin.visible = self.visible[:]
+        twin.positions = self.positions
+        twin.mask = self.mask
+        twin.revealed = 0
+        twin.guessed = 0
+        twin.existing_vowels = self.existing_vowels
+        twin.existing_consonants = self.existing_consonants
+        return twin
+
+    def format_visible(self: Puzzle) -> array:
         """
         Substitui os caracteres não alfabéticos do puzzle por eles mesmos.
         """
@@ -102,42 +444,74 @@ class Puzzle:
 
         return self.visible
 
-    def find_letter(self: Puzzle, s: str) -> tuple[list[str], int]:
+    def index_letters(self: Puzzle) -> dict[str, list[int]]:
+        """
+        Constrói o índice que associa cada letra do puzzle às posições onde
+        ocorre.
+        """
+        for i, letter in enumerate(self.secret):
+            if letter.isalpha():
+                self.positions.setdefault(letter, []).append(i)
+
+        return self.positions
+
+    def count_letter(self: Puzzle, s: str) -> int:
+        """
+        Devolve o número de ocorrências da letra `s` (já limpa) no puzzle.
+
+        s: letra a contar
+        """
+        return len(self.positions.get(s, ()))
+
+    def find_letter(self: Puzzle, s: str) -> tuple[array, int]:
         """
         Atualiza a lista de caracteres visíveis com a letra presente no
         argumento `s`. Lida com letras maiúsculas, espaços, acentos e cedilha.
 
+        Se a letra não for válida, não existir no puzzle ou já tiver sido
+        descoberta, o número de ocorrências devolvido é zero.
+
         s: string com a letra a procurar
         """
         # Limpa a string de acentos, cedilha, leading whitespaces e maiúsculas
         s = clean_text(s)
         count = 0
 
-        if (not s.isalpha()) or (len(s) != 1):
-            print(f'"{s}" não é uma letra válida.')
+        bit = LETTER_BIT.get(s, 0)
+        if (not bit & self.mask) or (bit & self.revealed):
             return self.visible, count
 
-        if s not in self.secret:
-            print(f'Não há ocorrências da letra "{s}".')
-            return self.visible, count
+        self.revealed |= bit
+        for i in self.positions[s]:
+            self.visible[i] = self.raw_secret[i]
+            count += 1
 
-        if s in self.visible:
-            print(f'A letra "{s}" já foi descoberta.')
-            return self.visible, count
+        return self.visible, count
 
-        if s in self.secret:
-            for i in range(len(self.secret)):
-                if s == self.secret[i]:
-                    self.visible[i] = self.raw_secret[i]
-                    count += 1
+    def is_revealed(self: Puzzle) -> bool:
+        """
+        Indica se todas as letras do puzzle já foram descobertas.
+        """
+        return self.revealed == self.mask
 
-        return self.visible, count
+    def hidden_consonants(self: Puzzle) -> int:
+        """
+        Devolve a máscara das consoantes do puzzle ainda por descobrir.
+        """
+        return self.mask & CONSONANT_MASK & ~self.revealed
 
     def get_visible(self: Puzzle) -> str:
         """
         Retorna a string de caracteres visíveis.
         """
-        return f"{self.topic}{self.sep}{''.join(self.visible)}"
+        return f"{self.topic}{self.sep}{self.visible.tounicode()}"
+
+    def reveal_all(self: Puzzle):
+        """
+        Mostra o puzzle original por inteiro.
+        """
+        self.visible = array(_VISIBLE_TYPECODE, self.raw_secret)
+        self.revealed = self.mask
 
     def get_existing_letters(self: Puzzle):
         """
@@ -150,21 +524,840 @@ class Puzzle:
                 else:
                     self.existing_consonants += letter
 
+    def difficulty(self: Puzzle) -> int:
+        """
+        Devolve o nível de dificuldade do puzzle (ver `difficulty_score`).
+        """
+        return difficulty_level(difficulty_score(
+            self.topic, len(self.existing_vowels),
+            len(self.existing_consonants), self.mask))
+
+
+RELOAD_BLOCK = 1 << 16  # Bytes de cada bloco comparado nas recargas
+
+
+def _hash_range(fd: int, start: int, end: int) -> int:
+    """
+    Devolve o hash (8 bytes) dos bytes [start, end) do ficheiro aberto
+    `fd` (os que existirem).
+    """
+    import hashlib
+    digest = hashlib.blake2b(os.pread(fd, end - start, start),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _block_hashes(fd: int, start: int, end: int) -> array:
+    """
+    Devolve os hashes dos blocos de `RELOAD_BLOCK` bytes dos bytes
+    [start, end) do ficheiro aberto `fd`, com `start` múltiplo de
+    `RELOAD_BLOCK`; o último bloco pode ser mais curto.
+    """
+    return array('Q', [_hash_range(fd, i, min(i + RELOAD_BLOCK, end))
+                       for i in range(start, end, RELOAD_BLOCK)])
+
+
+class LazyPuzzleList:
+    """
+    Representa uma lista de puzzles lida de forma preguiçosa: guarda apenas o
+    offset de cada linha do ficheiro e só constrói o `Puzzle` quando ele é
+    acedido, lendo só essa linha.
+    """
+    def __init__(self: LazyPuzzleList, file_name: str, sep: str):
+        """
+        Indexa os offsets das linhas do ficheiro numa única passagem.
+
+        file_name: nome do ficheiro de puzzles
+        sep: separador entre o tema e o puzzle
+        """
+        self.file_name = file_name
+        self.sep = sep
+        self.offsets = array('q')  # Offset do início de cada linha
+        self.blocks = None  # Hashes dos blocos do ficheiro (ver `reload`)
+        # Versão seguinte, se o ficheiro foi reescrito no mesmo i-node
+        self.successor = None
+        self.users = 0  # Sessões que usam a lista (ver `Puzzles.session`)
+        self.retired = False  # Indica se a lista já foi substituída
+        self._open()
+        self.index_lines()
+
+    def _open(self: LazyPuzzleList):
+        """
+        Abre o ficheiro e regista a sua identidade.
+        """
+        self._file = open(self.file_name, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self.size = stat.st_size  # Bytes indexados
+        # i-node, tamanho e mtime do ficheiro indexado
+        self.stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def index_lines(self: LazyPuzzleList) -> array:
+        """
+        Percorre o ficheiro e regista o offset de cada linha.
+        """
+        self._file.seek(0)
+        self.offsets.append(0)
+        self.offsets.extend(accumulate(map(len, self._file)))
+        # O último offset é o fim do ficheiro, não o início de uma linha
+        self.size = self.offsets.pop()
+        self.stat = self.stat[:1] + (self.size,) + self.stat[2:]
+        return self.offsets
+
+    def close(self: LazyPuzzleList):
+        """
+        Fecha o ficheiro. A lista deixa de poder ser lida.
+        """
+        if not self._file.closed:
+            self._file.close()
+            if self.successor is not None:
+                self.successor[0].release()
+
+    def acquire(self: LazyPuzzleList):
+        """
+        Regista mais uma sessão que usa a lista.
+        """
+        self.users += 1
+
+    def release(self: LazyPuzzleList):
+        """
+        Regista o fim de uma sessão que usava a lista, que é fechada se já
+        tiver sido substituída e não tiver mais sessões.
+        """
+        self.users -= 1
+        if self.retired and self.users <= 0:
+            self.close()
+
+    def retire(self: LazyPuzzleList):
+        """
+        Marca a lista como substituída por uma versão mais recente: é
+        fechada logo que não tenha sessões.
+        """
+        self.retired = True
+        if self.users <= 0:
+            self.close()
+
+    def block_hashes(self: LazyPuzzleList) -> array:
+        """
+        Devolve os hashes dos blocos do ficheiro indexado, calculando-os na
+        primeira vez. São a referência com que `reload` encontra o que
+        mudou, por isso devem ser calculados antes de o ficheiro mudar.
+        """
+        if self.blocks is None:
+            self.blocks = _block_hashes(self._file.fileno(), 0, self.size)
+        return self.blocks
+
+    def reload(self: LazyPuzzleList) -> tuple | None:
+        """
+        Compara o ficheiro com a versão indexada e, se mudou, devolve
+        (lista, lo, hi, n): uma nova lista sobre o ficheiro atual, em que
+        as linhas [lo, hi) desta lista passaram a ser as n linhas a partir
+        de `lo`, e as seguintes só mudaram de posição. Devolve None se o
+        ficheiro não mudou.
+
+        Os hashes dos blocos dão o prefixo comum e o sufixo comum (deslocado
+        pela diferença de tamanho), e só as linhas entre eles são indexadas
+        de novo; se o ficheiro só cresceu, são as linhas acrescentadas. Os
+        hashes do prefixo (e do sufixo, se o deslocamento for de blocos
+        inteiros) são reaproveitados. O ficheiro tem de ser lido por inteiro
+        para encontrar as diferenças, mas só em blocos e sem parsing.
+
+        Esta lista não é alterada, e continua a ler o ficheiro que abriu.
+        Se o ficheiro tiver sido reescrito no mesmo i-node (e não apenas
+        acrescentado), os seus puzzles passam a ser lidos da nova lista
+        (ver `__getitem__`).
+        """
+        self.block_hashes()
+        stat = os.stat(self.file_name)
+        if (stat.st_ino, stat.st_size, stat.st_mtime_ns) == self.stat:
+            return None
+
+        new = LazyPuzzleList.__new__(LazyPuzzleList)
+        new.file_name = self.file_name
+        new.sep = self.sep
+        new.successor = None
+        new.users = 0
+        new.retired = False
+        new._open()
+        try:
+            change = self._diff(new)
+        except BaseException:
+            new.close()
+            raise
+        if new.stat[0] == self.stat[0] and change[0] < self.size:
+            # Reescrito no mesmo i-node: as linhas antigas já não existem
+            new.acquire()
+            self.successor = (new,) + change[1:]
+        return (new,) + change[1:]
+
+    def _diff(self: LazyPuzzleList, new: LazyPuzzleList) -> tuple:
+        """
+        Indexa a nova versão `new` do ficheiro a partir desta (ver
+        `reload`) e devolve (prefixo comum em bytes, lo, hi, n).
+        """
+        blocks = self.blocks
+        fd = new._file.fileno()
+        old_size = self.size
+        size = new.size
+        shift = size - old_size
+        last = len(blocks) - 1  # Último bloco, talvez incompleto
+
+        # Prefixo comum, em blocos inteiros
+        k = 0
+        while (k <= last and min((k + 1) * RELOAD_BLOCK, old_size) <= size
+               and _hash_range(fd, k * RELOAD_BLOCK,
+                               min((k + 1) * RELOAD_BLOCK, old_size))
+               == blocks[k]):
+            k += 1
+        prefix = min(k * RELOAD_BLOCK, old_size)
+        # Sufixo comum: os blocos antigos, deslocados de `shift`
+        j = last + 1
+        while j > k and (j - 1) * RELOAD_BLOCK + shift >= prefix:
+            start = (j - 1) * RELOAD_BLOCK
+            end = min(j * RELOAD_BLOCK, old_size)
+            if _hash_range(fd, start + shift, end + shift) != blocks[j - 1]:
+                break
+            j -= 1
+        suffix = min(j * RELOAD_BLOCK, old_size)
+
+        from bisect import bisect_left
+        offsets = self.offsets
+        n_old = len(offsets)
+        # Linhas antigas inteiras antes do prefixo...
+        lo = bisect_left(offsets, prefix)
+        if lo and (lo == n_old or offsets[lo] != prefix) and \
+                os.pread(fd, 1, prefix - 1) != b'\n':
+            lo -= 1
+        # ... e a partir do sufixo (o início tem de continuar a sê-lo)
+        hi = bisect_left(offsets, suffix)
+        if hi < n_old and offsets[hi] == suffix and suffix + shift > 0 and \
+                os.pread(fd, 1, suffix + shift - 1) != b'\n':
+            hi += 1
+        hi = max(hi, lo)
+
+        start = offsets[lo] if lo < n_old else old_size
+        end = offsets[hi] + shift if hi < n_old else size
+        chunk = os.pread(fd, end - start, start)
+        if len(chunk) != end - start:
+            raise ValueError(f'"{self.file_name}" mudou durante a recarga.')
+        parts = chunk.split(b'\n')
+        middle = array('q', accumulate((len(part) + 1 for part in parts[:-1]),
+                                       initial=start))
+        if not parts[-1]:
+            middle.pop()  # Depois da última mudança de linha não há linha
+        new.offsets = offsets[:lo] + middle
+        if shift:
+            new.offsets.extend(map(shift.__add__, offsets[hi:]))
+        else:
+            new.offsets += offsets[hi:]
+
+        # O bloco antigo incompleto do prefixo tem de ser recalculado
+        first = k - (k * RELOAD_BLOCK > old_size)
+        if j <= last and shift % RELOAD_BLOCK == 0:
+            # O sufixo ficou alinhado pelos mesmos blocos
+            end = j * RELOAD_BLOCK + shift
+            new.blocks = (blocks[:first]
+                          + _block_hashes(fd, first * RELOAD_BLOCK, end)
+                          + blocks[j:])
+        else:
+            new.blocks = blocks[:first] + _block_hashes(
+                fd, first * RELOAD_BLOCK, size)
+        return prefix, lo, hi, len(middle)
+
+    def __len__(self: LazyPuzzleList) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self: LazyPuzzleList, idx: int) -> Puzzle:
+        """
+        Constrói o puzzle da linha na posição `idx`. Se o ficheiro foi
+        reescrito no mesmo i-node, lê a mesma linha da versão seguinte; as
+        linhas alteradas dão a sua nova versão (ou uma vizinha, se foram
+        apagadas).
+
+        idx: posição do puzzle na lista
+        """
+        if idx < 0:
+            idx += len(self.offsets)
+        if not 0 <= idx < len(self.offsets):
+            raise IndexError('Posição fora da lista de puzzles.')
+        if self.successor is not None:
+            new, lo, hi, n = self.successor
+            if idx >= hi:
+                idx += n - (hi - lo)
+            elif idx >= lo:
+                idx = min(idx, lo + n - 1) if n else min(lo, len(new) - 1)
+            return new[idx]
+
+        start = self.offsets[idx]
+        end = self.offsets[idx + 1] if idx + 1 < len(self.offsets) \
+            else self.size
+        line = os.pread(self._file.fileno(), end - start, start)
+        if line.endswith(b'\n'):
+            line = line[:-1]
+        line = line.decode('utf-8')
+        try:
+            topic, secret = line.split(self.sep, 1)
+        except ValueError as e:
+            print(f'"{self.file_name}" não tem o formato correto.')
+            raise e
+
+        return Puzzle(topic, secret, self.sep)
+
+
+BANK_MAGIC = b'WOFB'
+BANK_VERSION = 2
+BANK_SUFFIX = '.bank'
+# magic, versão, nº de puzzles, nº de temas, mtime e tamanho da fonte,
+# hash da fonte, comprimento do separador
+_BANK_HEADER = struct.Struct('<4sHIIqq16sH')
+# tema, máscara de letras, comprimentos do puzzle original e do limpo
+_BANK_RECORD = struct.Struct('<IIII')
+
+
+def _file_hash(file_name: str) -> bytes:
+    """
+    Devolve o hash (16 bytes) do conteúdo do ficheiro `file_name`.
+    """
+    import hashlib
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_name, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+
+    return h.digest()
+
+
+def compile_puzzles(file_name: str, bank_name: str | None = None,
+                    sep: str = ": ") -> str:
+    """
+    Compila o ficheiro de puzzles `file_name` num banco binário e devolve o
+    caminho do banco. Cada registo guarda o tema (por id), a máscara de
+    letras, o puzzle original e o puzzle já limpo; uma tabela de offsets no
+    início do ficheiro permite o acesso direto a cada puzzle, e a seguir a
+    ela ficam as posições dos puzzles de cada nível de dificuldade (ver
+    `DifficultyIndex`), já pontuados.
+
+    file_name: nome do ficheiro de puzzles
+    bank_name: nome do banco (por omissão `file_name` + ".bank")
+    sep: separador entre o tema e o puzzle
+    """
+    if bank_name is None:
+        bank_name = file_name + BANK_SUFFIX
+
+    stat = os.stat(file_name)
+    topics = {}
+    records = []
+    levels = [array('I') for _ in DIFFICULTY_LEVELS]
+    with open(file_name, 'r', encoding="utf-8") as f:
+        for idx, line in enumerate(f):
+            try:
+                topic, secret = line.split(sep, 1)
+            except ValueError as e:
+                print(f'"{file_name}" não tem o formato correto.')
+                raise e
+
+            raw = secret.strip()
+            clean = clean_text(raw)
+            topic_id = topics.setdefault(topic, len(topics))
+            raw_b = raw.encode('utf-8')
+            clean_b = clean.encode('utf-8')
+            mask = letter_mask(clean)
+            records.append(_BANK_RECORD.pack(topic_id, mask,
+                                             len(raw_b), len(clean_b))
+                           + raw_b + clean_b)
+            vowels = sum(map(clean.count, VOWELS))
+            consonants = sum(map(str.isalpha, clean)) - vowels
+            levels[difficulty_level(difficulty_score(
+                topic, vowels, consonants, mask))].append(idx)
+
+    sep_b = sep.encode('utf-8')
+    header = _BANK_HEADER.pack(BANK_MAGIC, BANK_VERSION, len(records),
+                               len(topics), stat.st_mtime_ns, stat.st_size,
+                               _file_hash(file_name), len(sep_b)) + sep_b
+    topic_table = b''
+    for topic in topics:
+        topic_b = topic.encode('utf-8')
+        topic_table += struct.pack('<H', len(topic_b)) + topic_b
+
+    level_table = array('I', map(len, levels))
+    for positions in levels:
+        level_table += positions
+
+    offsets = array('q')
+    pos = (len(header) + len(topic_table) + 8 * len(records)
+           + 4 * len(level_table))
+    for record in records:
+        offsets.append(pos)
+        pos += len(record)
+
+    tmp_name = bank_name + '.tmp'
+    with open(tmp_name, 'wb') as f:
+        f.write(header)
+        f.write(topic_table)
+        f.write(offsets.tobytes())
+        f.write(level_table.tobytes())
+        for record in records:
+            f.write(record)
+    os.replace(tmp_name, bank_name)
+
+    return bank_name
+
+
+class BankPuzzleList:
+    """
+    Representa uma lista de puzzles lida de um banco binário compilado por
+    `compile_puzzles`. O banco é mapeado em memória e cada puzzle é
+    construído diretamente a partir do seu registo, sem parsing.
+    """
+    def __init__(self: BankPuzzleList, bank_name: str, sep: str):
+        """
+        Abre e valida o banco `bank_name`.
+
+        bank_name: nome do banco de puzzles
+        sep: separador entre o tema e o puzzle
+        """
+        self.bank_name = bank_name
+        self.sep = sep
+        with open(bank_name, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, n, n_topics, self.source_mtime, self.source_size,
+         self.source_hash, sep_len) = _BANK_HEADER.unpack_from(self._data)
+        if magic != BANK_MAGIC or version != BANK_VERSION:
+            raise ValueError(f'"{bank_name}" não é um banco de puzzles.')
+
+        pos = _BANK_HEADER.size
+        if self._data[pos:pos + sep_len].decode('utf-8') != sep:
+            raise ValueError(f'"{bank_name}" usa outro separador.')
+        pos += sep_len
+
+        self.topics = []
+        for _ in range(n_topics):
+            (length,) = struct.unpack_from('<H', self._data, pos)
+            pos += 2
+            self.topics.append(self._data[pos:pos + length].decode('utf-8'))
+            pos += length
+
+        # Vista sobre a tabela de offsets do banco, sem cópia
+        self.offsets = memoryview(self._data)[pos:pos + 8 * n].cast('q')
+        pos += 8 * n
+        self._levels = pos  # Tabela dos níveis de dificuldade
+
+    def levels(self: BankPuzzleList) -> list[array]:
+        """
+        Devolve as posições dos puzzles de cada nível de dificuldade,
+        pontuados quando o banco foi compilado.
+        """
+        counts = array('I')
+        pos = self._levels
+        counts.frombytes(self._data[pos:pos + 4 * len(DIFFICULTY_LEVELS)])
+        pos += 4 * len(counts)
+        levels = []
+        for count in counts:
+            positions = array('I')
+            positions.frombytes(self._data[pos:pos + 4 * count])
+            pos += 4 * count
+            levels.append(positions)
+        return levels
+
+    def is_fresh(self: BankPuzzleList, file_name: str) -> bool:
+        """
+        Verifica se o banco corresponde ao conteúdo atual de `file_name`.
+        Compara primeiro o mtime e o tamanho e, se diferirem, o hash.
+
+        file_name: nome do ficheiro de puzzles de origem
+        """
+        stat = os.stat(file_name)
+        if stat.st_size != self.source_size:
+            return False
+        if stat.st_mtime_ns == self.source_mtime:
+            return True
+
+        return _file_hash(file_name) == self.source_hash
+
+    def mask(self: BankPuzzleList, idx: int) -> int:
+        """
+        Devolve a máscara de letras do puzzle na posição `idx`.
+
+        idx: posição do puzzle na lista
+        """
+        return _BANK_RECORD.unpack_from(self._data, self.offsets[idx])[1]
+
+    def __len__(self: BankPuzzleList) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self: BankPuzzleList, idx: int) -> Puzzle:
+        """
+        Constrói o puzzle do registo na posição `idx`.
+
+        idx: posição do puzzle na lista
+        """
+        pos = self.offsets[idx]
+        topic_id, mask, raw_len, clean_len = _BANK_RECORD.unpack_from(
+            self._data, pos)
+        pos += _BANK_RECORD.size
+        raw = self._data[pos:pos + raw_len].decode('utf-8')
+        pos += raw_len
+        clean = self._data[pos:pos + clean_len].decode('utf-8')
+        return Puzzle(self.topics[topic_id], raw, self.sep, clean, mask)
+
+
+class PuzzleDeck:
+    """
+    Representa um baralho de posições de puzzles para tirar sem reposição,
+    sobre uma lista de puzzles partilhada que nunca é alterada. O baralho só
+    guarda as posições já retiradas, por isso cada sessão tem um custo de
+    memória proporcional ao número de puzzles jogados e não ao tamanho da
+    lista.
+
+    No modo ordenado (por omissão) o sorteio `randint(0, restantes-1)`
+    escolhe o k-ésimo puzzle restante pela ordem original da lista, como
+    fazia `list.pop`, através de uma árvore de Fenwick esparsa: O(log n) por
+    operação. No modo não ordenado usa uma permutação de Fisher-Yates
+    preguiçosa (troca com o último): O(1) por operação.
+    """
+    __slots__ = ('size', 'ordered', 'remaining', 'current', '_slot',
+                 '_removed', '_swaps')
+
+    def __init__(self: PuzzleDeck, size: int, ordered: bool = True):
+        """
+        Inicializa o baralho com todas as posições disponíveis.
+
+        size: número de puzzles na lista
+        ordered: se verdadeiro, mantém a ordem original dos restantes
+        """
+        self.size = size
+        self.ordered = ordered
+        self.remaining = size  # Número de puzzles ainda por jogar
+        self.current = None  # Posição (na lista) do puzzle tirado
+        self._slot = None  # Posição do puzzle tirado no baralho
+        self._removed = {}  # Fenwick: nó -> posições retiradas (ordenado)
+        self._swaps = {}  # Permutação esparsa: lugar -> posição (não ord.)
+
+    def __len__(self: PuzzleDeck) -> int:
+        return self.remaining
+
+    def reset(self: PuzzleDeck):
+        """
+        Volta a pôr todos os puzzles no baralho.
+        """
+        self.remaining = self.size
+        self.current = None
+        self._slot = None
+        self._removed.clear()
+        self._swaps.clear()
+
+    def draw(self: PuzzleDeck, rng=random) -> int:
+        """
+        Tira aleatoriamente um dos puzzles restantes, sem o retirar do
+        baralho, e devolve a sua posição na lista. Lança ValueError se o
+        baralho estiver vazio.
+
+        rng: gerador aleatório (por omissão, o do módulo `random`)
+        """
+        slot = rng.randint(0, self.remaining-1)
+        if self.ordered:
+            self.current = self._select(slot)
+        else:
+            self.current = self._swaps.get(slot, slot)
+        self._slot = slot
+        return self.current
+
+    def discard(self: PuzzleDeck):
+        """
+        Retira do baralho o último puzzle tirado.
+        """
+        if self.current is None:
+            return
+
+        if self.ordered:
+            i = self.current + 1
+            while i <= self.size:
+                self._removed[i] = self._removed.get(i, 0) + 1
+                i += i & -i
+        else:
+            last = self.remaining - 1
+            self._swaps[self._slot] = self._swaps.pop(last, last)
+            if self._slot == last:
+                del self._swaps[last]
+
+        self.remaining -= 1
+        self.current = None
+        self._slot = None
+
+    def grow(self: PuzzleDeck, n: int):
+        """
+        Acrescenta ao baralho os `n` puzzles novos do fim da lista, sem
+        mexer nos já retirados nem no puzzle tirado. Custa O(n) no modo não
+        ordenado e O(n + log² tamanho) no modo ordenado.
+
+        n: número de puzzles acrescentados à lista
+        """
+        old = self.size
+        self.size += n
+        if self.ordered:
+            # Só os nós novos que cobrem posições antigas contam retirados
+            removed = old - self.remaining
+            for node in range(old + 1, self.size + 1):
+                low = node - (node & -node)
+                if low < old:
+                    count = removed - self._removed_before(low)
+                    if count:
+                        self._removed[node] = count
+        else:
+            # Os lugares a seguir aos restantes estão livres (ver `discard`)
+            for pos in range(old, self.size):
+                if pos != self.remaining + pos - old:
+                    self._swaps[self.remaining + pos - old] = pos
+        self.remaining += n
+
+    def _removed_before(self: PuzzleDeck, i: int) -> int:
+        """
+        Devolve o número de posições retiradas entre as `i` primeiras.
+        """
+        count = 0
+        while i:
+            count += self._removed.get(i, 0)
+            i -= i & -i
+        return count
+
+    def _select(self: PuzzleDeck, k: int) -> int:
+        """
+        Devolve a posição na lista do k-ésimo (a partir de 0) puzzle restante.
+
+        k: ordem do puzzle entre os restantes
+        """
+        pos = 0
+        k += 1
+        step = 1 << (self.size.bit_length() - 1)
+        while step:
+            node = pos + step
+            if node <= self.size:
+                free = step - self._removed.get(node, 0)
+                if free < k:
+                    pos = node
+                    k -= free
+            step >>= 1
+
+        return pos
+
+
+class DifficultyIndex:
+    """
+    Representa o índice dos puzzles de uma lista por nível de dificuldade:
+    para cada nível, as posições dos seus puzzles. Os níveis dependem só de
+    cada puzzle (ver `difficulty_score`), por isso o índice é atualizado
+    incrementalmente: `update` só pontua os puzzles acrescentados à lista
+    desde a última vez.
+    """
+    __slots__ = ('buckets', 'scored')
+
+    def __init__(self: DifficultyIndex, buckets: list[array] | None = None,
+                 scored: int = 0):
+        """
+        Inicializa o índice.
+
+        buckets: posições dos puzzles de cada nível, já pontuados (por
+            exemplo, por `compile_puzzles`)
+        scored: número de puzzles, no início da lista, já pontuados
+        """
+        if buckets is None:
+            buckets = [array('I') for _ in DIFFICULTY_LEVELS]
+        self.buckets = buckets
+        self.scored = scored
+
+    def update(self: DifficultyIndex, puzzles) -> int:
+        """
+        Pontua os puzzles de `puzzles` ainda fora do índice e devolve
+        quantos eram.
+
+        puzzles: lista de puzzles (a mesma, eventualmente com mais puzzles
+            no fim)
+        """
+        start = self.scored
+        buckets = self.buckets
+        for idx in range(start, len(puzzles)):
+            buckets[puzzles[idx].difficulty()].append(idx)
+        self.scored = len(puzzles)
+        return self.scored - start
+
+    def splice(self: DifficultyIndex, puzzles, lo: int, hi: int,
+               n: int) -> DifficultyIndex:
+        """
+        Devolve o índice da nova versão `puzzles` de uma lista em que as
+        posições [lo, hi) deram lugar a `n` puzzles (ver
+        `LazyPuzzleList.reload`). Só esses e os acrescentados no fim são
+        pontuados; este índice não é alterado.
+
+        puzzles: nova versão da lista
+        lo, hi: posições substituídas, nesta versão
+        n: número de puzzles que as substituem
+        """
+        from bisect import bisect_left
+        if lo >= self.scored:
+            index = DifficultyIndex([positions[:] for positions in
+                                     self.buckets], self.scored)
+        else:
+            shift = n - (hi - lo)
+            added = [array('I') for _ in DIFFICULTY_LEVELS]
+            for idx in range(lo, lo + n):
+                added[puzzles[idx].difficulty()].append(idx)
+            buckets = []
+            for positions, new in zip(self.buckets, added):
+                i = bisect_left(positions, lo)
+                j = bisect_left(positions, hi)
+                moved = positions[j:]
+                if shift:
+                    moved = array('I', map(shift.__add__, moved))
+                buckets.append(positions[:i] + new + moved)
+            index = DifficultyIndex(buckets, max(lo + n, self.scored + shift))
+        index.update(puzzles)
+        return index
+
+    def counts(self: DifficultyIndex) -> tuple[int, ...]:
+        """
+        Devolve o número de puzzles de cada nível.
+        """
+        return tuple(map(len, self.buckets))
+
+
+class StratifiedDeck:
+    """
+    Representa um baralho de puzzles por nível de dificuldade: um
+    `PuzzleDeck` não ordenado sobre as posições de cada nível do índice,
+    criado quando o nível é pedido pela primeira vez. Cada puzzle é tirado
+    em O(1), sem reposição dentro do nível.
+    """
+    __slots__ = ('index', 'decks', 'level')
+
+    def __init__(self: StratifiedDeck, index: DifficultyIndex):
+        """
+        Inicializa o baralho sobre o índice `index`, partilhado.
+
+        index: índice dos puzzles por nível de dificuldade
+        """
+        self.index = index
+        self.decks = {}  # nível -> baralho das posições do nível
+        self.level = None  # Nível do puzzle tirado
+
+    def deck(self: StratifiedDeck, level: int) -> PuzzleDeck:
+        """
+        Devolve o baralho do nível `level`, com os puzzles acrescentados ao
+        índice entretanto.
+        """
+        deck = self.decks.get(level)
+        size = len(self.index.buckets[level])
+        if deck is None:
+            deck = self.decks[level] = PuzzleDeck(size, ordered=False)
+        elif deck.size < size:
+            deck.grow(size - deck.size)
+        return deck
+
+    @property
+    def current(self: StratifiedDeck) -> int | None:
+        """
+        Posição na lista do puzzle tirado, ou None.
+        """
+        if self.level is None:
+            return None
+        return self.index.buckets[self.level][self.decks[self.level].current]
+
+    def draw(self: StratifiedDeck, level: int, rng=random) -> int:
+        """
+        Tira aleatoriamente um dos puzzles restantes do nível `level`, sem o
+        retirar do baralho, e devolve a sua posição na lista. Lança
+        ValueError se o nível não tiver mais puzzles.
+
+        level: nível de dificuldade (posição em `DIFFICULTY_LEVELS`)
+        rng: gerador aleatório (por omissão, o do módulo `random`)
+        """
+        self.deck(level).draw(rng)
+        self.level = level
+        return self.current
+
+    def discard(self: StratifiedDeck):
+        """
+        Retira do baralho o último puzzle tirado.
+        """
+        if self.level is not None:
+            self.decks[self.level].discard()
+            self.level = None
+
+    def reset(self: StratifiedDeck):
+        """
+        Volta a pôr todos os puzzles no baralho.
+        """
+        self.decks.clear()
+        self.level = None
+
 
 class Puzzles:
     """
     Representa uma lista de puzzles.
     """
-    def __init__(self: Puzzles, file_name: str, sep: str = ": "):
+    __slots__ = ('sep', 'file_name', 'puzzles', 'deck', 'shared',
+                 'current_puzzle', 'difficulty', 'strata')
+
+    def __init__(self: Puzzles, file_name: str, sep: str = ": ",
+                 lazy: bool = False, ordered: bool = True):
         """
         Inicializa a lista de puzzles.
 
         file_name: file/to/path do ficheiro de puzzles
         sep: separador entre o tema e o puzzle
+        lazy: se verdadeiro, os puzzles só são lidos quando escolhidos
+        ordered: ver `PuzzleDeck`
         """
         self.sep = sep
-        self.puzzles = self.load_puzzles(file_name)
+        self.file_name = file_name
+        self.puzzles = self.open_bank(file_name)
+        if self.puzzles is None:
+            if lazy:
+                self.puzzles = self.index_puzzles(file_name)
+            else:
+                self.puzzles = self.load_puzzles(file_name)
+        self.deck = PuzzleDeck(len(self.puzzles), ordered)
+        self.shared = False  # Indica se a lista é partilhada com outras
         self.current_puzzle = None
+        self.difficulty = None  # Índice por dificuldade (partilhado)
+        self.strata = None  # Baralho por dificuldade (ver `set_puzzle`)
+
+    def session(self: Puzzles, ordered: bool = True) -> Puzzles:
+        """
+        Devolve uma nova vista sobre a mesma lista de puzzles, com o seu
+        próprio baralho. A lista não é copiada.
+
+        ordered: ver `PuzzleDeck`
+        """
+        view = Puzzles.__new__(Puzzles)
+        view.sep = self.sep
+        view.file_name = self.file_name
+        view.puzzles = self.puzzles
+        view.deck = PuzzleDeck(len(self.puzzles), ordered)
+        view.shared = True
+        view.current_puzzle = None
+        view.difficulty = self.difficulty
+        view.strata = None
+        self.shared = True
+        if isinstance(self.puzzles, LazyPuzzleList):
+            self.puzzles.acquire()
+        return view
+
+    def release(self: Puzzles):
+        """
+        Termina uma vista criada por `session`: a lista deixa de contar com
+        ela (ver `close`).
+        """
+        if isinstance(self.puzzles, LazyPuzzleList):
+            self.puzzles.release()
+
+    def close(self: Puzzles):
+        """
+        Indica que estes puzzles foram substituídos (por exemplo, por
+        `reload`): o ficheiro indexado é fechado assim que terminem as
+        vistas criadas por `session`.
+        """
+        if isinstance(self.puzzles, LazyPuzzleList):
+            self.puzzles.retire()
 
     def load_puzzles(self: Puzzles, file_name: str) -> list[Puzzle]:
         """
@@ -190,34 +1383,194 @@ class Puzzles:
 
         return puzzles
 
-    def set_puzzle(self: Puzzles) -> Puzzle:
+    def open_bank(self: Puzzles, file_name: str) -> BankPuzzleList | None:
+        """
+        Abre o banco compilado de `file_name`, se existir e estiver
+        atualizado. Caso contrário devolve None e os puzzles são lidos do
+        ficheiro de texto.
+
+        file_name: nome do ficheiro de puzzles
+        """
+        bank_name = file_name + BANK_SUFFIX
+        if not os.path.exists(bank_name):
+            return None
+
+        try:
+            bank = BankPuzzleList(bank_name, self.sep)
+            if bank.is_fresh(file_name):
+                return bank
+        except (OSError, ValueError, struct.error):
+            pass
+
+        return None
+
+    def index_puzzles(self: Puzzles, file_name: str) -> LazyPuzzleList:
+        """
+        Indexa as linhas do ficheiro `file_name` sem construir os puzzles.
+        As linhas mal formatadas só são detetadas quando escolhidas.
+
+        file_name: nome do ficheiro de puzzles
+        """
+        try:
+            return LazyPuzzleList(file_name, self.sep)
+        except FileNotFoundError as e:
+            print(f'Ficheiro "{file_name}" não encontrado.')
+            raise e
+
+    def watch(self: Puzzles) -> Puzzles:
+        """
+        Prepara os puzzles para `reload` e devolve-os: se vierem de um banco
+        ou estiverem todos carregados, devolve uma nova lista que indexa o
+        ficheiro de texto; depois guarda os hashes dos blocos do ficheiro
+        indexado, com que as recargas encontram o que mudou.
+        """
+        watched = self
+        if not isinstance(self.puzzles, LazyPuzzleList):
+            watched = Puzzles.__new__(Puzzles)
+            watched.sep = self.sep
+            watched.file_name = self.file_name
+            watched.puzzles = watched.index_puzzles(self.file_name)
+            watched.deck = PuzzleDeck(len(watched.puzzles),
+                                      self.deck.ordered)
+            watched.shared = False
+            watched.current_puzzle = None
+            watched.difficulty = None
+            watched.strata = None
+            if self.difficulty is not None:
+                watched.index_difficulty()
+        watched.puzzles.block_hashes()
+        return watched
+
+    def reload(self: Puzzles) -> Puzzles | None:
+        """
+        Se o ficheiro de puzzles mudou, devolve uma nova versão dos
+        puzzles, com um custo proporcional à mudança (ver
+        `LazyPuzzleList.reload`); senão devolve None. Esta versão não é
+        alterada: as sessões já criadas continuam a jogar com ela, com o
+        seu puzzle atual e o seu baralho, e só as sessões criadas a partir
+        da nova versão veem os puzzles novos. O índice por dificuldade, se
+        existir, só pontua os puzzles novos ou alterados.
+
+        Os puzzles têm de ter sido preparados com `watch`. Se o ficheiro
+        for substituído (como fazem os editores) ou só acrescentado, esta
+        versão continua a ler o que indexou; se for reescrito no mesmo
+        i-node, passa a ler os puzzles da nova versão (ver
+        `LazyPuzzleList.__getitem__`). Depois de substituída, esta versão
+        deve ser fechada com `close`.
+        """
+        if not isinstance(self.puzzles, LazyPuzzleList):
+            raise ValueError('Os puzzles não foram preparados com `watch`.')
+        change = self.puzzles.reload()
+        if change is None:
+            return None
+
+        puzzles, lo, hi, n = change
+        view = Puzzles.__new__(Puzzles)
+        view.sep = self.sep
+        view.file_name = self.file_name
+        view.puzzles = puzzles
+        view.deck = PuzzleDeck(len(puzzles), self.deck.ordered)
+        view.shared = False
+        view.current_puzzle = None
+        view.difficulty = None
+        if self.difficulty is not None:
+            view.difficulty = self.difficulty.splice(puzzles, lo, hi, n)
+        view.strata = None
+        return view
+
+    def index_difficulty(self: Puzzles) -> DifficultyIndex:
+        """
+        Constrói o índice dos puzzles por nível de dificuldade, ou
+        acrescenta-lhe os puzzles novos da lista, e devolve-o. Num banco
+        compilado os puzzles já vêm pontuados. As sessões criadas depois
+        partilham o índice, por isso deve ser construído antes delas.
+        """
+        if self.difficulty is None:
+            if isinstance(self.puzzles, BankPuzzleList):
+                self.difficulty = DifficultyIndex(self.puzzles.levels(),
+                                                  len(self.puzzles))
+            else:
+                self.difficulty = DifficultyIndex()
+        self.difficulty.update(self.puzzles)
+        return self.difficulty
+
+    def set_puzzle(self: Puzzles, rng=random,
+                   level: int | None = None) -> Puzzle:
         """
         Escolhe aleatoriamente um puzzle da lista de puzzles e devolve-o.
+
+        rng: gerador aleatório (por omissão, o do módulo `random`)
+        level: se indicado, o puzzle é tirado só entre os desse nível de
+            dificuldade (ver `StratifiedDeck`), e não do baralho de toda a
+            lista; cada jogo deve usar sempre uma das duas formas
         """
         try:
-            idx = random.randint(0, len(self.puzzles)-1)
+            if level is None:
+                idx = self.deck.draw(rng)
+            else:
+                if self.strata is None:
+                    if self.difficulty is None:
+                        self.index_difficulty()
+                    self.strata = StratifiedDeck(self.difficulty)
+                idx = self.strata.draw(level, rng)
         except ValueError as e:
-            print('Não há puzzles para jogar.')
+            if level is None:
+                print('Não há puzzles para jogar.')
+            else:
+                print(f'Não há puzzles de nível "{DIFFICULTY_LEVELS[level]}"'
+                      f' para jogar.')
             self.current_puzzle = None
             raise e
 
         self.current_puzzle = self.puzzles[idx]
+        if self.shared and isinstance(self.puzzles, list):
+            # Os puzzles da lista partilhada não podem ser alterados
+            self.current_puzzle = self.current_puzzle.fresh()
         return self.current_puzzle
 
-    def drop_puzzle(self: Puzzles) -> list[Puzzle]:
+    def drop_puzzle(self: Puzzles) -> PuzzleDeck:
         """
-        Elimina o puzzle atual da lista de puzzles.
+        Elimina o puzzle atual do baralho de puzzles por jogar.
         """
         if not self.current_puzzle:
             print('Não há puzzle atual.')
-            return self.puzzles
+            return self.deck
+
+        self.deck.discard()
+        if self.strata is not None:
+            self.strata.discard()
+        self.current_puzzle = None
+        return self.deck
 
-        self.puzzles.pop(self.puzzles.index(self.current_puzzle))
+    def reset(self: Puzzles):
+        """
+        Volta a pôr todos os puzzles no baralho.
+        """
+        self.deck.reset()
+        if self.strata is not None:
+            self.strata.reset()
         self.current_puzzle = None
-        return self.puzzles
+
+
+MAX_NAME_BYTES = 255  # Tamanho máximo do nome de um jogador, em UTF-8
+
+
+def valid_name(name: str, names: list[str]) -> bool:
+    """
+    Indica se `name` pode ser o nome de um novo jogador: só letras, sem
+    ultrapassar `MAX_NAME_BYTES` (o limite das fotografias e dos registos
+    dos jogos) e diferente dos nomes já escolhidos.
+
+    name: nome proposto
+    names: nomes dos outros jogadores
+    """
+    return (bool(name) and name.isalpha() and name not in names
+            and len(name.encode('utf-8')) <= MAX_NAME_BYTES)
 
 
 class Player:
+    __slots__ = ('name', 'money_round', 'money_game', 'recuperacao')
+
     def __init__(self: Player, name: str):
         """
         Inicializa um jogador com o seu nome, e o dinheiro da ronda e do jogo
@@ -235,6 +1588,8 @@ class Player:
 
 
 class Players:
+    __slots__ = ('all', 'current')
+
     def __init__(self: Players, names: list[str]):
         """
         Inicializa a lista de jogadores. O jogador corrente é o primeiro da
@@ -264,8 +1619,105 @@ class Players:
         return self.all[self.current]
 
 
+VOWEL_PRICE = 250  # Preço de uma vogal
+
+# Pedidos que o jogo pode estar à espera de ver respondidos
+PROMPT_COMMAND = 'command'  # Comando do jogador atual
+PROMPT_CONSONANT = 'consonant'  # Consoante depois de rodar a roleta
+PROMPT_FREE_VOWEL = 'free_vowel'  # Vogal depois de sair "Vogal grátis"
+PROMPT_VOWEL = 'vowel'  # Vogal comprada
+PROMPT_SOLVE = 'solve'  # Solução do puzzle
+PROMPT_TOKEN = 'token'  # Usar (s) ou não (n) uma ficha de recuperação
+PROMPTS = (PROMPT_COMMAND, PROMPT_CONSONANT, PROMPT_FREE_VOWEL, PROMPT_VOWEL,
+           PROMPT_SOLVE, PROMPT_TOKEN)
+
+# Formato das fotografias do estado de um jogo (ver `Game.snapshot`)
+SNAPSHOT_MAGIC = b'WOFS'
+SNAPSHOT_VERSION = 2
+# magia, versão
+_SNAP_HEADER = struct.Struct('<4sB')
+# indicadores, rondas, ronda atual, pedido, vogais e consoantes disponíveis,
+# valor da roleta, prémio final, nº de jogadores, jogador atual
+_SNAP_GAME = struct.Struct('<BBBBIIiqBB')
+# tamanho do nome (até `MAX_NAME_BYTES`), fichas, dinheiro da ronda,
+# dinheiro do jogo
+_SNAP_PLAYER = struct.Struct('<BHqq')
+# posição do puzzle, letras descobertas, letras pedidas
+_SNAP_PUZZLE = struct.Struct('<qII')
+# ordenado, tamanho, restantes, posição atual, lugar atual, nº de nós
+# retirados (modo ordenado), nº de trocas (modo não ordenado)
+_SNAP_DECK = struct.Struct('<BqqqqII')
+# tipo do gerador aleatório (0: nenhum, 1: o do módulo `random`, 2: próprio)
+_SNAP_RNG = struct.Struct('<B')
+_SNAP_MT = struct.Struct('<625IBd')  # estado, tem gauss_next, gauss_next
+# nº de rondas da curva de dificuldade, nível do puzzle atual (255: nenhum),
+# nº de baralhos por nível (cada um com o nível e um `_SNAP_DECK`)
+_SNAP_CURVE = struct.Struct('<BBB')
+_SNAP_RUNNING, _SNAP_VOWELS, _SNAP_WHEEL, _SNAP_SHOWN = 1, 2, 4, 8
+_SNAP_NO_LEVEL = 255
+
+
+def _pack_deck(deck: PuzzleDeck) -> list[bytes]:
+    """
+    Devolve o estado do baralho `deck` no formato das fotografias.
+    """
+    removed = array('q', [x for kv in deck._removed.items() for x in kv])
+    swaps = array('q', [x for kv in deck._swaps.items() for x in kv])
+    return [_SNAP_DECK.pack(deck.ordered, deck.size, deck.remaining,
+                            -1 if deck.current is None else deck.current,
+                            -1 if deck._slot is None else deck._slot,
+                            len(deck._removed), len(deck._swaps)),
+            removed.tobytes(), swaps.tobytes()]
+
+
+def _unpack_deck(data: bytes, pos: int) -> tuple[PuzzleDeck, int]:
+    """
+    Reconstrói o baralho guardado por `_pack_deck` na posição `pos` de
+    `data` e devolve-o com a posição a seguir.
+    """
+    ordered, size, remaining, current, slot, n_removed, n_swaps = \
+        _SNAP_DECK.unpack_from(data, pos)
+    pos += _SNAP_DECK.size
+    deck = PuzzleDeck(size, bool(ordered))
+    deck.remaining = remaining
+    deck.current = None if current < 0 else current
+    deck._slot = None if slot < 0 else slot
+    pairs = array('q')
+    pairs.frombytes(data[pos:pos + 16 * (n_removed + n_swaps)])
+    pos += 16 * (n_removed + n_swaps)
+    deck._removed = dict(zip(pairs[0:2*n_removed:2], pairs[1:2*n_removed:2]))
+    deck._swaps = dict(zip(pairs[2*n_removed::2], pairs[2*n_removed+1::2]))
+    return deck, pos
+
+
+class Event(namedtuple('Event', ('kind', 'args'), defaults=((),))):
+    """
+    Representa um acontecimento do jogo, a apresentar pela interface.
+
+    kind: tipo do acontecimento (ver `MESSAGES`)
+    args: dados do acontecimento
+    """
+    __slots__ = ()
+
+
 class Game:
-    def __init__(self: Game, file_name: str, names: list[str], round_no: int):
+    """
+    Representa as regras e o estado de um jogo, sem qualquer entrada ou saída
+    de dados. O jogo avança com `step`, que recebe a resposta ao pedido
+    pendente (`pending`) e devolve os acontecimentos resultantes.
+    """
+    __slots__ = ('running', 'round_no', 'current_round', 'free_vowels',
+                 'vowel_purchase', 'free_consonants', 'wheel_active',
+                 'pending', 'spin_result', 'events', 'bonus', 'puzzles',
+                 'current_puzzle', 'players', 'current_player', 'wheel',
+                 'rng', 'metrics', 'curve')
+
+    BONUS = 6000  # Prémio para o(s) vencedor(es) do jogo
+
+    def __init__(self: Game, file_name: str, names: list[str], round_no: int,
+                 lazy: bool = False, puzzles: Puzzles | None = None,
+                 rng: random.Random | None = None, metrics=None,
+                 curve: Iterable[int] | None = None):
         """
         Inicializa o jogo com o número de rondas, a lista de nomes de
         jogadores, e o nome do ficheiro de puzzles.
@@ -273,62 +1725,137 @@ class Game:
         file_name: nome do ficheiro de puzzles
         names: lista de nomes de jogadores
         round_no: número de rondas
+        lazy: se verdadeiro, os puzzles só são lidos quando escolhidos
+        puzzles: puzzles já carregados (o ficheiro não é lido)
+        rng: gerador aleatório próprio do jogo (ver `game_rng`); por
+            omissão usa o do módulo `random`, partilhado por todos os jogos
+        metrics: métricas onde medir cada jogada (ver `instrument.Metrics`)
+        curve: nível de dificuldade do puzzle de cada ronda (ver
+            `difficulty_curve`); as rondas a mais ficam no último nível.
+            Por omissão, os puzzles são tirados de toda a lista
         """
         self.running = True  # Indica se o jogo está a correr
         self.round_no = round_no  # Número de rondas
         self.current_round = 1  # Ronda atual
-        self.free_vowels = "aeiou"  # Vogais disponíveis
+        self.free_vowels = VOWEL_MASK  # Vogais disponíveis
         self.vowel_purchase = True  # Indica se a compra de vogais está ativa
-        self.free_consonants = "bcdfghjklmnpqrstvwxyz"  # Consoantes disp.
+        self.free_consonants = CONSONANT_MASK  # Consoantes disponíveis
         self.wheel_active = True  # Indica se a roda da sorte está ativa
-        self.commands = {
-                '#': self.command_spy,
-                'a': self.command_authors,
-                'q': self.command_quit,
-                'r': self.command_wheel,
-                'i': self.command_inventario,
-                'c': self.command_commands,
-                'f': self.command_final,
-                'p': self.command_show,
-                'v': self.command_buy
-            }
+        self.pending = PROMPT_COMMAND  # Pedido à espera de resposta
+        self.spin_result = 0  # Valor da última casa da roleta
+        self.events = []  # Acontecimentos do passo atual
+        self.bonus = self.BONUS  # Prémio para o(s) vencedor(es)
+        self.rng = random if rng is None else rng  # Puzzles e roleta
+        self.metrics = metrics
+        self.curve = None if curve is None else tuple(curve)
+        if any(len(name.encode('utf-8')) > MAX_NAME_BYTES for name in names):
+            self.running = False
+            raise ValueError(f'Os nomes não podem ter mais de '
+                             f'{MAX_NAME_BYTES} bytes.')
         # Inicializa os puzzles
-        self.puzzles = Puzzles(file_name)
-        if len(self.puzzles.puzzles) < self.round_no:
+        if puzzles is None:
+            puzzles = Puzzles(file_name, lazy=lazy)
+        self.puzzles = puzzles
+        if self.curve is None:
+            available = [len(self.puzzles.deck)]
+            needed = [self.round_no]
+        else:
+            if not self.curve or not all(0 <= level < len(DIFFICULTY_LEVELS)
+                                         for level in self.curve):
+                self.running = False
+                raise ValueError('Curva de dificuldade inválida.')
+            if self.puzzles.difficulty is None:
+                self.puzzles.index_difficulty()
+            available = self.puzzles.difficulty.counts()
+            needed = [0] * len(DIFFICULTY_LEVELS)
+            for r in range(1, self.round_no + 1):
+                needed[self.round_level(r)] += 1
+        if any(n > a for n, a in zip(needed, available)):
             self.running = False
             msg = f'Não há puzzles suficientes para jogar {self.round_no} '
             msg += 'ronda(s).'
             raise ValueError(msg)
 
-        self.current_puzzle = self.puzzles.set_puzzle()
+        self.current_puzzle = self.puzzles.set_puzzle(self.rng,
+                                                      self.round_level())
         # Inicializa os jogadores
         self.players = Players(names)
         self.current_player = self.players.get_current_player()
         # Inicializa a roda da sorte
         self.wheel = Wheel()
 
-    def play_first_round(self: Game):
+    def emit(self: Game, kind: str, *args):
+        """
+        Regista um acontecimento do passo atual.
+
+        kind: tipo do acontecimento
+        args: dados do acontecimento
+        """
+        self.events.append(Event(kind, args))
+
+    def start(self: Game) -> list[Event]:
+        """
+        Devolve os acontecimentos do início da primeira ronda.
+        """
+        self.events = []
+        self.emit('visible', self.current_puzzle.get_visible())
+        self.emit('round_start', self.current_round)
+        return self.events
+
+    def step(self: Game, answer: str) -> list[Event]:
+        """
+        Avança o jogo com a resposta `answer` ao pedido pendente e devolve os
+        acontecimentos resultantes.
+
+        answer: resposta do jogador atual (comando, letra, solução...)
+        """
+        if self.metrics is not None:
+            return self.metrics.step(self, answer)
+        self.events = []
+        handler = self.ANSWERS[self.pending]
+        self.pending = PROMPT_COMMAND
+        handler(self, clean_text(answer))
+        return self.events
+
+    def timeout(self: Game) -> list[Event]:
+        """
+        O jogador atual não respondeu a tempo ao pedido pendente: perde a
+        vez, como na casa "Perde vez", e devolve os acontecimentos
+        resultantes. Se o pedido era o da ficha de recuperação, conta como
+        não a usar.
+        """
+        self.events = []
+        pending, self.pending = self.pending, PROMPT_COMMAND
+        self.emit('timeout')
+        if pending == PROMPT_TOKEN:
+            self.current_player = self.players.get_next_player()
+        else:
+            self.perde_vez()
+        return self.events
+
+    def answer_command(self: Game, command: str):
         """
-        Joga o número de rondas indicado pelo utilizador. Se o utilizador
-        terminar o jogo, o jogo termina imediatamente.
+        Executa o comando `command` do jogador atual.
+
+        command: comando já limpo
         """
-        print(f" >> {self.current_puzzle.get_visible()}")
-        print(f"Início da ronda número {self.current_round}")
+        if command in self.COMMANDS:
+            self.COMMANDS[command](self)
+        else:
+            self.emit('help')
 
     def spin(self: Game) -> int:
         """
         Faz girar a roleta e devolve o valor da casa onde parou.
         """
-        return self.wheel.spin()
+        return self.wheel.spin(self.rng)
 
     def bancarrota(self: Game):
         """
         O jogador perde todo o dinheiro obtido nesta ronda e também perde a
         vez.
         """
-        msg = '"Bancarrota". Perde todo o dinheiro obtido nesta ronda e também'
-        msg += ' perde a vez.'
-        print(msg)
+        self.emit('bancarrota')
         self.current_player.money_round = 0
         self.ficha_recuperacao()
 
@@ -336,68 +1863,87 @@ class Game:
         """
         Permite ao jogador receber uma ficha de recuperação.
         """
-        print('"Ficha de recuperação". Boa! Ganhou uma ficha de recuperação.')
+        self.emit('ganha_ficha')
         self.current_player.recuperacao += 1
 
     def perde_vez(self: Game):
         """
         O jogador perde a sua vez, passando para o próximo jogador.
         """
-        print('"Perde vez". Perdeu a sua vez de jogar.')
+        self.emit('perde_vez')
         self.ficha_recuperacao()
 
     def vogal_gratis(self: Game):
-        msg = '"Vogal grátis". Qual a vogal? '
-        vowel = str(input(msg))
-        vowel = clean_text(vowel)
+        """
+        Pede ao jogador a vogal grátis.
+        """
+        self.pending = PROMPT_FREE_VOWEL
 
+    def answer_free_vowel(self: Game, vowel: str):
+        """
+        Revela a vogal grátis `vowel`, se for válida e ainda não tiver saído.
+
+        vowel: vogal já limpa
+        """
+        bit = LETTER_BIT.get(vowel, 0)
         # A letra indicada não é uma vogal
-        if vowel not in "aeiou":
-            print(f'"{vowel}" não é uma letra válida.')
-            print("Perde a vez. Para a próxima esteja com mais atenção.")
+        if not bit & VOWEL_MASK:
+            self.emit('invalid_letter', vowel)
+            self.emit('careless')
             self.ficha_recuperacao()
 
         # A vogal é válida mas já foi levantada
-        elif vowel not in self.free_vowels:
-            print(f'"{vowel}" já foi levantada.')
-            print("Perde a vez. Para a próxima esteja com mais atenção.")
+        elif not bit & self.free_vowels:
+            self.emit('vowel_taken', vowel)
+            self.emit('careless')
             self.ficha_recuperacao()
 
         # A vogal é válida
         else:
-            self.free_vowels = self.free_vowels.replace(vowel, "")
-            if len(self.free_vowels) == 0:
-                self.vowel_purchase = False
-
-            if vowel in self.current_puzzle.secret:
+            self.take_vowel(vowel)
+            if bit & self.current_puzzle.mask:
                 _, count = self.current_puzzle.find_letter(vowel)
                 if count > 0:
-                    msg = f'Encontrada(s) {count} ocorrência(s) de "{vowel}".'
-                    print(msg)
-                    print(f" >> {self.current_puzzle.get_visible()}")
+                    self.emit('found', count, vowel)
                 else:
-                    print(f'Não foram encontradas ocorrências de "{vowel}".')
-                    print(f" >> {self.current_puzzle.get_visible()}")
+                    self.emit('not_found', vowel)
+                self.emit('visible', self.current_puzzle.get_visible())
+
+    def take_vowel(self: Game, vowel: str):
+        """
+        Retira a vogal `vowel` das vogais disponíveis.
+
+        vowel: vogal já limpa
+        """
+        self.free_vowels &= ~LETTER_BIT[vowel]
+        self.current_puzzle.guessed |= LETTER_BIT[vowel]
+        if not self.free_vowels:
+            self.vowel_purchase = False
 
     def ficha_recuperacao(self: Game):
         """
         Pergunta ao jogador se quer usar uma ficha de recuperação,
-        caso tenha alguma.
+        caso tenha alguma. Caso contrário passa a vez.
         """
         if self.current_player.recuperacao > 0:
-            msg = "Você vai perder a vez. Deseja usar agora uma ficha"
-            msg += " de recuperação (s/n)? "
-            r = str(input(msg))
-            r = clean_text(r)
-            if r == "s":
-                print("Afinal não perde a vez.")
-                self.current_player.recuperacao -= 1
-            else:
-                self.current_player = self.players.get_next_player()
+            self.pending = PROMPT_TOKEN
+        else:
+            self.current_player = self.players.get_next_player()
+
+    def answer_token(self: Game, r: str):
+        """
+        Usa uma ficha de recuperação se a resposta `r` for "s"; caso
+        contrário passa a vez.
+
+        r: resposta já limpa
+        """
+        if r == "s":
+            self.emit('token_used')
+            self.current_player.recuperacao -= 1
         else:
             self.current_player = self.players.get_next_player()
 
-    def wheel_houses(self: Game, result: str):
+    def wheel_houses(self: Game, result: int):
         """
         Interpreta o resultado negativo da roleta e executa a ação
         correspondente.
@@ -415,6 +1961,19 @@ class Game:
             # Vogal Grátis
             self.vogal_gratis()
 
+    def round_level(self: Game, round_no: int | None = None) -> int | None:
+        """
+        Devolve o nível de dificuldade da ronda `round_no` (por omissão, a
+        atual) segundo a curva do jogo, ou None se o jogo não tiver curva.
+
+        round_no: número da ronda, a partir de 1
+        """
+        if self.curve is None:
+            return None
+        if round_no is None:
+            round_no = self.current_round
+        return self.curve[min(round_no, len(self.curve)) - 1]
+
     def next_round(self: Game):
         """
         Inicia a próxima ronda.
@@ -423,22 +1982,21 @@ class Game:
             self.end_game()
         else:
             self.current_round += 1
-            print(f"Início da ronda número {self.current_round}")
+            self.emit('round_start', self.current_round)
             self.puzzles.drop_puzzle()
-            self.current_puzzle = self.puzzles.set_puzzle()
-            self.free_vowels = "aeiou"
+            self.current_puzzle = self.puzzles.set_puzzle(self.rng,
+                                                          self.round_level())
+            self.free_vowels = VOWEL_MASK
             self.vowel_purchase = True
-            self.free_consonants = "bcdfghjklmnpqrstvwxyz"
+            self.free_consonants = CONSONANT_MASK
             self.wheel_active = True
-            msg = f"Resolva o puzzle! >> {self.current_puzzle.get_visible()}"
-            print(msg)
+            self.emit('solve_next', self.current_puzzle.get_visible())
 
     def end_game(self: Game):
         """
         Termina o jogo.
         """
-        print(f"Final do jogo! Este jogo teve {self.round_no} ronda(s).")
-        BONUS = 6000
+        self.emit('game_end', self.round_no)
 
         # Encontra o(s) vencedore(s)
         tied_winners = []
@@ -454,55 +2012,406 @@ class Game:
         # Distribui o prémio pelos vencedores
         if len(tied_winners) > 0:
             for player in tied_winners:
-                player.money_game += BONUS // len(tied_winners)
+                player.money_game += self.bonus // len(tied_winners)
         else:
-            winner.money_game += BONUS
+            winner.money_game += self.bonus
+            tied_winners = [winner]
 
         # Apresenta os resultados
-        if len(tied_winners) == 0:
-            for player in self.players.all:
-                if player == winner:
-                    msg = f'O concorrente "{player.name}" venceu o jogo e'
-                    msg += f' leva para casa {player.money_game} euros.'
-                    print(msg)
-                else:
-                    msg = f'O concorrente "{player.name}" leva para casa'
-                    msg += f' {player.money_game} euros.'
-                    print(msg)
-        else:
-            for player in self.players.all:
-                if player in tied_winners:
-                    msg = f'O concorrente "{player.name}" venceu o jogo e'
-                    msg += f' leva para casa {player.money_game} euros.'
-                    print(msg)
-                else:
-                    msg = f'O concorrente "{player.name}" leva para casa'
-                    msg += f' {player.money_game} euros.'
-                    print(msg)
+        for player in self.players.all:
+            if player in tied_winners:
+                self.emit('winner', player.name, player.money_game)
+            else:
+                self.emit('payout', player.name, player.money_game)
 
         self.running = False
 
-    def spy(self: Game):
+    def snapshot(self: Game, rng: bool = False) -> bytes:
         """
-        Apresenta informação técnica.
-        Não é considerado um método de interação com o utilizador.
+        Devolve uma fotografia compacta e versionada de todo o estado do
+        jogo entre dois passos: jogadores, ronda, letras disponíveis, pedido
+        pendente, puzzle atual (posição na lista e letras descobertas), o
+        baralho de puzzles e, se o jogo tiver curva de dificuldade, a curva
+        e os baralhos por nível. A roleta e a lista de puzzles não são
+        guardadas (ver `Game.restore`).
+
+        rng: se verdadeiro, guarda também o estado do gerador do jogo (o
+            do módulo `random` ou o próprio, 2,5 KB), para que o jogo
+            restaurado tire os mesmos números
         """
-        print("  Spy:")
-        wa = self.wheel_active * 1
-        vp = self.vowel_purchase * 1
         cpz = self.current_puzzle
-        print(f"# {self.current_round} {wa} {vp}")
-        print(f"# {cpz.topic}: {cpz.raw_secret}")
-        print(f"# {cpz.get_visible()}")
+        deck = self.puzzles.deck
+        flags = (_SNAP_RUNNING * self.running
+                 | _SNAP_VOWELS * self.vowel_purchase
+                 | _SNAP_WHEEL * self.wheel_active
+                 | _SNAP_SHOWN * (cpz.visible.tounicode() == cpz.raw_secret))
+        parts = [_SNAP_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION),
+                 _SNAP_GAME.pack(flags, self.round_no, self.current_round,
+                                 PROMPTS.index(self.pending),
+                                 self.free_vowels, self.free_consonants,
+                                 self.spin_result, self.bonus,
+                                 len(self.players.all), self.players.current)]
         for p in self.players.all:
-            is_curr = "*" if p == self.current_player else "-"
-            # convert money round in 5 digits
-            mr = str(p.money_round)
-            mr = "0" * (5 - len(mr)) + mr
-            # convert money game in 5 digits
-            mg = str(p.money_game)
-            mg = "0" * (5 - len(mg)) + mg
-            print(f"# {is_curr} {p.recuperacao} {mr} {mg} {p.name}")
+            name = p.name.encode('utf-8')
+            parts.append(_SNAP_PLAYER.pack(len(name), p.recuperacao,
+                                           p.money_round, p.money_game))
+            parts.append(name)
+
+        strata = self.puzzles.strata
+        current = deck.current
+        if current is None and strata is not None:
+            current = strata.current
+        parts.append(_SNAP_PUZZLE.pack(-1 if current is None else current,
+                                       cpz.revealed, cpz.guessed))
+        parts += _pack_deck(deck)
+        if rng:
+            _, state, gauss = self.rng.getstate()
+            parts.append(_SNAP_RNG.pack(1 if self.rng is random else 2))
+            parts.append(_SNAP_MT.pack(*state, gauss is not None,
+                                       gauss or 0.0))
+        else:
+            parts.append(_SNAP_RNG.pack(0))
+
+        curve = self.curve or ()
+        decks = {} if strata is None else strata.decks
+        level = None if strata is None else strata.level
+        parts.append(_SNAP_CURVE.pack(
+            len(curve), _SNAP_NO_LEVEL if level is None else level,
+            len(decks)))
+        parts.append(bytes(curve))
+        for level, level_deck in decks.items():
+            parts.append(bytes((level,)))
+            parts += _pack_deck(level_deck)
+        return b''.join(parts)
+
+    @classmethod
+    def restore(cls: type, data: bytes, puzzles: Puzzles,
+                wheel: Wheel | None = None,
+                rng: random.Random | None = None) -> Game:
+        """
+        Reconstrói um jogo a partir da fotografia `data` (ver
+        `Game.snapshot`). O jogo restaurado é independente do original e
+        tem um baralho próprio sobre a mesma lista de puzzles. Se a
+        fotografia tiver o estado do gerador do módulo `random`, esse
+        estado é reposto; se tiver o de um gerador próprio, o jogo
+        restaurado fica com um gerador novo nesse estado.
+
+        data: fotografia do jogo
+        puzzles: puzzles do jogo original (a mesma lista, pela mesma ordem)
+        wheel: roleta do jogo (por omissão, uma roleta normal)
+        rng: gerador do jogo restaurado, se a fotografia não tiver o estado
+            do gerador (por omissão, o do módulo `random`)
+        """
+        magic, version = _SNAP_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError('Fotografia do jogo inválida ou de outra versão.')
+        pos = _SNAP_HEADER.size
+        (flags, round_no, current_round, pending, free_vowels,
+         free_consonants, spin_result, bonus, n, current) = \
+            _SNAP_GAME.unpack_from(data, pos)
+        pos += _SNAP_GAME.size
+
+        game = cls.__new__(cls)
+        game.running = bool(flags & _SNAP_RUNNING)
+        game.round_no = round_no
+        game.current_round = current_round
+        game.free_vowels = free_vowels
+        game.vowel_purchase = bool(flags & _SNAP_VOWELS)
+        game.free_consonants = free_consonants
+        game.wheel_active = bool(flags & _SNAP_WHEEL)
+        game.pending = PROMPTS[pending]
+        game.spin_result = spin_result
+        game.events = []
+        game.bonus = bonus
+
+        players = []
+        for _ in range(n):
+            size, recuperacao, money_round, money_game = \
+                _SNAP_PLAYER.unpack_from(data, pos)
+            pos += _SNAP_PLAYER.size
+            player = Player(data[pos:pos+size].decode('utf-8'))
+            pos += size
+            player.recuperacao = recuperacao
+            player.money_round = money_round
+            player.money_game = money_game
+            players.append(player)
+        game.players = Players(())
+        game.players.all = players
+        game.players.current = current
+        game.current_player = players[current]
+
+        idx, revealed, guessed = _SNAP_PUZZLE.unpack_from(data, pos)
+        pos += _SNAP_PUZZLE.size
+        deck, pos = _unpack_deck(data, pos)
+        if deck.size != len(puzzles.puzzles):
+            raise ValueError('A fotografia é de outra lista de puzzles.')
+        game.puzzles = view = puzzles.session(deck.ordered)
+        view.deck = deck
+
+        cpz = view.puzzles[idx]
+        if view.shared and isinstance(view.puzzles, list):
+            cpz = cpz.fresh()
+        for letter in mask_letters(revealed):
+            cpz.find_letter(letter)
+        if flags & _SNAP_SHOWN:
+            cpz.reveal_all()
+        cpz.guessed = guessed
+        view.current_puzzle = game.current_puzzle = cpz
+
+        game.wheel = Wheel() if wheel is None else wheel
+        game.rng = random if rng is None else rng
+        game.metrics = None
+        kind, = _SNAP_RNG.unpack_from(data, pos)
+        pos += _SNAP_RNG.size
+        if kind:
+            *state, has_gauss, gauss = _SNAP_MT.unpack_from(data, pos)
+            if kind == 2:
+                game.rng = random.Random()
+            game.rng.setstate((3, tuple(state),
+                               gauss if has_gauss else None))
+            pos += _SNAP_MT.size
+
+        n_curve, level, n_decks = _SNAP_CURVE.unpack_from(data, pos)
+        pos += _SNAP_CURVE.size
+        game.curve = tuple(data[pos:pos + n_curve]) or None
+        pos += n_curve
+        if game.curve is not None:
+            if puzzles.difficulty is None:
+                puzzles.index_difficulty()
+            view.difficulty = puzzles.difficulty
+            view.strata = StratifiedDeck(view.difficulty)
+            for _ in range(n_decks):
+                level_no = data[pos]
+                view.strata.decks[level_no], pos = _unpack_deck(data, pos + 1)
+            if level != _SNAP_NO_LEVEL:
+                view.strata.level = level
+        return game
+
+    def spy(self: Game) -> Event:
+        """
+        Devolve a informação técnica do jogo.
+        Não é considerado um método de interação com o utilizador.
+        """
+        cpz = self.current_puzzle
+        players = tuple(
+            (p == self.current_player, p.recuperacao, p.money_round,
+             p.money_game, p.name)
+            for p in self.players.all)
+        return Event('spy', (self.current_round, self.wheel_active * 1,
+                             self.vowel_purchase * 1, cpz.topic,
+                             cpz.raw_secret, cpz.get_visible(), players))
+
+    def command_spy(self: Game):
+        """
+        Apresenta informação técnica.
+        """
+        self.events.append(self.spy())
+
+    def command_authors(self: Game):
+        """
+        Apresenta os autores do programa.
+        """
+        self.emit('authors')
+
+    def command_quit(self: Game):
+        """
+        Termina o jogo imediatamente.
+        """
+        self.emit('quit')
+        self.running = False
+
+    def command_commands(self: Game):
+        """
+        Apresenta uma lista de comandos.
+        """
+        self.emit('commands')
+
+    def command_inventario(self: Game):
+        """
+        Apresenta o inventário dos jogadores.
+        """
+        self.emit('inventory', tuple(
+            (p.name, p.recuperacao, p.money_round, p.money_game)
+            for p in self.players.all))
+
+    def command_show(self: Game):
+        """
+        Apresenta o puzzle atual.
+        """
+        self.emit('visible', self.current_puzzle.get_visible())
+
+    def command_final(self: Game):
+        """
+        Pede ao jogador a solução do puzzle.
+        """
+        self.pending = PROMPT_SOLVE
+
+    def answer_solve(self: Game, f: str):
+        """
+        Verifica a solução `f` do puzzle. Se estiver certa, o jogador ganha o
+        dinheiro da ronda e passa-se à ronda seguinte.
+
+        f: solução já limpa
+        """
+        cpz = self.current_puzzle
+        if f == cpz.secret:
+            cp = self.current_player
+            self.emit('solved')
+            self.emit('round_won', cp.name, self.current_round)
+            cp.money_game += cp.money_round
+            cpz.reveal_all()
+            self.wheel_active = False
+            self.vowel_purchase = False
+            for player in self.players.all:
+                player.money_round = 0
+            self.command_inventario()
+            self.next_round()
+        else:
+            self.emit('wrong')
+            self.ficha_recuperacao()
+
+    def command_buy(self: Game):
+        """
+        Pede ao jogador a vogal a comprar, se tiver dinheiro para isso.
+        """
+        if self.current_player.money_round >= VOWEL_PRICE:
+            self.pending = PROMPT_VOWEL
+        else:
+            self.emit('no_money')
+            self.emit('careless')
+            self.ficha_recuperacao()
+
+    def answer_vowel(self: Game, vowel: str):
+        """
+        Compra a vogal `vowel` e revela-a no puzzle.
+
+        vowel: vogal já limpa
+        """
+        bit = LETTER_BIT.get(vowel, 0)
+        self.current_player.money_round -= VOWEL_PRICE
+        if not bit & self.free_vowels:
+            self.emit('vowel_taken', vowel)
+            self.emit('careless')
+            self.ficha_recuperacao()
+        else:
+            self.take_vowel(vowel)
+            if bit & self.current_puzzle.mask:
+                _, count = self.current_puzzle.find_letter(vowel)
+                if count > 0:
+                    self.emit('found', count, vowel)
+                else:
+                    self.emit('not_found', vowel)
+                self.emit('visible', self.current_puzzle.get_visible())
+            else:
+                self.emit('not_found', vowel)
+                self.emit('visible', self.current_puzzle.get_visible())
+                self.ficha_recuperacao()
+
+    def command_wheel(self: Game):
+        """
+        Roda a roleta. Se sair um valor, pede ao jogador uma consoante.
+        """
+        result = self.spin()
+
+        # Se o resultado for negativo, executa a ação correspondente
+        if result < 0:
+            self.wheel_houses(result)
+        else:
+            self.spin_result = result
+            self.pending = PROMPT_CONSONANT
+
+    def answer_consonant(self: Game, cons: str):
+        """
+        Revela a consoante `cons` no puzzle, ganhando o valor da roleta por
+        cada ocorrência.
+
+        cons: consoante já limpa
+        """
+        curr_puzzle = self.current_puzzle
+        result = self.spin_result
+
+        bit = LETTER_BIT.get(cons, 0)
+
+        if not bit & CONSONANT_MASK:
+            self.emit('invalid_letter', cons)
+            self.emit('careless')
+            self.current_player = self.players.get_next_player()
+
+        elif (bit & curr_puzzle.revealed) or \
+                (not bit & self.free_consonants):
+            self.emit('letter_seen', cons)
+            self.emit('careless')
+            self.current_player = self.players.get_next_player()
+
+        elif bit & curr_puzzle.mask:
+            curr_puzzle.guessed |= bit
+            _, count = curr_puzzle.find_letter(cons)
+            self.free_consonants &= ~bit
+            if not curr_puzzle.hidden_consonants():
+                self.wheel_active = False
+            if count > 0:
+                mult = count * result
+                self.current_player.money_round += mult
+                self.emit('found_consonant', count, cons, result, mult,
+                          tuple((p.name, p.money_round)
+                                for p in self.players.all))
+                self.emit('visible', curr_puzzle.get_visible())
+            else:
+                self.emit('not_found', cons)
+                self.ficha_recuperacao()
+        else:
+            curr_puzzle.guessed |= bit
+            self.emit('not_found', cons)
+            self.ficha_recuperacao()
+
+    # Comandos e respostas aos pedidos, partilhados por todos os jogos
+    COMMANDS = {
+            '#': command_spy,
+            'a': command_authors,
+            'q': command_quit,
+            'r': command_wheel,
+            'i': command_inventario,
+            'c': command_commands,
+            'f': command_final,
+            'p': command_show,
+            'v': command_buy
+        }
+    ANSWERS = {
+            PROMPT_COMMAND: answer_command,
+            PROMPT_CONSONANT: answer_consonant,
+            PROMPT_FREE_VOWEL: answer_free_vowel,
+            PROMPT_VOWEL: answer_vowel,
+            PROMPT_SOLVE: answer_solve,
+            PROMPT_TOKEN: answer_token
+        }
+
+
+def play(game: Game, deciders: list[Callable[[Game], str]],
+         on_events: Callable[[list[Event]], None] | None = None,
+         driver=None) -> Game:
+    """
+    Joga um jogo completo sem interface: em cada passo, a função de decisão
+    do jogador atual responde ao pedido pendente do jogo.
+
+    game: jogo a jogar
+    deciders: uma função de decisão por jogador, que recebe o jogo e devolve
+        a resposta ao pedido pendente (`game.pending`)
+    on_events: função chamada com os acontecimentos de cada passo
+    driver: objeto com `start` e `step` a usar em vez dos do jogo (por
+        exemplo, para gravar o jogo)
+    """
+    if driver is None:
+        driver = game
+    events = driver.start()
+    if on_events is not None:
+        on_events(events)
+    while game.running:
+        answer = deciders[game.players.current](game)
+        events = driver.step(answer)
+        if on_events is not None:
+            on_events(events)
+
+    return game
 
 
 def mooshak():
@@ -519,280 +2428,495 @@ def mooshak():
         return FILE_NAME
 
 
+MESSAGES = {
+    'visible': ' >> {0}',
+    'round_start': 'Início da ronda número {0}',
+    'solve_next': 'Resolva o puzzle! >> {0}',
+    'bancarrota': '"Bancarrota". Perde todo o dinheiro obtido nesta ronda e'
+                  ' também perde a vez.',
+    'ganha_ficha': '"Ficha de recuperação". Boa! Ganhou uma ficha de'
+                   ' recuperação.',
+    'perde_vez': '"Perde vez". Perdeu a sua vez de jogar.',
+    'invalid_letter': '"{0}" não é uma letra válida.',
+    'careless': 'Perde a vez. Para a próxima esteja com mais atenção.',
+    'vowel_taken': '"{0}" já foi levantada.',
+    'letter_seen': 'A letra "{0}" já saiu e está à vista.',
+    'found': 'Encontrada(s) {0} ocorrência(s) de "{1}".',
+    'found_consonant': 'Encontrada(s) {0} ocorrência(s) de "{1}" valendo'
+                       ' {0}*{2}={3}. {4}.',
+    'not_found': 'Não foram encontradas ocorrências de "{0}".',
+    'message': '{0}',
+    'metrics': '{0}',
+    'token_used': 'Afinal não perde a vez.',
+    'timeout': 'Tempo esgotado.',
+    'no_money': 'Você não tem dinheiro suficiente para comprar uma vogal.',
+    'solved': 'Certo!',
+    'round_won': 'O concorrente "{0}" venceu a ronda número {1}.',
+    'wrong': 'Errado. Perde a vez.',
+    'game_end': 'Final do jogo! Este jogo teve {0} ronda(s).',
+    'winner': 'O concorrente "{0}" venceu o jogo e leva para casa {1} euros.',
+    'payout': 'O concorrente "{0}" leva para casa {1} euros.',
+    'quit': '  Adeus!',
+    'authors': '  Autores:\n\tPedro Miguel Reis',
+    'help': '  Comando inválido! Ajuda:\n'
+            '\tPressione `c` seguido de `Enter` para listar os comandos'
+            ' possíveis.\n'
+            '\tÉ possível usar letras maiúsculas ou minúsculas.',
+    'commands': '  Comandos:\n'
+                '\tc - Comandos (listar comandos)\n'
+                '\ti - Inventário (mostrar)\n'
+                '\tf - Finalizar puzzle\n'
+                '\tp - Puzzle (mostrar)\n'
+                '\tr - Roleta (rodar)\n'
+                '\tv - Vogal (comprar)\n'
+                '\t# - Espiar (mooshak)\n'
+                '\tq - Quit (terminar imediatamente)',
+}
+
+
+def render_event(event: Event) -> str:
+    """
+    Devolve o texto a apresentar para o acontecimento `event`.
+
+    event: acontecimento do jogo
+    """
+    if event.kind == 'found_consonant':
+        money = ", ".join(f'{name} = {m}' for name, m in event.args[4])
+        return MESSAGES[event.kind].format(*event.args[:4], money)
+    if event.kind == 'inventory':
+        return render_inventory(event.args[0])
+    if event.kind == 'spy':
+        return render_spy(*event.args)
+
+    return MESSAGES[event.kind].format(*event.args)
+
+
+def render_inventory(players: tuple) -> str:
+    """
+    Devolve a tabela do inventário dos jogadores.
+
+    players: (nome, fichas, dinheiro da ronda, dinheiro do jogo) por jogador
+    """
+    lines = ["  Inventário:",
+             "\tN.  Nome                Fichas   Ronda    Jogo"]
+    for idx, (p_name, p_recuperacao, p_money_round, p_money_game) in \
+            enumerate(players):
+        p_id = idx + 1
+        msg = f"\t{p_id}{' '*max(0, 4-len(str(p_id)))}"
+        msg += f"{p_name}{' '*max(0, 20-len(p_name))}"
+        msg += f"{p_recuperacao}{' '*max(0, 9-len(str(p_recuperacao)))}"
+        msg += f"{p_money_round}{' '*max(0, 9-len(str(p_money_round)))}"
+        msg += f"{p_money_game}"
+        lines.append(msg)
+
+    return "\n".join(lines)
+
+
+def render_spy(round_no: int, wa: int, vp: int, topic: str, secret: str,
+               visible: str, players: tuple) -> str:
+    """
+    Devolve a informação técnica do jogo (ver `Game.spy`).
+    """
+    lines = ["  Spy:", f"# {round_no} {wa} {vp}", f"# {topic}: {secret}",
+             f"# {visible}"]
+    for is_current, recuperacao, money_round, money_game, name in players:
+        is_curr = "*" if is_current else "-"
+        # converte o dinheiro da ronda e do jogo em 5 dígitos
+        lines.append(
+            f"# {is_curr} {recuperacao} {money_round:05} {money_game:05} "
+            f"{name}")
+
+    return "\n".join(lines)
+
+
+def render_prompt(game: Game) -> str:
+    """
+    Devolve o texto do pedido pendente do jogo `game`.
+
+    game: jogo em curso
+    """
+    if game.pending == PROMPT_CONSONANT:
+        return f"{game.spin_result}. Qual a consoante? "
+    if game.pending == PROMPT_FREE_VOWEL:
+        return '"Vogal grátis". Qual a vogal? '
+    if game.pending == PROMPT_VOWEL:
+        return "Qual a vogal? "
+    if game.pending == PROMPT_SOLVE:
+        cpz = game.current_puzzle
+        return f"Resolva o puzzle! >> {cpz.topic}{cpz.sep}"
+    if game.pending == PROMPT_TOKEN:
+        msg = "Você vai perder a vez. Deseja usar agora uma ficha"
+        msg += " de recuperação (s/n)? "
+        return msg
+
+    return f"[{game.current_player.name}]: "
+
+
+def event_json(event: Event) -> str:
+    """
+    Devolve o acontecimento `event` como uma linha JSON, com o tipo e os
+    dados do acontecimento.
+
+    event: acontecimento do jogo
+    """
+    import json
+    return json.dumps({'kind': event.kind, 'args': event.args},
+                      ensure_ascii=False)
+
+
+class TextSink:
+    """
+    Representa a saída em texto do jogo: guarda o texto dos acontecimentos
+    e escreve-o de uma só vez em `flush`, uma vez por jogada.
+    """
+    __slots__ = ('stream', 'parts')
+
+    def __init__(self: TextSink, stream=None):
+        """
+        Inicializa a saída.
+
+        stream: ficheiro onde escrever (por omissão, o stdout)
+        """
+        self.stream = sys.stdout if stream is None else stream
+        self.parts = []
+
+    def render(self: TextSink, event: Event) -> str:
+        """
+        Devolve a linha a escrever para o acontecimento `event`.
+        """
+        return render_event(event)
+
+    def write(self: TextSink, events: Iterable[Event]):
+        """
+        Acrescenta os acontecimentos `events` ao que falta escrever.
+        """
+        self.parts.extend(map(self.render, events))
+
+    def prompt(self: TextSink, text: str) -> str:
+        """
+        Devolve o texto a passar ao `input` para o pedido `text`.
+        """
+        return text
+
+    def flush(self: TextSink):
+        """
+        Escreve tudo o que foi acrescentado desde a última escrita.
+        """
+        if self.parts:
+            self.parts.append('')
+            self.stream.write('\n'.join(self.parts))
+            self.stream.flush()
+            self.parts.clear()
+
+
+class JsonSink(TextSink):
+    """
+    Representa a saída estruturada do jogo: um objeto JSON por linha para
+    cada acontecimento, incluindo os pedidos (tipo 'prompt').
+    """
+    __slots__ = ()
+
+    def render(self: JsonSink, event: Event) -> str:
+        return event_json(event)
+
+    def prompt(self: JsonSink, text: str) -> str:
+        self.parts.append(event_json(Event('prompt', (text,))))
+        return ''
+
+
+class NullSink:
+    """
+    Representa uma saída que descarta tudo, para simulações.
+    """
+    __slots__ = ()
+
+    def write(self: NullSink, events: Iterable[Event]):
+        pass
+
+    def prompt(self: NullSink, text: str) -> str:
+        return ''
+
+    def flush(self: NullSink):
+        pass
+
+
+class TimedInput:
+    """
+    Representa a leitura de linhas de um descritor (por omissão, o stdin)
+    com prazo, sem threads: espera com `select` até haver dados ou o prazo
+    acabar, e guarda o que sobra de cada leitura para a linha seguinte.
+    Só funciona em sistemas POSIX.
+    """
+    __slots__ = ('fd', 'buf', 'out')
+
+    def __init__(self: TimedInput, fd: int | None = None, out=None):
+        """
+        Inicializa a leitura.
+
+        fd: descritor de onde ler (por omissão, o do stdin)
+        out: ficheiro onde escrever o pedido (por omissão, o stdout)
+        """
+        self.fd = sys.stdin.fileno() if fd is None else fd
+        self.buf = b''
+        self.out = sys.stdout if out is None else out
+
+    def readline(self: TimedInput, prompt: str,
+                 timeout: float | None = None) -> str | None:
+        """
+        Escreve `prompt` e devolve a linha seguinte, sem a mudança de linha,
+        ou None se não chegar em `timeout` segundos. Levanta EOFError no fim
+        dos dados, como `input`.
+
+        prompt: texto do pedido
+        timeout: prazo em segundos; sem prazo se for None
+        """
+        self.out.write(prompt)
+        self.out.flush()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while b'\n' not in self.buf:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                return None
+            data = os.read(self.fd, 4096)
+            if not data:
+                if not self.buf:
+                    raise EOFError
+                self.buf += b'\n'
+            self.buf += data
+
+        line, _, self.buf = self.buf.partition(b'\n')
+        return line.decode('utf-8', 'replace').rstrip('\r')
+
+
 class UI:
     """
-    Representa a interface do utilizador.
+    Representa a interface do utilizador no terminal.
     """
-    def __init__(self: UI):
+    def __init__(self: UI, turn_timeout: float | None = None,
+                 sink: TextSink | NullSink | None = None,
+                 puzzles: Puzzles | None = None,
+                 rng: random.Random | None = None, metrics=None,
+                 curve: Iterable[int] | None = None):
         """
         Inicializa a interface do utilizador.
-        """
+
+        turn_timeout: prazo, em segundos, para responder a cada pedido
+            durante o jogo; sem prazo se for None
+        sink: saída do jogo (por omissão, texto no stdout)
+        puzzles: puzzles já carregados, usados através de uma sessão
+            própria em vez de ler o ficheiro indicado pelo `mooshak`
+        rng: gerador aleatório próprio do jogo (por omissão, o do módulo
+            `random`)
+        metrics: métricas onde medir cada jogada (ver `instrument.Metrics`)
+        curve: nível de dificuldade de cada ronda (ver `Game`)
+        """
+        self.sink = TextSink() if sink is None else sink
+        self.turn_timeout = turn_timeout
+        self.reader = None if turn_timeout is None else TimedInput()
         self.round_no, self.player_no, self.names = self.set_initial_info()
         file_name = mooshak()
-        self.game = Game(file_name, self.names, self.round_no)
+        if puzzles is not None:
+            puzzles = puzzles.session()
+        self.game = Game(file_name, self.names, self.round_no,
+                         puzzles=puzzles, rng=rng, metrics=metrics,
+                         curve=curve)
 
     def welcome(self: UI):
         """
         Apresenta uma mensagem de boas-vindas e inicia o jogo.
         """
-        print("Vamos começar. Eis o puzzle. Boa sorte!")
+        self.say("Vamos começar. Eis o puzzle. Boa sorte!")
         # Inicializa o jogo
-        self.game.play_first_round()
+        self.render(self.game.start())
 
     def set_initial_info(self: UI) -> tuple[int, int, list[str]]:
         """
         Pede ao utilizador o número de rondas, o número de concorrentes e os
         seus nomes.
         """
-        print('Bem-vindo/a ao jogo "A Roda da Sorte"!')
-        round_no = int(input("Quantas rondas? "))
+        self.say('Bem-vindo/a ao jogo "A Roda da Sorte"!')
+        round_no = int(self.input("Quantas rondas? "))
         if not (1 <= round_no <= 4):
-            print("O número de rondas não é válido, deverá ser entre 1 e 4.")
+            self.say("O número de rondas não é válido, deverá ser entre 1"
+                     " e 4.")
             return self.set_initial_info()
 
-        player_no = int(input("Quantos concorrentes? "))
+        player_no = int(self.input("Quantos concorrentes? "))
         if not (1 <= player_no <= 4):
-            msg = "O número de concorrentes não é válido, deverá ser entre 1"
-            msg += " e 4."
-            print(msg)
+            self.say("O número de concorrentes não é válido, deverá ser"
+                     " entre 1 e 4.")
             return self.set_initial_info()
 
         player_names = []
         for i in range(1, player_no+1):
-            name = str(input(f"Nome do concorrente número {i}? "))
-            if (name in player_names) or (not name) or (not name.isalpha()):
-                print("Nome inválido, tente novamente.")
+            name = str(self.input(f"Nome do concorrente número {i}? "))
+            if not valid_name(name, player_names):
+                self.say("Nome inválido, tente novamente.")
                 return self.set_initial_info()
 
             player_names.append(name)
 
         return round_no, player_no, player_names
 
-    def input_command(self: UI) -> str:
-        """
-        Lê um comando do utilizador.
-        """
-        cp = self.game.current_player
-        command_line = input(f"[{cp.name}]: ")
-        command = clean_text(command_line)
-        return command
-
-    def command_spy(self: UI):
-        """
-        Apresenta informação técnica.
-        """
-        self.game.spy()
-
-    def command_authors(self: UI):
-        """
-        Apresenta os autores do programa.
+    def input(self: UI, prompt: str,
+              timeout: float | None = None) -> str | None:
         """
-        print("  Autores:")
-        print("\tPedro Miguel Reis")
+        Pede uma linha ao utilizador com o texto `prompt`. Devolve None se
+        a resposta não chegar em `timeout` segundos.
 
-    def command_quit(self: UI):
-        """
-        Termina o jogo imediatamente.
+        prompt: texto do pedido
+        timeout: prazo em segundos; sem prazo se for None
         """
-        print("  Adeus!")
-        self.game.running = False
+        prompt = self.sink.prompt(prompt)
+        self.sink.flush()
+        if self.reader is None:
+            return input(prompt)
+        return self.reader.readline(prompt, timeout)
 
-    def command_help(self: UI):
+    def prompt(self: UI) -> str:
         """
-        Apresenta uma mensagem de ajuda.
+        Devolve o texto do pedido pendente do jogo.
         """
-        print("  Comando inválido! Ajuda:")
-        msg = "\tPressione `c` seguido de `Enter` para listar os comandos"
-        msg += " possíveis."
-        print(msg)
-        print("\tÉ possível usar letras maiúsculas ou minúsculas.")
+        return render_prompt(self.game)
 
-    def command_commands(self: UI):
+    def render(self: UI, events: list[Event]):
         """
-        Apresenta uma lista de comandos.
+        Apresenta os acontecimentos `events`. Só são escritos no próximo
+        pedido ou no fim do jogo.
         """
-        print("  Comandos:")
-        print("\tc - Comandos (listar comandos)")
-        print("\ti - Inventário (mostrar)")
-        print("\tf - Finalizar puzzle")
-        print("\tp - Puzzle (mostrar)")
-        print("\tr - Roleta (rodar)")
-        print("\tv - Vogal (comprar)")
-        print("\t# - Espiar (mooshak)")
-        print("\tq - Quit (terminar imediatamente)")
+        self.sink.write(events)
 
-    def command_inventario(self: UI):
+    def say(self: UI, text: str):
         """
-        Apresenta o inventário dos jogadores.
+        Apresenta a mensagem `text`.
         """
-        print("  Inventário:")
-        print("\tN.  Nome                Fichas   Ronda    Jogo")
-        for idx, player in enumerate(self.game.players.all):
-            p_id = idx + 1
-            p_name = player.name
-            p_recuperacao = player.recuperacao
-            p_money_round = player.money_round
-            p_money_game = player.money_game
-            msg = f"\t{p_id}{' '*max(0, 4-len(str(p_id)))}"
-            msg += f"{p_name}{' '*max(0, 20-len(p_name))}"
-            msg += f"{p_recuperacao}{' '*max(0, 9-len(str(p_recuperacao)))}"
-            msg += f"{p_money_round}{' '*max(0, 9-len(str(p_money_round)))}"
-            msg += f"{p_money_game}"
-            print(msg)
-
-    def command_final(self: UI):
-        """
-        Permite ao utilizador resolver o puzzle.
-        """
-        cpz = self.game.current_puzzle
-        msg = f"Resolva o puzzle! >> {cpz.topic}{cpz.sep}"
-        f = clean_text(str(input(msg)))
-        if f == clean_text(cpz.secret):
-            cp = self.game.current_player
-            print("Certo!")
-            msg = f'O concorrente "{cp.name}" venceu a ronda número'
-            msg += f' {self.round_no}.'
-            print(msg)
-            cp.money_game += cp.money_round
-            cpz.visible = cpz.raw_secret
-            self.game.wheel_active = False
-            self.game.vowel_purchase = False
-            cp.money_round = 0
-            for player in self.game.players.all:
-                if player != cp:
-                    player.money_round = 0
-            self.command_inventario()
-            self.game.next_round()
-        else:
-            print("Errado. Perde a vez.")
-            self.game.ficha_recuperacao()
+        self.sink.write((Event('message', (text,)),))
 
-    def command_show(self: UI):
+    def hint(self: UI, answer: str) -> str | None:
         """
-        Apresenta o puzzle atual.
-        """
-        print(" >>", self.game.current_puzzle.get_visible())
+        Devolve o texto da ajuda pedida com `answer`, que não conta como
+        jogada, ou None se `answer` for uma resposta ao jogo. Por omissão
+        não há ajudas (ver `advisor.HintUI`).
 
-    def command_buy(self: UI):
+        answer: resposta do utilizador
         """
-        Permite ao utilizador comprar uma vogal.
-        """
-        cp = self.game.current_player
-        fv = self.game.free_vowels
-        if cp.money_round >= 250:
-            vowel = str(input("Qual a vogal? "))
-            vowel = clean_text(vowel)
-            cp.money_round -= 250
-            if vowel not in fv:
-                print(f'"{vowel}" já foi levantada.')
-                print("Perde a vez. Para a próxima esteja com mais atenção.")
-                self.game.ficha_recuperacao()
-            else:
-                self.game.free_vowels = fv.replace(vowel, "")
-                if len(self.game.free_vowels) == 0:
-                    self.game.vowel_purchase = False
-                if vowel in self.game.current_puzzle.secret:
-                    _, count = self.game.current_puzzle.find_letter(vowel)
-                    if count > 0:
-                        msg = f'Encontrada(s) {count} ocorrência(s) de '
-                        msg += f'"{vowel}".'
-                        print(msg)
-                        print(f" >> {self.game.current_puzzle.get_visible()}")
-                    else:
-                        msg = 'Não foram encontradas ocorrências de '
-                        msg += f'"{vowel}".'
-                        print(msg)
-                        print(f" >> {self.game.current_puzzle.get_visible()}")
-                else:
-                    print(f'Não foram encontradas ocorrências de "{vowel}".')
-                    print(f" >> {self.game.current_puzzle.get_visible()}")
-                    self.game.ficha_recuperacao()
-        else:
-            print("Você não tem dinheiro suficiente para comprar uma vogal.")
-            print("Perde a vez. Para a próxima esteja com mais atenção.")
-            self.game.ficha_recuperacao()
-
-    def command_wheel(self: UI):
-        curr_puzzle = self.game.current_puzzle
-        result = self.game.spin()
-
-        # Se o resultado for negativo, executa a ação correspondente
-        if result < 0:
-            self.game.wheel_houses(result)
-        else:
-            cons = str(input(f"{result}. Qual a consoante? "))
-            cons = clean_text(cons)
-
-            fc = self.game.free_consonants
-
-            if (len(cons) != 1) or \
-                    (cons not in "bcdfghjklmnpqrstvwxyz"):
-                print(f'"{cons}" não é uma letra válida.')
-                print("Perde a vez. Para a próxima esteja com mais atenção.")
-                self.game.current_player = self.game.players.get_next_player()
-
-            elif (cons in curr_puzzle.visible) or \
-                    (cons not in fc):
-                print(f'A letra "{cons}" já saiu e está à vista.')
-                print("Perde a vez. Para a próxima esteja com mais atenção.")
-                self.game.current_player = self.game.players.get_next_player()
-
-            elif cons in curr_puzzle.secret:
-                _, count = curr_puzzle.find_letter(cons)
-                fc = fc.replace(cons, "")
-                cpz = self.game.current_puzzle
-                cpz.existing_consonants = cpz.existing_consonants.replace(
-                    cons, "")
-                if len(cpz.existing_consonants) == 0:
-                    self.game.wheel_active = False
-                if count > 0:
-                    mult = count * result
-                    self.game.current_player.money_round += mult
-                    # Cria a mensagem a apresentar
-                    msg = f'Encontrada(s) {count} ocorrência(s) de "{cons}"'
-                    msg += f' valendo {count}*{result}={mult}. '
-                    # Atualiza a mensagem com o dinheiro de cada jogador
-                    name_and_money = []
-                    for player in self.game.players.all:
-                        name_and_money.append(
-                            f'{player.name} = {player.money_round}'
-                            )
-                    msg += f'{", ".join(name_and_money)}.'
-
-                    print(msg)
-                    print(f" >> {curr_puzzle.get_visible()}")
-                else:
-                    print(f'Não foram encontradas ocorrências de "{cons}".')
-                    self.game.ficha_recuperacao()
-            else:
-                print(f'Não foram encontradas ocorrências de "{cons}".')
-                self.game.ficha_recuperacao()
+        return None
 
     def interpreter(self: UI):
         """
         Interpreta os comandos do utilizador.
         """
+        if self.game.metrics is not None:
+            self.timed_interpreter()
+            return
         while self.game.running:
-            command = self.input_command()
-            if command in self.commands:
-                self.commands[command]()
+            answer = self.input(self.prompt(), self.turn_timeout)
+            if answer is None:
+                self.say("")
+                self.render(self.game.timeout())
+                continue
+            text = self.hint(str(answer))
+            if text is not None:
+                self.say(text)
             else:
-                self.command_help()
-
-        self.command_spy()
+                self.render(self.game.step(str(answer)))
+
+        self.render([self.game.spy()])
+
+    def timed_interpreter(self: UI):
+        """
+        Igual a `interpreter`, mas mede também, em cada jogada, a espera
+        pela resposta e o texto dos acontecimentos e do pedido seguinte. A
+        escolha do tratador e as regras são medidas em `Game.step`.
+        """
+        from instrument import INPUT, RULES, RENDER
+        game = self.game
+        metrics = game.metrics
+        clock = time.perf_counter_ns
+        prompt = self.prompt()
+        while game.running:
+            start = clock()
+            answer = self.input(prompt, self.turn_timeout)
+            answered = clock()
+            if answer is None:
+                self.say("")
+                events = game.timeout()
+                key = 'timeout'
+                rendered = clock()
+                metrics.add(key, RULES, rendered - answered)
+            else:
+                text = self.hint(str(answer))
+                if text is not None:
+                    self.say(text)
+                    continue
+                events = game.step(str(answer))
+                key = metrics.last
+                rendered = clock()
+            self.render(events)
+            if game.running:
+                prompt = self.prompt()
+            metrics.add(key, INPUT, answered - start)
+            metrics.add(key, RENDER, clock() - rendered)
+
+        self.render([game.spy()])
 
     def run(self: UI):
         """
         Inicia o jogo.
         """
-        self.welcome()
-        self.interpreter()
-        print("Adeus!")
-
+        try:
+            self.welcome()
+            self.interpreter()
+            self.say("Adeus!")
+        finally:
+            self.sink.flush()
 
-def main():
-    ui = UI()
-    ui.run()
 
+def main(argv: list[str] | None = None):
+    """
+    Ponto de entrada da linha de comandos: joga um jogo no terminal.
 
-main()
+    argv: argumentos da linha de comandos (por omissão, os do processo)
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="A Roda da Sorte")
+    parser.add_argument("--turn-timeout", type=float, default=None,
+                        help="segundos para responder a cada pedido")
+    parser.add_argument("--json", action="store_true",
+                        help="escreve os acontecimentos em linhas JSON")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="semente do jogo, para o repetir tal e qual")
+    parser.add_argument("--metrics", default=None, metavar="FICHEIRO",
+                        help="mede cada jogada (comando %%) e grava as "
+                             "métricas em JSON no fim")
+    parser.add_argument("--curve", default=None, metavar="NÍVEIS",
+                        help="nível de dificuldade de cada ronda, separados "
+                             "por vírgulas (0: fácil, 1: médio, 2: difícil)")
+    args = parser.parse_args(argv)
+    rng = None if args.seed is None else game_rng(args.seed)
+    curve = None
+    if args.curve is not None:
+        curve = [int(level) for level in args.curve.split(",")]
+    metrics = None
+    if args.metrics:
+        import instrument
+        metrics = instrument.Metrics()
+    ui = UI(args.turn_timeout, JsonSink() if args.json else None, rng=rng,
+            metrics=metrics, curve=curve)
+    try:
+        ui.run()
+    finally:
+        if metrics is not None:
+            import json
+            metrics.close()
+            with open(args.metrics, 'w', encoding='utf-8') as f:
+                json.dump(metrics.dump(), f)
+
+
+if __name__ == "__main__":
+    main()